@@ -1,14 +1,29 @@
 # app/celery_app.py
+import os
+
 from celery import Celery
 
+from app.scheduler import PRIORITIES, node_concurrency
+
 celery = Celery(
     "smartsignalai",
-    broker="redis://localhost:6379/0",
-    backend="redis://localhost:6379/1"
+    broker=os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+    backend=os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:6379/1"),
+    include=["app.tasks.video_tasks"],
 )
 
 celery.conf.task_track_started = True
 celery.conf.task_serializer = "json"
 celery.conf.result_serializer = "json"
 celery.conf.accept_content = ["json"]
-celery.conf.worker_concurrency = 2  # optional: limit concurrent tasks
+# One model run per slot, sized to this node's cores and memory (WORKER_CONCURRENCY overrides)
+celery.conf.worker_concurrency = node_concurrency()
+# Long jobs: take one at a time so queued work stays with the broker, by priority
+celery.conf.worker_prefetch_multiplier = 1
+celery.conf.task_acks_late = True
+celery.conf.task_default_priority = PRIORITIES["normal"]
+celery.conf.task_queue_max_priority = max(PRIORITIES.values())
+celery.conf.broker_transport_options = {
+    "priority_steps": sorted(PRIORITIES.values()),
+    "queue_order_strategy": "priority",
+}
@@ -1,25 +1,77 @@
 # app/database.py
 
-from sqlmodel import SQLModel, Field, create_engine, Session
-from typing import Optional
+from sqlalchemy import delete, event, func, insert, inspect, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Field, create_engine, Session, select
+from typing import Dict, Iterable, List, Optional, Tuple
 import os
 import json
 
-# Define the database URL and location
+# Define the database URL and location. DATABASE_URL switches to a server
+# database (e.g. postgresql+psycopg://...) without code changes.
 db_path = os.path.join("SmarTSignalAI", "data", "tasks.db")
-DATABASE_URL = f"sqlite:///{db_path}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{db_path}")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "30"))  # seconds a writer waits for the lock
+
+# Applied to every new SQLite connection. WAL lets status reads run while a
+# worker writes; NORMAL sync is durable across app crashes in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(DB_BUSY_TIMEOUT * 1000),
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # KiB
+    "foreign_keys": "ON",
+}
+
+
+def make_engine(url: str = DATABASE_URL) -> Engine:
+    """Pooled engine for `url`, with WAL and a busy timeout for SQLite files."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                             pool_pre_ping=True, pool_recycle=1800)
+
+    in_memory = url in ("sqlite://", "sqlite:///:memory:")
+    if in_memory:
+        # One shared connection, otherwise every checkout sees its own empty database
+        sqlite_engine = create_engine(url, echo=False, poolclass=StaticPool,
+                                      connect_args={"check_same_thread": False})
+    else:
+        sqlite_engine = create_engine(
+            url, echo=False, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+            connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT},
+        )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            if in_memory and name == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return sqlite_engine
+
 
 # Initialize SQLModel engine
-engine = create_engine(DATABASE_URL, echo=False)
+engine = make_engine()
 
 # Define the Task table using SQLModel
 class VideoTask(SQLModel, table=True):
     id: str = Field(primary_key=True)
     filename: str
-    status: str = "queued"
+    status: str = Field(default="queued", index=True)
     progress: int = 0
     processed_path: Optional[str] = None
-    stats_json: Optional[str] = Field(default="{}")  # Store stats as JSON string
+    stats_json: Optional[str] = Field(default="{}")  # Stats summary as JSON string
+    # Headline numbers as real columns, readable without decoding stats_json
+    vehicles: Optional[int] = None
+    avg_speed: Optional[float] = None
+    congestion_level: Optional[str] = None
 
     # Optional: Convenience method to get dict from JSON string
     @property
@@ -30,11 +82,77 @@ class VideoTask(SQLModel, table=True):
     def stats(self, value: dict):
         self.stats_json = json.dumps(value)
 
+
+class TaskDetail(SQLModel, table=True):
+    """One item of a task's detail list (a window aggregate, a track, ...), paged by `idx`."""
+    task_id: str = Field(primary_key=True)
+    kind: str = Field(primary_key=True)
+    idx: int = Field(primary_key=True)
+    data_json: str = "{}"
+
 # Create the tasks table on startup
-def create_db_and_tables():
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    SQLModel.metadata.create_all(engine)
+def create_db_and_tables(bind: Optional[Engine] = None):
+    bind = bind or engine
+    if bind.url.get_backend_name() == "sqlite" and bind.url.database:
+        os.makedirs(os.path.dirname(bind.url.database) or ".", exist_ok=True)
+    SQLModel.metadata.create_all(bind)
+    # create_all skips columns and indexes added to tables that already exist
+    existing = inspect(bind)
+    with bind.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            columns = {c["name"] for c in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns and column.nullable:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
 
 # Dependency for retrieving a session
 def get_session():
     return Session(engine)
+
+
+def update_task(task_id: str, **values) -> bool:
+    """
+    Set columns of one task with a single UPDATE, without loading the row.
+    `stats` is accepted as a dict. Returns False if there is no such task.
+    """
+    if "stats" in values:
+        values["stats_json"] = json.dumps(values.pop("stats"))
+    with engine.begin() as conn:
+        result = conn.execute(update(VideoTask).where(VideoTask.id == task_id).values(**values))
+    return result.rowcount > 0
+
+
+def get_task_summaries(task_ids: Iterable[str]) -> Dict[str, dict]:
+    """Status and summary columns of many tasks, without loading or decoding stats_json."""
+    task_ids = list(task_ids)
+    if not task_ids:
+        return {}
+    columns = (VideoTask.id, VideoTask.status, VideoTask.progress, VideoTask.processed_path,
+               VideoTask.vehicles, VideoTask.avg_speed, VideoTask.congestion_level)
+    with engine.connect() as conn:
+        rows = conn.execute(select(*columns).where(VideoTask.id.in_(task_ids))).mappings()
+        return {row["id"]: {k: v for k, v in row.items() if k != "id"} for row in rows}
+
+
+def store_details(task_id: str, details: Dict[str, list]):
+    """Replace the task's detail lists, one row per item."""
+    with engine.begin() as conn:
+        conn.execute(delete(TaskDetail).where(TaskDetail.task_id == task_id))
+        rows = [{"task_id": task_id, "kind": kind, "idx": i, "data_json": json.dumps(item)}
+                for kind, items in details.items() for i, item in enumerate(items)]
+        if rows:
+            conn.execute(insert(TaskDetail), rows)
+
+
+def get_details(task_id: str, kind: str, offset: int = 0, limit: int = 100) -> Tuple[List[dict], int]:
+    """One page of a task's detail list, plus the list's total length."""
+    where = (TaskDetail.task_id == task_id, TaskDetail.kind == kind)
+    with engine.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(TaskDetail).where(*where)).scalar() or 0
+        rows = conn.execute(select(TaskDetail.data_json).where(*where)
+                            .order_by(TaskDetail.idx).offset(offset).limit(limit)).scalars()
+        return [json.loads(row) for row in rows], total
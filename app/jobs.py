@@ -0,0 +1,95 @@
+# app/jobs.py
+"""
+The body of a video processing job, shared by the in-process scheduler and
+the Celery tasks: serve it from the result cache or run the model, then
+record the outcome in the database and on the progress channel.
+"""
+import os
+from typing import Optional
+
+from app.database import store_details, update_task
+from app.progress import progress_channel, write_progress
+from app.result_cache import result_cache, result_key
+from app.schemas import split_stats
+from app.uploads import file_sha256
+from src.model.predict import process_video_with_model
+
+RAW_DIR = "SmarTSignalAI/data/raw"
+PROCESSED_DIR = "SmarTSignalAI/data/processed"
+
+
+def relative_path(path):
+    """Path under the data directory served at /data; never a server filesystem path."""
+    if not path:
+        return None
+    marker = "SmarTSignalAI/data/"
+    return path.split(marker, 1)[1] if marker in path else os.path.basename(path)
+
+
+def complete_task(task_id: str, processed_path: Optional[str], stats: dict) -> dict:
+    """
+    Store a finished result: the summary on the task row, the detail lists
+    (windows, tracks) as separate rows. Only then is the task reported
+    completed on the progress channel, with the summary alone. Returns the
+    {"processed_path", "stats"} served by /status.
+    """
+    relative = relative_path(processed_path)
+    summary, details = split_stats(stats)
+    summary = summary.model_dump(exclude_none=True)
+    if summary.get("detections_path"):
+        summary["detections_path"] = relative_path(summary["detections_path"])
+    store_details(task_id, details)
+    update_task(task_id, status="completed", progress=100, processed_path=relative, stats=summary,
+                vehicles=summary["unique_vehicles"], avg_speed=summary["avgSpeed"],
+                congestion_level=summary.get("congestion_level"))
+    result = {"processed_path": relative, "stats": summary}
+    progress_channel.publish(task_id, 100, "completed", result=result)
+    progress_channel.discard(task_id)
+    return result
+
+
+def fail_task(task_id: str):
+    """Mark a task failed, keeping the progress it reached."""
+    live = progress_channel.get(task_id) or {}
+    progress_channel.publish(task_id, live.get("progress", 0), "failed")
+    update_task(task_id, status="failed")
+
+
+def serve_cached(task_id: str, cache_key: str) -> Optional[dict]:
+    """Complete the task from the result cache if possible."""
+    cached = result_cache.get(cache_key)
+    if cached is None:
+        return None
+    print(f"[INFO] Task {task_id} served from the result cache")
+    return complete_task(task_id, cached["processed_path"], cached["stats"])
+
+
+def run_video_job(task_id: str, raw_path: str, enhanced: bool = False, analytics_only: bool = False,
+                  sha256: Optional[str] = None, save_detections: bool = False) -> dict:
+    """
+    Process one uploaded video start to finish. Errors propagate; callers
+    decide on retries. `save_detections` keeps the per-frame detections
+    next to the output (reported as `detections_path`).
+    """
+    sha256 = sha256 or file_sha256(raw_path)
+    cache_key = result_key(sha256, enhanced, analytics_only, save_detections=save_detections)
+    cached = serve_cached(task_id, cache_key)
+    if cached is not None:
+        return cached
+
+    write_progress(task_id, 0, "processing")
+    # Progress is reported by process_video_with_model itself (throttled DB
+    # writes + the progress channel read by /status)
+    processed_path, stats = process_video_with_model(
+        input_path=raw_path,
+        output_dir=PROCESSED_DIR,
+        task_id=task_id,
+        enhanced=enhanced,
+        analytics_only=analytics_only,
+        save_detections=save_detections,
+        use_detection_cache=True,
+        video_sha256=sha256,
+    )
+    result = complete_task(task_id, processed_path, stats)
+    result_cache.put(cache_key, processed_path, stats)
+    return result
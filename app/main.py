@@ -6,7 +6,10 @@ from starlette.middleware.trustedhost import TrustedHostMiddleware
 from pathlib import Path
 
 from app.routes.video import router as video_router
+from src.routes.ml_monitoring import router as ml_router
 from app.database import create_db_and_tables
+from app.jobs import RAW_DIR
+from app.uploads import expire_uploads
 
 app = FastAPI(
     title="SmarTSignalAI Backend",
@@ -51,8 +54,10 @@ else:
 
 # ------------------ API routers ------------------
 app.include_router(video_router, prefix="/api/video", tags=["Video Processing"])
+app.include_router(ml_router, prefix="/api", tags=["ML Monitoring"])
 
 # ------------------ Startup ------------------
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    expire_uploads(RAW_DIR)
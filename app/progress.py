@@ -0,0 +1,255 @@
+# app/progress.py
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from sqlalchemy import func, select, update
+
+from app.database import VideoTask, engine, update_task
+
+try:
+    import redis
+except ImportError:  # Redis is optional; progress then stays in-process
+    redis = None
+
+# Set to share live progress between the API and Celery worker processes
+PROGRESS_REDIS_URL = os.getenv("PROGRESS_REDIS_URL")
+PROGRESS_TTL = 3600  # seconds a task's live progress is kept in Redis
+FINAL_STATUSES = ("completed", "failed")
+
+
+class Subscription:
+    """
+    Mailbox for one listener of a task's updates. It only keeps the newest
+    update, so a slow listener skips intermediate progress instead of
+    queueing it. Updates may arrive from any thread; `next` is awaited on
+    the event loop the subscription was created on.
+    """
+
+    def __init__(self, channel: "ProgressChannel", task_id: str):
+        self.channel = channel
+        self.task_id = task_id
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._latest: Optional[dict] = None
+
+    def _set(self, data: dict):
+        self._latest = data
+        self._event.set()
+
+    def deliver(self, data: dict):
+        try:
+            self._loop.call_soon_threadsafe(self._set, data)
+        except RuntimeError:  # event loop already closed
+            self.close()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """The newest update since the last call, or None after `timeout` seconds."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        data, self._latest = self._latest, None
+        return data
+
+    def close(self):
+        self.channel.unsubscribe(self)
+
+
+class ProgressChannel:
+    """
+    Latest progress per task, kept in memory and mirrored to Redis when
+    configured, so status reads never have to touch the database.
+
+    Updates are also pushed to subscribers: directly in-process, or through
+    Redis pub/sub when configured so updates from Celery workers reach every
+    API process. One listener connection serves all subscribers of a process.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self._local: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if (redis_url and redis is not None) else None
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listener: Optional[threading.Thread] = None
+
+    def publish(self, task_id: str, progress: int, status: Optional[str] = None,
+                insights: Optional[dict] = None, result: Optional[dict] = None):
+        data = {"progress": progress, "status": status, "updated_at": time.time()}
+        if insights is not None:
+            data["insights"] = insights
+        if result is not None:
+            data["result"] = result
+        with self._lock:
+            self._local[task_id] = data
+        if self._redis is not None:
+            try:
+                payload = json.dumps(data)
+                self._redis.set(f"progress:{task_id}", payload, ex=PROGRESS_TTL)
+                self._redis.publish(f"progress:{task_id}", payload)
+                return  # subscribers are reached through the Redis listener
+            except Exception as e:
+                print(f"[WARNING] Could not publish progress for {task_id}: {e}")
+        self._fan_out(task_id, data)
+
+    def _fan_out(self, task_id: str, data: dict):
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for subscription in subscribers:
+            subscription.deliver(data)
+
+    def subscribe(self, task_id: str) -> Subscription:
+        """Start receiving a task's updates; call from a running event loop."""
+        subscription = Subscription(self, task_id)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+            if self._redis is not None and self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="progress-listener", daemon=True)
+                self._listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.task_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.task_id]
+
+    def _listen(self):
+        """Relay Redis pub/sub messages to local subscribers, reconnecting on errors."""
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe("progress:*")
+                for message in pubsub.listen():
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    self._fan_out(channel.split(":", 1)[1], json.loads(message["data"]))
+            except Exception as e:
+                print(f"[WARNING] Progress listener lost Redis, retrying: {e}")
+                time.sleep(1.0)
+
+    def get(self, task_id: str) -> Optional[dict]:
+        with self._lock:
+            data = self._local.get(task_id)
+        if data is None and self._redis is not None:
+            try:
+                raw = self._redis.get(f"progress:{task_id}")
+                data = json.loads(raw) if raw else None
+            except Exception as e:
+                print(f"[WARNING] Could not read progress for {task_id}: {e}")
+        return data
+
+    def discard(self, task_id: str):
+        with self._lock:
+            self._local.pop(task_id, None)
+
+
+progress_channel = ProgressChannel(PROGRESS_REDIS_URL)
+
+
+def write_progress(task_id: str, progress: int, status: Optional[str] = None):
+    """Persist progress with a single UPDATE statement, without loading the row."""
+    values = {"progress": progress}
+    if status:
+        values["status"] = status
+    update_task(task_id, **values)
+
+
+def add_progress(task_id: str, delta: int, status: Optional[str] = None):
+    """
+    Atomically add `delta` percent (capped below 100) to a task's progress,
+    for jobs whose parts finish independently, e.g. parallel video segments.
+    """
+    values = {"progress": func.min(VideoTask.progress + int(delta), 99)}
+    if status:
+        values["status"] = status
+    with engine.begin() as conn:
+        conn.execute(update(VideoTask).where(VideoTask.id == task_id).values(**values))
+        progress = conn.execute(select(VideoTask.progress).where(VideoTask.id == task_id)).scalar()
+    if progress is not None:
+        progress_channel.publish(task_id, progress, status or "processing")
+
+
+class ProgressReporter:
+    """
+    Coalesces progress updates for one task.
+
+    Every change is published to the cheap progress channel; the database
+    is only written when at least `min_interval` seconds and `min_delta`
+    percent have passed since the last write, or when the status changes.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        min_interval: float = 1.0,
+        min_delta: int = 1,
+        channel: ProgressChannel = progress_channel,
+    ):
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.channel = channel
+        self.status: Optional[str] = None
+        self._progress = -1
+        self._written = -1
+        self._last_write = 0.0
+        self._dirty = False
+        self._insights: Optional[dict] = None
+        self._result: Optional[dict] = None
+
+    def update(self, progress: int, status: Optional[str] = None, insights: Optional[dict] = None):
+        """`insights` is an optional live stats snapshot published with the progress (not persisted)."""
+        if not self.task_id:
+            return
+        progress = int(progress)
+        status_changed = status is not None and status != self.status
+        if progress == self._progress and not status_changed:
+            return
+
+        self._progress = progress
+        if status is not None:
+            self.status = status
+        if insights is not None:
+            self._insights = insights
+        self._dirty = True
+        self.channel.publish(self.task_id, progress, self.status, self._insights, self._result)
+
+        now = time.monotonic()
+        if status_changed or (
+            now - self._last_write >= self.min_interval
+            and abs(progress - self._written) >= self.min_delta
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write the latest coalesced progress to the database."""
+        if not self.task_id or not self._dirty:
+            return
+        try:
+            write_progress(self.task_id, self._progress, self.status)
+            self._written = self._progress
+            self._dirty = False
+        except Exception as e:
+            print(f"[WARNING] Could not update progress for {self.task_id}: {e}")
+        self._last_write = time.monotonic()
+
+    def close(self, progress: Optional[int] = None, status: Optional[str] = None,
+              result: Optional[dict] = None):
+        """
+        Flush any pending update; drop the in-memory entry once the task is final.
+        `result` (e.g. output path and stats) is published along with the final status.
+        """
+        self._result = result
+        if progress is not None or status is not None:
+            self.update(self._progress if progress is None else progress, status)
+        self.flush()
+        if self.task_id and self.status in FINAL_STATUSES:
+            self.channel.discard(self.task_id)
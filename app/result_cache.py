@@ -0,0 +1,172 @@
+# app/result_cache.py
+"""
+Cache of finished video results keyed by upload content.
+
+The key is the SHA-256 of the uploaded file plus everything that changes
+the output (model, precision, backend, confidence, enhanced /
+analytics-only), so re-submitting the same clip with the same options
+completes instantly. Each entry is a small JSON file; its mtime doubles as
+the last-used time. Entries, and the outputs they point to (the processed
+video file, a detections directory), are evicted when older than
+`max_age` or, least recently used first, when the cached outputs exceed
+`max_bytes`. An output another entry still points to is kept.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Iterable, Optional
+
+from src.model.detections import directory_size
+from src.model.registry import model_signature
+from src.model.yolo_utils import DEFAULT_CONFIDENCE
+
+RESULT_CACHE_DIR = os.path.join("SmarTSignalAI", "data", "cache", "results")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))  # 20 GiB
+RESULT_CACHE_MAX_AGE = float(os.getenv("RESULT_CACHE_MAX_AGE_DAYS", "30")) * 86400
+CACHE_VERSION = 1  # bump when the pipeline output changes for the same inputs
+
+
+def result_key(content_sha256: str, enhanced: bool = False, analytics_only: bool = False,
+               confidence: float = DEFAULT_CONFIDENCE, save_detections: bool = False) -> str:
+    """Cache key for one upload processed with the default model and the given options."""
+    options = {
+        "sha256": content_sha256,
+        "model": model_signature(),
+        "confidence": confidence,
+        "enhanced": bool(enhanced),
+        "analytics_only": bool(analytics_only),
+        "version": CACHE_VERSION,
+    }
+    if save_detections:  # only then does the result own a detections directory
+        options["save_detections"] = True
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()
+
+
+def _output_files(entry: dict):
+    """Outputs an entry owns: the processed video and, when saved, its detections directory."""
+    stats = entry.get("stats") or {}
+    return [p for p in (entry.get("processed_path"), stats.get("detections_path")) if p]
+
+
+def _output_size(path: str) -> int:
+    if os.path.isdir(path):
+        return directory_size(path)
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return 0
+
+
+def _delete_output(path: str):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"[WARNING] Result cache could not delete {path}: {e}")
+
+
+class ResultCache:
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 max_age: float = RESULT_CACHE_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read(self, path: str) -> Optional[dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, key: str) -> Optional[dict]:
+        """{"processed_path", "stats"} for a cached result, or None."""
+        path = self._entry_path(key)
+        entry = self._read(path)
+        if entry is None:
+            return None
+        expired = time.time() - entry.get("created_at", 0) > self.max_age
+        if expired or not all(os.path.exists(p) for p in _output_files(entry)):
+            self._remove(path, entry, self._outputs_in_use(exclude=path))
+            return None
+        os.utime(path)  # mark as recently used
+        return {"processed_path": entry.get("processed_path"), "stats": entry.get("stats") or {}}
+
+    def put(self, key: str, processed_path: Optional[str], stats: dict):
+        """Remember a finished result, then evict to stay within the limits."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = {"processed_path": processed_path, "stats": stats, "created_at": time.time()}
+        entry["size"] = sum(_output_size(p) for p in _output_files(entry))
+        tmp_path = f"{self._entry_path(key)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._entry_path(key))
+        self.evict()
+
+    def _outputs_in_use(self, exclude: Optional[str] = None) -> set:
+        """Outputs referenced by any entry but `exclude`."""
+        in_use = set()
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if name.endswith(".json") and path != exclude:
+                    in_use.update(_output_files(self._read(path) or {}))
+        return in_use
+
+    def _remove(self, path: str, entry: dict, in_use: Iterable[str] = ()):
+        """Delete an entry and the outputs no other entry (`in_use`) still points to."""
+        in_use = set(in_use)
+        for output in _output_files(entry):
+            if output not in in_use:
+                _delete_output(output)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones over `max_bytes`; returns how many."""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            entry = self._read(path)
+            if entry is None:
+                continue
+            try:
+                last_used = os.path.getmtime(path)
+            except OSError:
+                continue
+            entries.append((last_used, path, entry))
+
+        total = 0
+        kept, dropped = [], []
+        for last_used, path, entry in sorted(entries, key=lambda e: e[0], reverse=True):
+            if now - entry.get("created_at", 0) > self.max_age or total + entry.get("size", 0) > self.max_bytes:
+                dropped.append((path, entry))
+            else:
+                total += entry.get("size", 0)
+                kept.append((path, entry))
+        in_use = {output for _, entry in kept for output in _output_files(entry)}
+        for path, entry in dropped:
+            self._remove(path, entry, in_use)
+        removed = len(dropped)
+        if removed:
+            print(f"[INFO] Result cache evicted {removed} entr{'y' if removed == 1 else 'ies'}, "
+                  f"{len(kept)} kept ({total / 1024 ** 2:.1f} MB)")
+        return removed
+
+
+result_cache = ResultCache()
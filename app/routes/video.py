@@ -1,105 +1,204 @@
 # app/routes/video.py
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
-from app.database import VideoTask, get_session
-from src.model.predict import process_video_with_model
-from sqlmodel import select
-import os, shutil, uuid, threading
-import time
+from fastapi import APIRouter, Form, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional
+from app.database import VideoTask, get_details, get_session, get_task_summaries
+from app.jobs import RAW_DIR, relative_path as _relative_path, serve_cached
+from app.progress import progress_channel, FINAL_STATUSES
+from app.result_cache import result_key
+from app.schemas import DETAIL_KINDS, DetailPage, TaskStatus, TaskSummary
+from app.uploads import (
+    MAX_FORM_FIELD_BYTES, MAX_UPLOAD_BYTES, ResumableUpload, UploadConflict, UploadTooLarge,
+    expire_uploads, safe_extension, save_multipart_upload,
+)
+from app.scheduler import PRIORITIES, SchedulerFull, get_scheduler
+import asyncio, os, time, uuid, json
 
 router = APIRouter()
 
-RAW_DIR = "SmarTSignalAI/data/raw"
-PROCESSED_DIR = "SmarTSignalAI/data/processed"
+SSE_KEEPALIVE = 15  # seconds between keep-alive comments on idle event streams
+MAX_STATUS_IDS = 500  # task IDs accepted by one bulk status request
+MAX_DETAIL_PAGE = 1000  # detail items returned per page
+SCHEDULER_RETRY_AFTER = 30  # seconds clients are asked to wait when the job queue is full
+UPLOAD_SWEEP_INTERVAL = 3600  # seconds between sweeps for abandoned uploads
+_last_upload_sweep = 0.0
 
-# ---------------- Video Processing Endpoint ----------------
-@router.post("/process_video/")
-async def process_video(file: UploadFile = File(...), enhanced: str = Form("false")):
-    uid = str(uuid.uuid4())
-    task_id = str(uuid.uuid4())
-    ext = file.filename.split(".")[-1]
-    raw_path = os.path.join(RAW_DIR, f"{uid}.{ext}")
-
-    os.makedirs(RAW_DIR, exist_ok=True)
 
-    # Save uploaded file
-    with open(raw_path, "wb") as buf:
-        shutil.copyfileobj(file.file, buf)
+# ---------------- Video Processing ----------------
+def _start_processing(raw_path: str, filename: str, enhanced: bool, analytics_only: bool, sha256: str,
+                      priority: str = "normal", save_detections: bool = False) -> str:
+    """
+    Register a task for an uploaded file and hand it to the job scheduler,
+    or complete it at once when the same content was already processed
+    with the same model and options. An unknown priority rejects the
+    upload (400), a full queue too (503).
+    """
+    if priority not in PRIORITIES:
+        os.remove(raw_path)
+        raise HTTPException(400, f"Unknown priority {priority!r}, expected one of {', '.join(PRIORITIES)}")
+    task_id = str(uuid.uuid4())
+    cache_key = result_key(sha256, enhanced, analytics_only, save_detections=save_detections)
 
     # Save task in DB as queued
     with get_session() as session:
-        task = VideoTask(id=task_id, filename=file.filename, status="queued", progress=0)
+        task = VideoTask(id=task_id, filename=filename, status="queued", progress=0)
         session.add(task)
         session.commit()
 
-    # ---------------- Background Processing ----------------
-    progress_dict = {task_id: {"progress": 0}}
+    if serve_cached(task_id, cache_key) is not None:
+        os.remove(raw_path)  # duplicate of an upload we already have results for
+        print(f"[INFO] Result cache hit for {filename} ({sha256[:12]}), task {task_id} completed")
+        return task_id
 
-    def background_task():
-        try:
-            # Mark task as processing
-            with get_session() as session:
-                task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-                if task:
-                    task.status = "processing"
-                    session.add(task)
-                    session.commit()
-
-            # Process video
-            processed_path, stats = process_video_with_model(
-                input_path=raw_path,
-                output_dir=PROCESSED_DIR,
-                progress_store=progress_dict,
-                task_id=task_id,
-                enhanced=enhanced.lower() == "true"
-            )
-
-            # Final DB update: completed
-            with get_session() as session:
-                task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-                if task:
-                    task.status = "completed"
-                    task.progress = 100
-                    task.processed_path = processed_path.replace("SmarTSignalAI/data/", "")
-                    task.stats = stats
-                    session.add(task)
-                    session.commit()
-
-        except Exception as e:
-            print(f"[ERROR] Video task {task_id} failed: {e}")
-            with get_session() as session:
-                task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-                if task:
-                    task.status = "failed"
-                    session.add(task)
-                    session.commit()
-
-    # ---------------- Progress Updater ----------------
-    def progress_updater():
-        while True:
-            time.sleep(1)  # update every 1 second
-            current_progress = progress_dict.get(task_id, {}).get("progress", 0)
-            with get_session() as session:
-                task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-                if task and task.status == "processing":
-                    task.progress = current_progress
-                    session.add(task)
-                    session.commit()
-            if current_progress >= 100:
-                break
-
-    # Start background threads
-    threading.Thread(target=background_task, daemon=True).start()
-    threading.Thread(target=progress_updater, daemon=True).start()
-
-    return JSONResponse({"task_id": task_id})
+    # Queued by priority and run when a worker slot is free (in-process or on Celery)
+    try:
+        get_scheduler().submit(task_id, raw_path, enhanced, analytics_only, sha256, priority, save_detections)
+    except SchedulerFull as e:
+        with get_session() as session:
+            task = session.get(VideoTask, task_id)
+            if task:
+                session.delete(task)
+                session.commit()
+        os.remove(raw_path)
+        print(f"[WARNING] Rejected {filename}: {e}")
+        raise HTTPException(503, "Too many videos are waiting to be processed, retry later",
+                            headers={"Retry-After": str(SCHEDULER_RETRY_AFTER)})
+    return task_id
+
+
+# ---------------- Video Processing Endpoint ----------------
+@router.post("/process_video/", openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {
+    "schema": {"type": "object", "required": ["file"], "properties": {
+        "file": {"type": "string", "format": "binary"},
+        "enhanced": {"type": "string", "default": "false"},
+        "analytics_only": {"type": "string", "default": "false"},
+        "priority": {"type": "string", "default": "normal"},
+        "save_detections": {"type": "string", "default": "false"},
+    }}}}}})
+async def process_video(request: Request):
+    # Oversized bodies are refused before any byte is read when the client declares their length
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES + MAX_FORM_FIELD_BYTES:
+        raise HTTPException(413, f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit")
+
+    os.makedirs(RAW_DIR, exist_ok=True)
+    incoming = os.path.join(RAW_DIR, f"{uuid.uuid4()}.incoming")
+
+    # Parse the multipart body as it streams in: the file part goes straight
+    # to disk off the event loop, capped in size and hashed on the way
+    try:
+        size, sha256, filename, fields = await save_multipart_upload(
+            request.headers.get("content-type", ""), request.stream(), incoming, max_bytes=MAX_UPLOAD_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    raw_path = os.path.join(RAW_DIR, f"{os.path.basename(incoming)[:-len('.incoming')]}.{safe_extension(filename)}")
+    os.replace(incoming, raw_path)
+    # Database writes, the result cache and the scheduler (a broker round trip on Celery) run off the loop
+    task_id = await asyncio.to_thread(_start_processing, raw_path, filename,
+                                      fields.get("enhanced", "false").lower() == "true",
+                                      fields.get("analytics_only", "false").lower() == "true", sha256,
+                                      fields.get("priority", "normal"),
+                                      fields.get("save_detections", "false").lower() == "true")
+    return JSONResponse({"task_id": task_id, "size": size, "sha256": sha256})
+
+
+# ---------------- Resumable Upload Endpoints ----------------
+# POST /uploads/ -> upload_id; PATCH /uploads/{id} with the raw bytes and an
+# Upload-Offset header (repeat to resume); POST /uploads/{id}/complete to
+# verify and start processing. Bodies are streamed straight into RAW_DIR.
+def _load_upload(upload_id: str) -> ResumableUpload:
+    upload = ResumableUpload.load(RAW_DIR, upload_id)
+    if upload is None:
+        raise HTTPException(404, "Upload not found")
+    return upload
+
+
+@router.post("/uploads/")
+async def create_upload(
+    filename: str = Form(...),
+    size: Optional[int] = Form(None),
+    sha256: Optional[str] = Form(None),
+):
+    global _last_upload_sweep
+    if time.monotonic() - _last_upload_sweep > UPLOAD_SWEEP_INTERVAL:
+        _last_upload_sweep = time.monotonic()
+        await asyncio.to_thread(expire_uploads, RAW_DIR)
+    try:
+        upload = ResumableUpload.create(RAW_DIR, filename, size, sha256)
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e))
+    return {"upload_id": upload.upload_id, "offset": 0, "max_bytes": MAX_UPLOAD_BYTES}
+
+
+@router.head("/uploads/{upload_id}")
+async def upload_offset(upload_id: str):
+    upload = _load_upload(upload_id)
+    return Response(headers={"Upload-Offset": str(upload.offset)})
+
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload(upload_id: str, request: Request, upload_offset: int = Header(0)):
+    upload = _load_upload(upload_id)
+    try:
+        offset = await upload.append(request.stream(), upload_offset)
+    except UploadConflict as e:
+        raise HTTPException(409, str(e), headers={"Upload-Offset": str(upload.offset)})
+    except UploadTooLarge as e:
+        raise HTTPException(413, str(e), headers={"Upload-Offset": str(upload.offset)})
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    enhanced: str = Form("false"),
+    analytics_only: str = Form("false"),
+    priority: str = Form("normal"),
+    save_detections: str = Form("false"),
+):
+    upload = _load_upload(upload_id)
+    try:
+        raw_path, size, sha256 = await upload.finish()
+    except UploadConflict as e:
+        raise HTTPException(409, str(e), headers={"Upload-Offset": str(upload.offset)})
+
+    task_id = await asyncio.to_thread(_start_processing, raw_path, upload.filename, enhanced.lower() == "true",
+                                      analytics_only.lower() == "true", sha256, priority,
+                                      save_detections.lower() == "true")
+    return {"task_id": task_id, "size": size, "sha256": sha256}
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str):
+    _load_upload(upload_id).abort()
+    return Response(status_code=204)
+
+
+# ---------------- Scheduler Endpoint ----------------
+@router.get("/scheduler")
+async def scheduler_stats():
+    """Queue depth and worker slots of the job scheduler."""
+    return await asyncio.to_thread(get_scheduler().stats)
 
 
 # ---------------- Task Status Endpoint ----------------
-@router.get("/status/{task_id}")
-async def get_status(task_id: str):
+def _live_status(live: dict) -> dict:
+    """Status response built from a progress channel update."""
+    result = live.get("result") or {}
+    return {
+        "status": live.get("status") or "processing",
+        "progress": live["progress"],
+        "processed_path": _relative_path(result.get("processed_path")),
+        "stats": result.get("stats") or live.get("insights") or {}  # the stored summary once completed
+    }
+
+
+def _stored_status(task_id: str) -> dict:
     with get_session() as session:
-        task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
+        task = session.get(VideoTask, task_id)
         if not task:
             raise HTTPException(404, "Task not found")
         return {
@@ -108,3 +207,104 @@ async def get_status(task_id: str):
             "processed_path": task.processed_path,
             "stats": task.stats
         }
+
+
+def _live_summary(live: dict) -> dict:
+    status = _live_status(live)
+    stats = status.pop("stats")
+    return TaskSummary(
+        **status,
+        vehicles=stats.get("vehicles", stats.get("unique_vehicles")),
+        avg_speed=stats.get("avg_speed_kmh", stats.get("avgSpeed")),
+        congestion_level=stats.get("congestion_level"),
+    ).model_dump()
+
+
+@router.get("/status")
+async def get_statuses(ids: str = Query(..., description="Comma-separated task IDs")):
+    """
+    Status and headline numbers of many tasks at once, keyed by task ID:
+    running tasks come from the progress channel, the rest from one
+    primary-key query over the summary columns (stats_json is not read).
+    Unknown IDs are listed under "missing".
+    """
+    task_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if len(task_ids) > MAX_STATUS_IDS:
+        raise HTTPException(400, f"At most {MAX_STATUS_IDS} task IDs per request")
+
+    statuses = {}
+    for task_id in task_ids:
+        live = progress_channel.get(task_id)
+        if live and live.get("status") not in FINAL_STATUSES:
+            statuses[task_id] = _live_summary(live)
+    statuses.update(await asyncio.to_thread(get_task_summaries, [i for i in task_ids if i not in statuses]))
+    return {
+        "tasks": {task_id: statuses[task_id] for task_id in task_ids if task_id in statuses},
+        "missing": [task_id for task_id in task_ids if task_id not in statuses],
+    }
+
+
+@router.get("/status/{task_id}", response_model=TaskStatus)
+async def get_status(task_id: str):
+    # Running tasks are served from the progress channel without touching SQLite
+    live = progress_channel.get(task_id)
+    if live and live.get("status") not in FINAL_STATUSES:
+        return _live_status(live)
+    return _stored_status(task_id)
+
+
+# ---------------- Task Details Endpoint ----------------
+@router.get("/tasks/{task_id}/details/{kind}", response_model=DetailPage)
+async def get_task_details(
+    task_id: str,
+    kind: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_DETAIL_PAGE),
+):
+    """
+    One page of a finished task's detail list: "windows" (per-window
+    aggregates) or "tracks" (per-vehicle rows). The summary in /status
+    gives each list's length under `stats.details`.
+    """
+    if kind not in DETAIL_KINDS:
+        raise HTTPException(404, f"Unknown detail kind {kind!r}, expected one of {', '.join(DETAIL_KINDS)}")
+    items, total = await asyncio.to_thread(get_details, task_id, kind, offset, limit)
+    if not total and not await asyncio.to_thread(get_task_summaries, [task_id]):
+        raise HTTPException(404, "Task not found")
+    return DetailPage(task_id=task_id, kind=kind, offset=offset, limit=limit, total=total, items=items)
+
+
+# ---------------- Task Events Endpoint (SSE) ----------------
+@router.get("/events/{task_id}")
+async def task_events(task_id: str):
+    """
+    Server-sent events with the same payload as /status, pushed on every
+    progress update until the task completes or fails. Subscribers are fed
+    from the progress channel; SQLite is read at most once, for tasks that
+    are not live in this process.
+    """
+    subscription = progress_channel.subscribe(task_id)  # before the snapshot, so nothing is missed
+    live = progress_channel.get(task_id)
+    try:
+        current = _live_status(live) if live else _stored_status(task_id)
+    except HTTPException:
+        subscription.close()
+        raise
+
+    async def stream():
+        status = current
+        try:
+            while True:
+                if status is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: status\ndata: {json.dumps(status)}\n\n"
+                    if status["status"] in FINAL_STATUSES:
+                        return
+                update = await subscription.next(timeout=SSE_KEEPALIVE)
+                status = _live_status(update) if update else None
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
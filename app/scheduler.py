@@ -0,0 +1,218 @@
+# app/scheduler.py
+"""
+One entry point for running video jobs, in-process or through Celery.
+
+Both backends apply the same admission control: at most `max_queued` jobs
+may wait, further submissions raise `SchedulerFull` (the API answers 503)
+instead of piling up. The local limit is exact; the Celery one is
+approximate (see `CeleryScheduler`). Jobs run by priority, then in arrival order, and a
+node runs as many at once as its cores and memory allow (`node_concurrency`),
+so a burst of uploads queues up rather than starting one model run each.
+
+The backend is picked with SCHEDULER_BACKEND ("local" or "celery").
+"""
+import heapq
+import itertools
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.jobs import fail_task, run_video_job
+from src.model.metrics import metrics
+
+SCHEDULER_BACKEND = os.getenv("SCHEDULER_BACKEND", "local")
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "32"))
+JOB_CPUS = int(os.getenv("JOB_CPUS", "2"))  # cores one model run keeps busy
+JOB_MEMORY_MB = int(os.getenv("JOB_MEMORY_MB", "2048"))  # peak memory of one model run
+# Celery's Redis transport serves 0 first
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+
+class SchedulerFull(Exception):
+    """The job queue is at capacity; the client should retry later."""
+
+
+def available_memory() -> Optional[int]:
+    """Bytes of memory available for new work, or None if unknown."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def node_concurrency() -> int:
+    """Jobs one node should run at once: WORKER_CONCURRENCY, else sized to cores and memory."""
+    if os.getenv("WORKER_CONCURRENCY"):
+        return max(1, int(os.environ["WORKER_CONCURRENCY"]))
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cpus // max(JOB_CPUS, 1)
+    memory = available_memory()
+    if memory is not None:
+        limit = min(limit, memory // (JOB_MEMORY_MB * 1024 ** 2))
+    return max(1, limit)
+
+
+def _priority(priority: str) -> int:
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}, expected one of {', '.join(PRIORITIES)}")
+    return PRIORITIES[priority]
+
+
+class LocalScheduler:
+    """Runs jobs on a fixed pool of threads in this process, fed by a bounded priority queue."""
+
+    backend = "local"
+
+    def __init__(self, concurrency: Optional[int] = None, max_queued: int = MAX_QUEUED_JOBS,
+                 job: Callable[..., dict] = run_video_job):
+        self.concurrency = concurrency or node_concurrency()
+        self.max_queued = max_queued
+        self.job = job
+        self.running = 0
+        self._queue: List[tuple] = []  # (priority, seq, kwargs)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._stopped = False
+
+    def submit(self, task_id: str, raw_path: str, enhanced: bool = False, analytics_only: bool = False,
+               sha256: Optional[str] = None, priority: str = "normal", save_detections: bool = False):
+        job = {"task_id": task_id, "raw_path": raw_path, "enhanced": enhanced,
+               "analytics_only": analytics_only, "sha256": sha256, "save_detections": save_detections}
+        rank = _priority(priority)
+        with self._cond:
+            if len(self._queue) >= self.max_queued:
+                raise SchedulerFull(f"{len(self._queue)} jobs are already queued")
+            heapq.heappush(self._queue, (rank, next(self._seq), job))
+            self._report()
+            # Workers start on first use, so importing the app spawns nothing
+            while len(self._workers) < self.concurrency:
+                worker = threading.Thread(target=self._work, daemon=True,
+                                          name=f"scheduler-{len(self._workers)}")
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                self.running += 1
+                self._report()
+            try:
+                self.job(**job)
+            except Exception as e:
+                print(f"[ERROR] Video task {job['task_id']} failed: {e}")
+                fail_task(job["task_id"])
+            finally:
+                with self._cond:
+                    self.running -= 1
+                    self._report()
+                    self._cond.notify_all()
+
+    def _report(self):
+        """Publish queue depth and worker utilization to the pipeline metrics (lock held)."""
+        metrics.set_gauge("queue_scheduler", len(self._queue))
+        metrics.set_gauge("workers_busy", self.running)
+        metrics.set_gauge("workers_total", self.concurrency)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted job has finished; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self.running, timeout)
+
+    def shutdown(self):
+        """Stop the workers once their current job is done; queued jobs are dropped."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {"backend": self.backend, "concurrency": self.concurrency, "running": self.running,
+                    "queued": len(self._queue), "max_queued": self.max_queued}
+
+
+def _count_broker_queue() -> int:
+    """Messages waiting in the Celery broker's default queue (reserved or running tasks are not counted)."""
+    from app.celery_app import celery
+
+    with celery.connection_for_read() as conn:
+        try:
+            return conn.default_channel.queue_declare(queue=celery.conf.task_default_queue,
+                                                      passive=True).message_count
+        except conn.channel_errors:  # not declared yet: nothing was ever sent
+            return 0
+
+
+class CeleryScheduler:
+    """
+    Sends jobs to Celery workers as prioritized `process_video_task`s. The
+    workers' concurrency comes from `node_concurrency` (see app.celery_app).
+
+    Admission counts the messages waiting in the broker, so tasks that
+    crashed or were lost never hold a slot. The limit is approximate:
+    submissions are serialized within one API process, but separate
+    processes may each pass the check at once and overshoot it slightly.
+    """
+
+    backend = "celery"
+
+    def __init__(self, max_queued: int = MAX_QUEUED_JOBS,
+                 queued_count: Callable[[], int] = _count_broker_queue):
+        self.max_queued = max_queued
+        self.queued_count = queued_count
+        self._lock = threading.Lock()
+
+    def submit(self, task_id: str, raw_path: str, enhanced: bool = False, analytics_only: bool = False,
+               sha256: Optional[str] = None, priority: str = "normal", save_detections: bool = False):
+        # Imported here: the task module imports the Celery app, which imports this module
+        from app.tasks.video_tasks import process_video_task
+
+        rank = _priority(priority)
+        with self._lock:
+            queued = self.queued_count()
+            if queued >= self.max_queued:
+                raise SchedulerFull(f"{queued} jobs are already queued")
+            process_video_task.apply_async(
+                args=(task_id, raw_path, enhanced, analytics_only, sha256, save_detections),
+                task_id=task_id,
+                priority=rank,
+            )
+
+    def stats(self) -> Dict[str, object]:
+        return {"backend": self.backend, "queued": self.queued_count(), "max_queued": self.max_queued}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler for SCHEDULER_BACKEND."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            if SCHEDULER_BACKEND == "celery":
+                _scheduler = CeleryScheduler()
+            elif SCHEDULER_BACKEND == "local":
+                _scheduler = LocalScheduler()
+            else:
+                raise ValueError(f"Unknown SCHEDULER_BACKEND {SCHEDULER_BACKEND!r}, expected local or celery")
+        return _scheduler
@@ -1,4 +1,75 @@
-from pydantic import BaseModel
+# app/schemas.py
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ConfigDict
+
+# Stats entries that grow with video length; stored and served apart from the summary
+DETAIL_KINDS = ("windows", "tracks")
+
 
 class ProcessedVideoResponse(BaseModel):
     processed_path: str
+
+
+class TrafficInsightsSummary(BaseModel):
+    density: Dict[str, float] = {}
+    congestion_level: Optional[str] = None
+
+
+class StatsSummary(BaseModel):
+    """Summary of a finished task, small enough to return on every status poll."""
+    model_config = ConfigDict(extra="allow")  # keep keys added by newer pipeline versions
+
+    car: int = 0
+    bus: int = 0
+    truck: int = 0
+    motorbike: int = 0
+    bicycle: int = 0
+    avgSpeed: float = 0.0
+    unique_vehicles: int = 0
+    moving_vehicles: int = 0
+    idle_vehicles: int = 0
+    total_frames: int = 0
+    inferred_frames: int = 0
+    avg_density: float = 0.0
+    congestion_level: Optional[str] = None
+    traffic_insights: Optional[TrafficInsightsSummary] = None
+    detections_path: Optional[str] = None
+    segments: Optional[int] = None
+    stitched_tracks: Optional[int] = None
+    details: Dict[str, int] = {}  # detail kind -> number of items, see DetailPage
+
+
+class TaskStatus(BaseModel):
+    status: str
+    progress: int
+    processed_path: Optional[str] = None
+    stats: Dict[str, Any] = {}
+
+
+class TaskSummary(BaseModel):
+    """Status plus the natively stored summary columns, as returned by the bulk status query."""
+    status: str
+    progress: int
+    processed_path: Optional[str] = None
+    vehicles: Optional[int] = None
+    avg_speed: Optional[float] = None
+    congestion_level: Optional[str] = None
+
+
+class DetailPage(BaseModel):
+    task_id: str
+    kind: str
+    offset: int
+    limit: int
+    total: int
+    items: List[Dict[str, Any]]
+
+
+def split_stats(stats: Optional[dict]) -> Tuple[StatsSummary, Dict[str, list]]:
+    """Split pipeline stats into the typed summary and the large detail lists."""
+    stats = dict(stats or {})
+    stats.pop("segment", None)  # only used to merge segments
+    details = {kind: stats.pop(kind) for kind in DETAIL_KINDS if isinstance(stats.get(kind), list)}
+    stats["details"] = {kind: len(items) for kind, items in details.items()}
+    return StatsSummary.model_validate(stats), details
@@ -1,74 +1,142 @@
 # app/tasks/video_tasks.py
 import os
+import shutil
 import traceback
+import uuid
+import cv2
+from celery import chord
+from src.model.detections import merge_detections
 from src.model.predict import process_video_with_model
-from app.database import VideoTask, get_session
-from sqlmodel import select
+from src.model.encoder import concat_videos
+from src.model.segments import keyframe_indices, merge_segment_stats, plan_segments, segment_count
+from app.jobs import PROCESSED_DIR, RAW_DIR, complete_task, fail_task, run_video_job, serve_cached
+from app.progress import add_progress, write_progress
+from app.result_cache import result_cache, result_key
+from app.uploads import file_sha256
 from app.celery_app import celery
+from celery.signals import worker_process_init
+from src.model.registry import get_model
 
-# Define directories
-RAW_DIR = "SmarTSignalAI/data/raw"
-PROCESSED_DIR = "SmarTSignalAI/data/processed"
+# Videos longer than this many seconds are split and processed by several workers
+SEGMENT_SECONDS = float(os.getenv("SEGMENT_SECONDS", "300"))
+MAX_SEGMENTS = int(os.getenv("MAX_SEGMENTS", "8"))
 
 os.makedirs(RAW_DIR, exist_ok=True)
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
 
+def _plan_video_segments(raw_path: str, analytics_only: bool):
+    """(start, end) frame ranges to process in parallel, or [] to process the video whole."""
+    # Rendered segments are joined by ffmpeg, so without it only stats can be split
+    if SEGMENT_SECONDS <= 0 or MAX_SEGMENTS < 2 or (not analytics_only and not shutil.which("ffmpeg")):
+        return []
+    cap = cv2.VideoCapture(raw_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    n = segment_count(total_frames, fps, SEGMENT_SECONDS, MAX_SEGMENTS)
+    if n < 2:
+        return []
+    return plan_segments(total_frames, n, keyframe_indices(raw_path, fps))
+
+
+@worker_process_init.connect
+def preload_model(**kwargs):
+    """Load the default model once per worker process instead of on the first task."""
+    try:
+        get_model()
+    except Exception as e:
+        print(f"[CELERY] Could not preload model, it will load on first use: {e}")
+
+
 @celery.task(bind=True, max_retries=3, default_retry_delay=5)
-def process_video_task(self, task_id: str, raw_path: str, enhanced: bool = False):
+def process_video_task(self, task_id: str, raw_path: str, enhanced: bool = False, analytics_only: bool = False,
+                       sha256: str = None, save_detections: bool = False):
     """
-    Celery task to process a video in the background.
-    It updates progress live via predict.py and handles retries safely.
+    Celery task to process a video in the background (see `app.jobs.run_video_job`),
+    retried up to 3 times. Videos longer than `SEGMENT_SECONDS`
+    are split into segments processed by a chord of `process_segment_task`s.
     """
 
     print(f"[CELERY] Starting background task for video: {task_id}")
 
     try:
-        # --- Step 1: Mark task as 'processing' in DB ---
-        with get_session() as session:
-            task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-            if task:
-                task.status = "processing"
-                task.progress = 0
-                session.add(task)
-                session.commit()
-
-        # --- Step 2: Process video (this function updates DB progress internally) ---
-        processed_path, stats = process_video_with_model(
-            input_path=raw_path,
-            output_dir=PROCESSED_DIR,
-            task_id=task_id,
-            enhanced=enhanced,
-        )
+        sha256 = sha256 or file_sha256(raw_path)
+        cache_key = result_key(sha256, enhanced, analytics_only, save_detections=save_detections)
+        cached = serve_cached(task_id, cache_key)
+        if cached is not None:
+            return cached
 
-        relative_path = processed_path.replace("SmarTSignalAI/data/", "")
-
-        # --- Step 3: Mark task as completed ---
-        with get_session() as session:
-            task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-            if task:
-                task.status = "completed"
-                task.progress = 100
-                task.processed_path = relative_path
-                task.stats = stats
-                session.add(task)
-                session.commit()
+        # Long videos are split into keyframe-aligned segments processed in parallel
+        segments = _plan_video_segments(raw_path, analytics_only)
+        if len(segments) > 1:
+            write_progress(task_id, 0, "processing")
+            total = segments[-1][1]
+            chord(
+                process_segment_task.s(task_id, raw_path, start, end, 99 * (end - start) // total,
+                                       enhanced, analytics_only, save_detections)
+                for start, end in segments
+            )(merge_segments_task.s(task_id, cache_key, analytics_only).on_error(mark_task_failed.si(task_id)))
+            print(f"[CELERY] Split task {task_id} into {len(segments)} segments")
+            return {"segments": len(segments)}
 
+        result = run_video_job(task_id, raw_path, enhanced, analytics_only, sha256, save_detections)
         print(f"[CELERY] ✅ Completed task {task_id}")
-        return {"processed_path": relative_path, "stats": stats}
+        return result
 
     except Exception as e:
         print(f"[CELERY] ❌ Task {task_id} failed: {e}")
         traceback.print_exc()
 
-        # --- Step 4: Update DB to failed ---
-        with get_session() as session:
-            task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-            if task:
-                task.status = "failed"
-                task.progress = 0
-                session.add(task)
-                session.commit()
+        fail_task(task_id)
 
         # Retry up to 3 times
         raise self.retry(exc=e)
+
+
+@celery.task(bind=True, max_retries=3, default_retry_delay=5)
+def process_segment_task(self, task_id: str, raw_path: str, start_frame: int, end_frame: int,
+                         weight: int, enhanced: bool = False, analytics_only: bool = False,
+                         save_detections: bool = False):
+    """Process frames [start_frame, end_frame) of a split video; part of a chord."""
+    try:
+        processed_path, stats = process_video_with_model(
+            input_path=raw_path,
+            output_dir=PROCESSED_DIR,
+            enhanced=enhanced,
+            analytics_only=analytics_only,
+            save_detections=save_detections,
+            segment=(start_frame, end_frame),
+        )
+    except Exception as e:
+        print(f"[CELERY] ❌ Segment {start_frame}-{end_frame} of task {task_id} failed: {e}")
+        raise self.retry(exc=e)
+    add_progress(task_id, weight)
+    return {"processed_path": processed_path, "stats": stats}
+
+
+@celery.task
+def merge_segments_task(results: list, task_id: str, cache_key: str, analytics_only: bool = False):
+    """Chord callback: stitch the segment stats and join the rendered segments or saved detections."""
+    results = sorted(results, key=lambda r: r["stats"]["segment"]["start_frame"])
+    stats = merge_segment_stats([r["stats"] for r in results])
+    parts = [r["stats"]["detections_path"] for r in results if r["stats"].get("detections_path")]
+    if parts:
+        # "<name>_detections_<start>-<end>" -> "<name>_detections"
+        stats["detections_path"] = merge_detections(parts, parts[0].rsplit("_", 1)[0])
+    processed_path = None
+    if not analytics_only:
+        processed_path = concat_videos([r["processed_path"] for r in results],
+                                       os.path.join(PROCESSED_DIR, f"{uuid.uuid4().hex}_processed.mp4"))
+
+    result = complete_task(task_id, processed_path, stats)
+    result_cache.put(cache_key, processed_path, stats)
+    print(f"[CELERY] ✅ Completed task {task_id} from {len(results)} segments")
+    return result
+
+
+@celery.task
+def mark_task_failed(task_id: str):
+    """Chord error callback."""
+    print(f"[CELERY] ❌ Task {task_id} failed in a segment")
+    fail_task(task_id)
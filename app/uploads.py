@@ -0,0 +1,288 @@
+# app/uploads.py
+"""
+Upload storage helpers.
+
+Uploads are written to disk in chunks on a worker thread, so large files
+never block the event loop, and their size is capped and SHA-256 computed
+as the bytes go by. Multipart bodies are parsed as they stream in, so the
+file part is written once, straight to its destination. `ResumableUpload`
+keeps a `.part` file plus a small JSON sidecar, so an interrupted upload
+can continue from the last byte written, even after a restart; uploads
+left unfinished for `UPLOAD_TTL` are removed by `expire_uploads`.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(4 * 1024 ** 3)))  # 4 GiB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_FORM_FIELD_BYTES = 64 * 1024  # total size of the non-file parts of a multipart upload
+UPLOAD_TTL = float(os.getenv("UPLOAD_TTL_HOURS", "24")) * 3600  # unfinished uploads are removed after this
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UploadConflict(Exception):
+    """The client's offset or checksum does not match what is stored."""
+
+
+def safe_extension(filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    return ext if re.fullmatch(r"[a-z0-9]{1,8}", ext) else "bin"
+
+
+def _write_chunk(f, hasher, chunk: bytes):
+    f.write(chunk)
+    hasher.update(chunk)
+
+
+async def write_chunks(chunks: AsyncIterator[bytes], f, hasher, written: int = 0,
+                       max_bytes: int = MAX_UPLOAD_BYTES) -> int:
+    """Append `chunks` to the open file `f`, hashing as we go; returns the new size."""
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        written += len(chunk)
+        if written > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+        await asyncio.to_thread(_write_chunk, f, hasher, chunk)
+    return written
+
+
+async def save_multipart_upload(content_type: str, chunks: AsyncIterator[bytes], path: str,
+                                file_field: str = "file",
+                                max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[int, str, str, Dict[str, str]]:
+    """
+    Stream the `file_field` part of a multipart/form-data body to `path` as
+    it arrives; the other parts are read as small text fields. Returns
+    (size, sha256, filename, fields). Raises ValueError for a malformed body
+    or a missing file part; partial files are removed on error.
+    """
+    kind, params = parse_options_header(content_type or "")
+    boundary = params.get(b"boundary")
+    if kind != b"multipart/form-data" or not boundary:
+        raise ValueError("Expected a multipart/form-data body")
+
+    part = {"headers": {}, "field": b"", "value": b"", "name": "", "is_file": False}
+    fields: Dict[str, bytearray] = {}
+    file_data: List[bytes] = []
+    found: Dict[str, str] = {}  # filename of the file part, once its headers are read
+
+    def on_part_begin():
+        part["headers"] = {}
+
+    def on_header_field(data, start, end):
+        part["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+        part["is_file"] = part["name"] == file_field and "filename" not in found
+        if part["is_file"]:
+            found["filename"] = options.get(b"filename", b"").decode("utf-8", "replace")
+
+    def on_part_data(data, start, end):
+        if part["is_file"]:
+            file_data.append(bytes(data[start:end]))
+            return
+        fields.setdefault(part["name"], bytearray()).extend(data[start:end])
+        if sum(len(v) for v in fields.values()) > MAX_FORM_FIELD_BYTES:
+            raise ValueError("Form fields are too large")
+
+    def on_part_end():
+        part["is_file"] = False
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field,
+        "on_header_value": on_header_value, "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished, "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "wb") as f:
+            async for chunk in chunks:
+                parser.write(chunk)
+                if file_data:
+                    data = b"".join(file_data)
+                    file_data.clear()
+                    size += len(data)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+                    await asyncio.to_thread(_write_chunk, f, hasher, data)
+            parser.finalize()
+        if "filename" not in found:
+            raise ValueError(f"Missing the {file_field!r} file part")
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return size, hasher.hexdigest(), found["filename"], {k: v.decode("utf-8", "replace") for k, v in fields.items()}
+
+
+def _hash_file(path: str):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file already on disk, read in chunks."""
+    return _hash_file(path).hexdigest()
+
+
+class ResumableUpload:
+    """An upload sent over several requests, each appending at the current offset."""
+
+    # upload id -> (offset, running sha256); rebuilt from disk when missing
+    _hashers: Dict[str, tuple] = {}
+    _locks: Dict[str, asyncio.Lock] = {}
+    _guard = threading.Lock()
+
+    def __init__(self, upload_dir: str, upload_id: str, filename: str,
+                 size: Optional[int] = None, sha256: Optional[str] = None):
+        self.upload_dir = upload_dir
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size  # declared total size, if known
+        self.sha256 = sha256.lower() if sha256 else None  # declared checksum, if known
+        self.ext = safe_extension(filename)
+
+    @property
+    def part_path(self) -> str:
+        return os.path.join(self.upload_dir, f"{self.upload_id}.{self.ext}.part")
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.upload_dir, f"{self.upload_id}.upload.json")
+
+    @property
+    def final_path(self) -> str:
+        return os.path.join(self.upload_dir, f"{self.upload_id}.{self.ext}")
+
+    @property
+    def offset(self) -> int:
+        return os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+
+    @classmethod
+    def create(cls, upload_dir: str, filename: str, size: Optional[int] = None,
+               sha256: Optional[str] = None, max_bytes: int = MAX_UPLOAD_BYTES) -> "ResumableUpload":
+        if size is not None and size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes} byte limit")
+        os.makedirs(upload_dir, exist_ok=True)
+        upload = cls(upload_dir, str(uuid.uuid4()), filename, size, sha256)
+        open(upload.part_path, "wb").close()
+        with open(upload.meta_path, "w") as f:
+            json.dump({"filename": filename, "size": size, "sha256": upload.sha256}, f)
+        return upload
+
+    @classmethod
+    def load(cls, upload_dir: str, upload_id: str) -> Optional["ResumableUpload"]:
+        try:
+            uuid.UUID(upload_id)
+            with open(os.path.join(upload_dir, f"{upload_id}.upload.json")) as f:
+                meta = json.load(f)
+        except (ValueError, OSError):
+            return None
+        return cls(upload_dir, upload_id, meta["filename"], meta.get("size"), meta.get("sha256"))
+
+    def _lock(self) -> asyncio.Lock:
+        with self._guard:
+            return self._locks.setdefault(self.upload_id, asyncio.Lock())
+
+    async def append(self, chunks: AsyncIterator[bytes], offset: int,
+                     max_bytes: int = MAX_UPLOAD_BYTES) -> int:
+        """Append a request body at `offset` (must equal the stored size); returns the new offset."""
+        limit = min(max_bytes, self.size) if self.size is not None else max_bytes
+        async with self._lock():
+            current = self.offset
+            if offset != current:
+                raise UploadConflict(f"Upload is at offset {current}, not {offset}")
+            cached = self._hashers.get(self.upload_id)
+            hasher = cached[1] if cached and cached[0] == current else await asyncio.to_thread(_hash_file, self.part_path)
+            try:
+                with open(self.part_path, "ab") as f:
+                    current = await write_chunks(chunks, f, hasher, current, limit)
+            except BaseException:
+                # Keep what was written before the failure so the client can resume from it
+                self._hashers.pop(self.upload_id, None)
+                raise
+            self._hashers[self.upload_id] = (current, hasher)
+            return current
+
+    async def finish(self) -> Tuple[str, int, str]:
+        """Check size / checksum and move the data into place; returns (path, size, sha256)."""
+        async with self._lock():
+            size = self.offset
+            if self.size is not None and size != self.size:
+                raise UploadConflict(f"Upload has {size} of {self.size} bytes")
+            cached = self._hashers.pop(self.upload_id, None)
+            hasher = cached[1] if cached and cached[0] == size else await asyncio.to_thread(_hash_file, self.part_path)
+            digest = hasher.hexdigest()
+            if self.sha256 and digest != self.sha256:
+                raise UploadConflict("Checksum mismatch")
+            os.replace(self.part_path, self.final_path)
+            os.remove(self.meta_path)
+        with self._guard:
+            self._locks.pop(self.upload_id, None)
+        return self.final_path, size, digest
+
+    def abort(self):
+        """Discard the partial data."""
+        self._hashers.pop(self.upload_id, None)
+        with self._guard:
+            self._locks.pop(self.upload_id, None)
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def expire_uploads(upload_dir: str, max_age: float = UPLOAD_TTL) -> int:
+    """
+    Remove resumable uploads that have not received data for `max_age`
+    seconds, and files left by interrupted one-shot uploads; returns how
+    many uploads were removed.
+    """
+    if not os.path.isdir(upload_dir):
+        return 0
+    now = time.time()
+    removed = 0
+    for name in os.listdir(upload_dir):
+        path = os.path.join(upload_dir, name)
+        if name.endswith(".upload.json"):
+            upload = ResumableUpload.load(upload_dir, name[:-len(".upload.json")])
+            if upload is None:
+                continue
+            touched = os.path.getmtime(upload.part_path if os.path.exists(upload.part_path) else path)
+            if now - touched > max_age:
+                upload.abort()
+                removed += 1
+        elif name.endswith(".incoming"):
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+    if removed:
+        print(f"[INFO] Removed {removed} unfinished upload{'' if removed == 1 else 's'} from {upload_dir}")
+    return removed
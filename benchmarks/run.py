@@ -0,0 +1,213 @@
+# benchmarks/run.py
+"""
+Benchmarks for the video pipeline.
+
+    python -m benchmarks.run                          # all cases, synthetic detector
+    python -m benchmarks.run --detector yolo --cases detect,pipeline
+    python -m benchmarks.run --save-baseline          # record this machine's numbers
+    python -m benchmarks.run --baseline benchmarks/baseline.json   # fail on regressions
+
+Each case runs in a fresh process, so its peak RSS is its own. Throughput
+is the best of `--repeat` runs. Per-stage latencies come from
+`src.model.metrics`. Baselines are machine-specific: record them on the
+machine (or CI runner) that compares against them.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SyntheticDetector, make_video, parse_resolution, render_frames, synthetic_tracks
+
+CASES = ("insights", "detect", "pipeline", "pipeline_render")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Metrics where bigger is better; every other compared metric is better smaller
+HIGHER_IS_BETTER = ("fps", "updates_per_s")
+COMPARED = ("fps", "updates_per_s", "peak_rss_mb")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def _load_model(detector: str):
+    if detector == "synthetic":
+        from src.model.registry import LoadedModel
+        return LoadedModel(SyntheticDetector(), "synthetic", None, "fp32")
+    from src.model.registry import get_model
+    return get_model()
+
+
+def _stages() -> Dict[str, float]:
+    from src.model.metrics import metrics
+    return {stage: values["mean_ms"] for stage, values in metrics.snapshot()["stages"].items() if values["count"]}
+
+
+def _best_of(repeat: int, run: Callable[[], dict]) -> dict:
+    """Run `repeat` times; keep the fastest run's numbers."""
+    results = [run() for _ in range(repeat)]
+    return min(results, key=lambda r: r["seconds"])
+
+
+def bench_insights(args) -> dict:
+    from src.analysis.traffic_insights import TrafficInsights
+
+    tracks = synthetic_tracks(args.density, args.frames, seed=args.seed)
+
+    def run():
+        insights = TrafficInsights(frame_rate=args.fps)
+        start = time.perf_counter()
+        for frame_idx, detections in enumerate(tracks):
+            insights.update(detections, frame_idx)
+        updated = time.perf_counter()
+        insights.summary()
+        done = time.perf_counter()
+        return {"seconds": round(done - start, 4), "updates_per_s": round(len(tracks) / (updated - start), 1),
+                "summary_ms": round(1000 * (done - updated), 3)}
+
+    return _best_of(args.repeat, run)
+
+
+def bench_detect(args) -> dict:
+    from src.model.yolo_utils import detect_objects_yolo_batch
+
+    model = _load_model(args.detector)
+    width, height = parse_resolution(args.resolution)
+    frames = list(render_frames(width, height, min(args.frames, 120), args.density, args.seed))
+    detect_objects_yolo_batch(frames[:args.batch_size], model=model)  # warm-up
+
+    def run():
+        start = time.perf_counter()
+        for i in range(0, len(frames), args.batch_size):
+            detect_objects_yolo_batch(frames[i:i + args.batch_size], model=model)
+        seconds = time.perf_counter() - start
+        return {"seconds": round(seconds, 4), "fps": round(len(frames) / seconds, 1)}
+
+    return {**_best_of(args.repeat, run), "stages_ms": _stages()}
+
+
+def _bench_pipeline(args, analytics_only: bool) -> dict:
+    import src.model.predict as predict
+
+    model = _load_model(args.detector)
+    predict.get_model = lambda *a, **k: model  # this process only runs the benchmark
+    width, height = parse_resolution(args.resolution)
+    video = make_video(width, height, args.frames, args.density, args.fps, args.seed)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        def run():
+            start = time.perf_counter()
+            _, stats = predict.process_video_with_model(video, output_dir=out_dir, analytics_only=analytics_only,
+                                                        batch_size=args.batch_size)
+            seconds = time.perf_counter() - start
+            return {"seconds": round(seconds, 4), "fps": round(stats["total_frames"] / seconds, 1),
+                    "vehicles": stats["unique_vehicles"]}
+
+        return {**_best_of(args.repeat, run), "stages_ms": _stages()}
+
+
+def bench_pipeline(args) -> dict:
+    return _bench_pipeline(args, analytics_only=True)
+
+
+def bench_pipeline_render(args) -> dict:
+    return _bench_pipeline(args, analytics_only=False)
+
+
+def _run_case(case: str, args) -> dict:
+    cv2.setNumThreads(args.threads)
+    result = globals()[f"bench_{case}"](args)
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def run_cases(cases: List[str], args) -> Dict[str, dict]:
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[case] = pool.submit(_run_case, case, args).result()
+        print(f"[INFO] {case}: " + ", ".join(f"{k}={v}" for k, v in results[case].items() if k != "stages_ms"))
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = 0.15) -> List[str]:
+    """Descriptions of metrics that got worse than `baseline` by more than `tolerance`."""
+    regressions = []
+    for case, result in results.items():
+        for metric in COMPARED:
+            before, after = (baseline.get(case) or {}).get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > tolerance:
+                regressions.append(f"{case}.{metric}: {before} -> {after} ({change:+.0%})")
+    return regressions
+
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "opencv": cv2.__version__, "numpy": np.__version__}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the video pipeline on synthetic traffic.")
+    parser.add_argument("--cases", type=str, default=",".join(CASES), help=f"Comma-separated subset of {CASES}")
+    parser.add_argument("--detector", type=str, default="synthetic", choices=["synthetic", "yolo"],
+                        help="synthetic measures the pipeline around the model; yolo uses the default model")
+    parser.add_argument("--resolution", type=str, default="1280x720", help="Synthetic video size, WxH")
+    parser.add_argument("--frames", type=int, default=300, help="Frames per synthetic video")
+    parser.add_argument("--density", type=int, default=20, help="Vehicles in the scene")
+    parser.add_argument("--fps", type=float, default=30.0, help="Frame rate of the synthetic video")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic scene")
+    parser.add_argument("--batch_size", type=int, default=8, help="Frames per model call")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads per case (fixed for repeatability)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest counts")
+    parser.add_argument("--output", type=str, default=None, help="Write results JSON here")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown before failing")
+    args = parser.parse_args(argv)
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    config = {k: v for k, v in vars(args).items() if k not in ("cases", "output", "baseline", "save_baseline")}
+    report = {"config": config, "environment": environment(), "results": run_cases(cases, args)}
+
+    for path in filter(None, (args.output, DEFAULT_BASELINE if args.save_baseline else None)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("[WARNING] Baseline was recorded with other settings; comparison may be meaningless")
+        regressions = compare(report["results"], baseline.get("results", {}), args.tolerance)
+        for regression in regressions:
+            print(f"[ERROR] Regression {regression}")
+        if regressions:
+            return 1
+        print("[INFO] No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
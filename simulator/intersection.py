@@ -0,0 +1,153 @@
+# simulator/intersection.py
+"""
+Discrete-event simulation of a two-phase intersection, vectorized over
+timing policies.
+
+Events are phase ends. At each event every policy picks its next green
+the way `TrafficController` does, then its queues advance in closed form
+to the end of that green and the following yellow. Traffic is a fluid:
+arrivals follow the replayed per-approach curve and queues discharge at
+the saturation flow while green. The controller's "moving" vehicles are
+the ones that reach the stop line within `approach_seconds`, i.e. those
+still driving through the camera's view.
+
+One day at a 30 s cycle is ~3000 events, each a handful of numpy
+operations over all policies still running. The default `tune` grid
+(10,620 settings) takes 15-20 s per simulated day on one core, so a
+week-long replay of it takes a couple of minutes.
+"""
+import itertools
+from typing import Dict, Iterable
+
+import numpy as np
+
+from simulator.traffic_controller import APPROACHES, PHASES, adaptive_green, smooth
+
+# (phase, approach) -> approach gets green in that phase
+PHASE_MASK = np.array([[approach in PHASES[phase] for approach in APPROACHES] for phase in PHASES])
+
+
+class IntersectionSimulator:
+    def __init__(self, arrivals: np.ndarray, bin_seconds: float = 60.0, saturation_flow: float = 0.5):
+        """
+        :param arrivals: (4, bins) vehicles arriving per bin on each approach, in `APPROACHES` order
+        :param bin_seconds: length of one arrival bin (s)
+        :param saturation_flow: vehicles per second one approach discharges while green
+        """
+        arrivals = np.asarray(arrivals, dtype=np.float64)
+        if arrivals.ndim != 2 or arrivals.shape[0] != len(APPROACHES):
+            raise ValueError(f"arrivals must have shape ({len(APPROACHES)}, bins), got {arrivals.shape}")
+        self.bin_seconds = bin_seconds
+        self.saturation_flow = saturation_flow
+        self.duration = arrivals.shape[1] * bin_seconds
+        self._times = np.arange(arrivals.shape[1] + 1) * bin_seconds
+        self._cumulative = np.concatenate([np.zeros((len(APPROACHES), 1)), np.cumsum(arrivals, axis=1)], axis=1)
+
+    def arrived(self, t: np.ndarray) -> np.ndarray:
+        """(4, P) vehicles arrived on each approach by times `t` (uniform within a bin)."""
+        return np.stack([np.interp(t, self._times, cumulative) for cumulative in self._cumulative])
+
+    def run(self, min_green, max_green, ema_alpha, yellow=3.0, headway=2.0, moving_weight=0.5,
+            approach_seconds=10.0) -> Dict[str, np.ndarray]:
+        """
+        Simulate one policy per element of the (broadcast) parameters. The
+        demand of a phase is `phase_demand`'s: the busiest green approach's
+        queue plus `moving_weight` times the vehicles arriving there within
+        `approach_seconds`.
+
+        :return: per-policy arrays: avg_delay_s (per arrived vehicle),
+                 served, residual_queue, max_queue and cycles
+        """
+        names = (min_green, max_green, ema_alpha, yellow, headway, moving_weight)
+        min_green, *rest = np.broadcast_arrays(*(np.asarray(p, dtype=np.float64) for p in names))
+        n = min_green.size
+        params = np.stack([p.ravel() for p in (min_green, *rest)])
+        s = self.saturation_flow
+
+        # State of the policies still running; finished ones move to `out`
+        policy = np.arange(n)
+        t = np.zeros(n)
+        phase = np.zeros(n, dtype=np.intp)
+        ema = np.full((len(PHASES), n), np.nan)
+        queue = np.zeros((len(APPROACHES), n))
+        seen = self.arrived(t)
+        delay = np.zeros(n)
+        max_queue = np.zeros(n)
+        phases_run = np.zeros(n, dtype=np.int64)
+        out = {key: np.zeros(n) for key in ("delay", "residual_queue", "max_queue", "phases")}
+
+        while policy.size:
+            min_green, max_green, ema_alpha, yellow, headway, moving_weight = params
+            running = t < self.duration
+            green_mask = PHASE_MASK[phase].T  # (4, P)
+
+            # Decide: the busiest green approach (queued + a share of those
+            # still approaching) feeds the phase's average
+            moving = self.arrived(t + approach_seconds) - seen
+            demand = np.where(green_mask, queue + moving_weight * moving, 0.0).max(axis=0)
+            columns = np.arange(policy.size)
+            smoothed = smooth(ema[phase, columns], demand, ema_alpha)
+            ema[phase, columns] = np.where(running, smoothed, ema[phase, columns])
+            green = np.where(running, adaptive_green(smoothed, min_green, max_green, headway), 0.0)
+            amber = np.where(running, yellow, 0.0)
+            span = green + amber
+
+            # Advance every queue to the end of this green + yellow
+            end_seen = self.arrived(t + span)
+            arrivals = end_seen - seen
+            rate = arrivals / np.maximum(span, 1e-9)
+            # Red: grows linearly with arrivals
+            red_end = queue + arrivals
+            red_delay = queue * span + rate * span ** 2 / 2
+            # Green: drains at saturation flow net of arrivals (until empty), then the yellow builds it up again
+            at_amber = np.maximum(queue + (rate - s) * green, 0.0)
+            clear_time = np.where(at_amber > 0, green, queue / np.maximum(s - rate, 1e-9))
+            green_delay = (queue + at_amber) / 2 * clear_time + at_amber * amber + rate * amber ** 2 / 2
+            green_end = at_amber + rate * amber
+
+            queue = np.where(green_mask, green_end, red_end)
+            delay += np.where(green_mask, green_delay, red_delay).sum(axis=0)
+            max_queue = np.maximum(max_queue, queue.max(axis=0))  # red queues peak as their phase ends
+            phases_run += running
+            seen = end_seen
+            t = t + span
+            phase = np.where(running, 1 - phase, phase)
+
+            # Retire finished policies in batches, so later events only touch the rest
+            done = t >= self.duration
+            finished = int(done.sum())
+            if finished == policy.size or finished > policy.size // 8:
+                ids = policy[done]
+                out["delay"][ids] = delay[done]
+                out["residual_queue"][ids] = queue[:, done].sum(axis=0)
+                out["max_queue"][ids] = max_queue[done]
+                out["phases"][ids] = phases_run[done]
+                keep = ~done
+                policy, t, phase, delay, max_queue, phases_run = (
+                    a[keep] for a in (policy, t, phase, delay, max_queue, phases_run))
+                params, ema, queue, seen = (a[:, keep] for a in (params, ema, queue, seen))
+
+        total = self._cumulative[:, -1].sum()
+        return {
+            "avg_delay_s": out["delay"] / total if total else out["delay"],
+            "served": total - out["residual_queue"],
+            "residual_queue": out["residual_queue"],
+            "max_queue": out["max_queue"],
+            "cycles": out["phases"] / len(PHASES),
+        }
+
+
+def sweep(simulator: IntersectionSimulator, min_green: Iterable[float], max_green: Iterable[float],
+          ema_alpha: Iterable[float], yellow: float = 3.0, headway: float = 2.0, moving_weight: float = 0.5,
+          approach_seconds: float = 10.0) -> Dict[str, np.ndarray]:
+    """
+    Run every valid (min_green <= max_green) combination of the given values
+    in one vectorized pass; rows come back sorted by average delay.
+    """
+    grid = np.array([combo for combo in itertools.product(min_green, max_green, ema_alpha) if combo[0] <= combo[1]],
+                    dtype=np.float64).reshape(-1, 3)
+    results = simulator.run(grid[:, 0], grid[:, 1], grid[:, 2], yellow=yellow, headway=headway,
+                            moving_weight=moving_weight, approach_seconds=approach_seconds)
+    order = np.argsort(results["avg_delay_s"], kind="stable")
+    table = {"min_green": grid[:, 0], "max_green": grid[:, 1], "ema_alpha": grid[:, 2], **results}
+    return {key: values[order] for key, values in table.items()}
@@ -0,0 +1,25 @@
+# simulator/traffic_light.py
+"""A signal head at the intersection, serving one of the two phases."""
+
+STATES = ("red", "yellow", "green")
+ORIENTATIONS = ("NS", "EW")
+
+
+class TrafficLight:
+    def __init__(self, id: str, x: float = 0.0, y: float = 0.0, orientation: str = "NS", state: str = "red"):
+        if orientation not in ORIENTATIONS:
+            raise ValueError(f"orientation must be one of {ORIENTATIONS}, got {orientation!r}")
+        self.id = id
+        self.x = x
+        self.y = y
+        self.orientation = orientation
+        self.state = "red"
+        self.set_state(state)
+
+    def set_state(self, state: str):
+        if state not in STATES:
+            raise ValueError(f"state must be one of {STATES}, got {state!r}")
+        self.state = state
+
+    def __repr__(self) -> str:
+        return f"TrafficLight(id={self.id!r}, orientation={self.orientation!r}, state={self.state!r})"
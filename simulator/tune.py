@@ -0,0 +1,101 @@
+# simulator/tune.py
+"""
+Offline tuning of the adaptive controller.
+
+    python -m simulator.tune --tracks tracks.json --days 7
+    python -m simulator.tune --demand 480,360,180,120 --min_green 5:30:1 --ema_alpha 0.1:1:0.1
+
+`--tracks` takes the vehicle rows of a processed video (the "tracks"
+details of a task, as a JSON list, or a `TrafficInsights.track_table()`
+dict); `--demand` gives vehicles per hour per approach instead
+(NORTH,SOUTH,EAST,WEST). Either is stretched over `--days` with the daily
+demand profile, and every min_green / max_green / ema_alpha combination
+is simulated on it. The default grid is 10,620 settings, 15-20 s per
+simulated day on one core; narrow the ranges for multi-day replays.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from simulator.intersection import IntersectionSimulator, sweep
+from simulator.replay import DAY_PROFILE, approach_arrivals, extend
+from simulator.traffic_controller import APPROACHES
+
+
+def parse_range(value: str) -> np.ndarray:
+    """"5:30:5" -> 5, 10, ..., 30 (stop included); "5,10,20" -> those values."""
+    if ":" in value:
+        start, stop, step = (float(v) for v in value.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6)
+    return np.array([float(v) for v in value.split(",")])
+
+
+def load_arrivals(args) -> np.ndarray:
+    if args.tracks:
+        with open(args.tracks) as f:
+            tracks = json.load(f)
+        if isinstance(tracks, dict) and "items" in tracks:  # a page of task details
+            tracks = tracks["items"]
+        return approach_arrivals(tracks, frame_rate=args.frame_rate, bin_seconds=args.bin_seconds)
+    per_hour = np.array([float(v) for v in args.demand.split(",")])
+    if len(per_hour) != len(APPROACHES):
+        raise ValueError(f"--demand needs {len(APPROACHES)} values ({','.join(APPROACHES)})")
+    return (per_hour * args.bin_seconds / 3600)[:, None]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Tune adaptive signal timing on replayed traffic.",
+        epilog="The default grid (10,620 settings) takes 15-20 s per simulated day on one core, "
+               "so --days 7 runs for a couple of minutes; narrow the ranges to go faster.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--tracks", type=str, help="JSON vehicle rows of a processed video")
+    source.add_argument("--demand", type=str, help="Vehicles per hour per approach, NORTH,SOUTH,EAST,WEST")
+    parser.add_argument("--frame_rate", type=float, default=30.0, help="Frame rate of the video behind --tracks")
+    parser.add_argument("--bin_seconds", type=float, default=60.0, help="Arrival bin length (s)")
+    parser.add_argument("--days", type=float, default=1.0, help="Simulated days")
+    parser.add_argument("--flat", action="store_true", help="Constant demand instead of the daily profile")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the Poisson arrivals")
+    parser.add_argument("--min_green", type=str, default="5:30:1", help="start:stop:step or comma-separated values")
+    parser.add_argument("--max_green", type=str, default="20:120:5", help="start:stop:step or comma-separated values")
+    parser.add_argument("--ema_alpha", type=str, default="0.05:1:0.05", help="start:stop:step or comma-separated values")
+    parser.add_argument("--yellow", type=float, default=3.0, help="Yellow time (s)")
+    parser.add_argument("--headway", type=float, default=2.0, help="Green seconds per queued vehicle")
+    parser.add_argument("--moving_weight", type=float, default=0.5, help="Share of approaching vehicles counted as demand")
+    parser.add_argument("--approach_seconds", type=float, default=10.0,
+                        help="Travel time through the camera view: vehicles this close count as moving (s)")
+    parser.add_argument("--saturation_flow", type=float, default=0.5, help="Vehicles per second per green approach")
+    parser.add_argument("--top", type=int, default=10, help="Settings to print")
+    parser.add_argument("--output", type=str, default=None, help="Write every result as JSON here")
+    args = parser.parse_args(argv)
+
+    arrivals = extend(load_arrivals(args), args.bin_seconds, args.days,
+                      profile=None if args.flat else DAY_PROFILE, seed=args.seed)
+    simulator = IntersectionSimulator(arrivals, args.bin_seconds, args.saturation_flow)
+
+    start = time.perf_counter()
+    results = sweep(simulator, parse_range(args.min_green), parse_range(args.max_green),
+                    parse_range(args.ema_alpha), yellow=args.yellow, headway=args.headway,
+                    moving_weight=args.moving_weight, approach_seconds=args.approach_seconds)
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] {len(results['min_green'])} settings x {args.days:g} day(s), "
+          f"{int(arrivals.sum())} vehicles, simulated in {elapsed:.1f}s")
+
+    print(f"{'min_green':>9} {'max_green':>9} {'ema_alpha':>9} {'delay_s':>8} {'max_queue':>9} {'residual':>8}")
+    for i in range(min(args.top, len(results["min_green"]))):
+        print(f"{results['min_green'][i]:9g} {results['max_green'][i]:9g} {results['ema_alpha'][i]:9.2f} "
+              f"{results['avg_delay_s'][i]:8.2f} {results['max_queue'][i]:9.1f} {results['residual_queue'][i]:8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({key: values.tolist() for key, values in results.items()}, f)
+        print(f"[INFO] Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
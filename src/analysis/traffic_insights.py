@@ -1,20 +1,183 @@
 # traffic_insights.py
-import math
-from collections import defaultdict
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _grow(array: np.ndarray, min_size: int) -> np.ndarray:
+    """Return `array` resized (by doubling) to hold at least `min_size` rows."""
+    if len(array) >= min_size:
+        return array
+    new_size = max(min_size, 2 * len(array), 16)
+    grown = np.zeros((new_size,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class TrackHistory:
+    """
+    Columnar store of tracked positions: one row per (track, frame, center)
+    observation in growable int32 / float32 arrays (16 bytes per point).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.track = np.empty(capacity, dtype=np.int32)
+        self.frame = np.empty(capacity, dtype=np.int32)
+        self.center = np.empty((capacity, 2), dtype=np.float32)
+        self.size = 0
+        self._groups = None  # cached (order, track starts) for per-track lookups
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return self.track.nbytes + self.frame.nbytes + self.center.nbytes
+
+    def append(self, track_idx: np.ndarray, frame_idx: int, centers: np.ndarray):
+        n = len(track_idx)
+        end = self.size + n
+        if end > len(self.track):
+            self.track = _grow(self.track, end)
+            self.frame = _grow(self.frame, end)
+            self.center = _grow(self.center, end)
+        self.track[self.size:end] = track_idx
+        self.frame[self.size:end] = frame_idx
+        self.center[self.size:end] = centers
+        self.size = end
+        self._groups = None
+
+    def compact(self, keep: np.ndarray, remap: np.ndarray):
+        """Keep only the rows where `keep` is set, renumbering tracks through `remap`."""
+        n = int(keep.sum())
+        self.track[:n] = remap[self.track[:self.size][keep]]
+        self.frame[:n] = self.frame[:self.size][keep]
+        self.center[:n] = self.center[:self.size][keep]
+        self.size = n
+        self._groups = None
+
+    def points(self, track_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(frames, centers) of one track, in the order they were observed."""
+        if self._groups is None:
+            tracks = self.track[:self.size]
+            order = np.argsort(tracks, kind="stable")
+            self._groups = (order, tracks[order])
+        order, sorted_tracks = self._groups
+        lo, hi = np.searchsorted(sorted_tracks, [track_idx, track_idx + 1])
+        rows = order[lo:hi]
+        return self.frame[rows], self.center[rows]
+
+
+class _HistoryView(Mapping):
+    """Read-only `{vehicle_id: [{'frame', 'center', 'class'}, ...]}` view, built on access."""
+
+    def __init__(self, insights: "TrafficInsights"):
+        self._insights = insights
+
+    def __getitem__(self, vid):
+        ins = self._insights
+        idx = ins._track_index[vid]
+        frames, centers = ins.history.points(idx)
+        label = ins._labels[ins._track_class[idx]]
+        return [{'frame': int(f), 'center': (float(x), float(y)), 'class': label}
+                for f, (x, y) in zip(frames.tolist(), centers.tolist())]
+
+    def __iter__(self):
+        return iter(self._insights._track_index)
+
+    def __len__(self) -> int:
+        return len(self._insights._track_index)
+
+
+TRACK_COLUMNS = ("id", "class", "distance", "first_frame", "last_frame", "first_center", "last_center")
+
 
 class TrafficInsights:
     """
     Generates intelligent traffic insights from vehicle detection and tracking.
+
+    With `window_seconds` set, insights run in windowed mode for continuous
+    feeds: every `slide_seconds` the last `window_seconds` are summarised
+    into a window aggregate, tracks unseen for `track_ttl` frames expire,
+    and history older than the current window is evicted so memory stays
+    bounded however long the stream runs.
     """
 
-    def __init__(self, frame_rate=30, meter_per_pixel=0.05):
+    def __init__(self, frame_rate=30, meter_per_pixel=0.05, window_seconds: Optional[float] = None,
+                 slide_seconds: Optional[float] = None, track_ttl: Optional[int] = None,
+                 keep_session: bool = False):
         """
         :param frame_rate: FPS of video feed
-        :param meter_per_pixel: scale to convert pixel distances to real-world meters
+        :param meter_per_pixel: scale to convert pixel distances to real-world meters,
+                                either one value or an (x, y) pair for anisotropic views
+        :param window_seconds: window length; None keeps the whole session
+        :param slide_seconds: how often a window is emitted (defaults to tumbling windows)
+        :param track_ttl: frames after which an unseen track expires (defaults to one window)
+        :param keep_session: in windowed mode, keep the accumulators (one row per
+                             vehicle, no positions) of expired tracks for `session_insights`
         """
         self.frame_rate = frame_rate
         self.meter_per_pixel = meter_per_pixel
-        self.vehicle_history = defaultdict(list)  # track positions per vehicle ID
+
+        self.window_frames = None
+        if window_seconds:
+            self.window_frames = max(1, int(round(window_seconds * frame_rate)))
+            self.slide_frames = max(1, int(round((slide_seconds or window_seconds) * frame_rate)))
+            self.track_ttl = track_ttl if track_ttl is not None else self.window_frames
+            self._next_end = None  # end frame (exclusive) of the next window to emit
+        self._retired: Optional[Dict[str, list]] = (
+            {key: [] for key in TRACK_COLUMNS} if keep_session and self.window_frames is not None else None)
+        self.last_window: Optional[dict] = None
+        self._frame = -1  # latest frame seen
+        self.history = TrackHistory()  # columnar positions of every tracked vehicle
+        self._track_index: Dict = {}  # vehicle ID -> dense track index
+        self._track_ids: List = []  # dense track index -> vehicle ID
+        self._track_class = np.zeros(0, dtype=np.int16)  # dense track index -> label code
+        self._labels: List[str] = []
+        self._label_codes: Dict[str, int] = {}
+        self.vehicle_history = _HistoryView(self)
+
+        # Running per-track accumulators, updated in update() so queries are O(1) per track
+        self._distance = np.zeros(0, dtype=np.float64)  # metres travelled
+        self._first_frame = np.zeros(0, dtype=np.int64)
+        self._last_frame = np.zeros(0, dtype=np.int64)
+        self._first_center = np.zeros((0, 2), dtype=np.float32)
+        self._last_center = np.zeros((0, 2), dtype=np.float32)
+
+    @property
+    def _scale(self) -> np.ndarray:
+        return np.broadcast_to(np.asarray(self.meter_per_pixel, dtype=np.float64), (2,))
+
+    def _track_indices(self, ids) -> np.ndarray:
+        index = self._track_index
+        out = np.empty(len(ids), dtype=np.int32)
+        for i, vid in enumerate(ids):
+            idx = index.get(vid)
+            if idx is None:
+                idx = index[vid] = len(index)
+                self._track_ids.append(vid)
+            out[i] = idx
+        n = len(index)
+        if n > len(self._track_class):
+            self._track_class = _grow(self._track_class, n)
+            self._distance = _grow(self._distance, n)
+            self._first_frame = _grow(self._first_frame, n)
+            self._last_frame = _grow(self._last_frame, n)
+            self._first_center = _grow(self._first_center, n)
+            self._last_center = _grow(self._last_center, n)
+        return out
+
+    def _class_codes(self, classes) -> np.ndarray:
+        uniques, inverse = np.unique(np.asarray(classes, dtype=str), return_inverse=True)
+        codes = np.empty(len(uniques), dtype=np.int16)
+        for i, label in enumerate(uniques.tolist()):
+            code = self._label_codes.get(label)
+            if code is None:
+                code = self._label_codes[label] = len(self._labels)
+                self._labels.append(label)
+            codes[i] = code
+        return codes[inverse.reshape(-1)]
 
     def update(self, detections, frame_idx):
         """
@@ -24,56 +187,268 @@ class TrafficInsights:
                            'id' - unique vehicle ID
                            'bbox' - [x1, y1, x2, y2]
                            'class' - vehicle type (car, truck, bus, bike)
+                           or, for bulk updates, one dict with the same keys
+                           holding arrays ('bbox' of shape (N, 4))
         :param frame_idx: current frame index
+        :return: aggregates of the windows closed by reaching `frame_idx`
+                 (always empty outside windowed mode)
+        """
+        closed = self.advance(frame_idx)
+        if isinstance(detections, Mapping):
+            ids, bboxes, classes = detections['id'], detections['bbox'], detections['class']
+        else:
+            ids = [det['id'] for det in detections]
+            bboxes = [det['bbox'] for det in detections]
+            classes = [det['class'] for det in detections]
+        if len(ids) == 0:
+            return closed
+
+        ids = np.asarray(ids).tolist()
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        centers = (bboxes[:, :2] + bboxes[:, 2:]) / 2
+
+        known = len(self._track_index)
+        idx = self._track_indices(ids)
+        self._track_class[idx] = self._class_codes(classes)
+        self.history.append(idx, frame_idx, centers)
+
+        # Fold the new points into the running accumulators
+        new = idx >= known
+        old = idx[~new]
+        steps = (centers[~new] - self._last_center[old]) * self._scale
+        self._distance[old] += np.hypot(steps[:, 0], steps[:, 1])
+        self._distance[idx[new]] = 0.0  # slots may be reused after eviction
+        self._first_frame[idx[new]] = frame_idx
+        self._first_center[idx[new]] = centers[new]
+        self._last_frame[idx] = frame_idx
+        self._last_center[idx] = centers
+        return closed
+
+    def advance(self, frame_idx) -> List[dict]:
         """
-        for det in detections:
-            vid = det['id']
-            bbox = det['bbox']
-            center = ((bbox[0]+bbox[2])/2, (bbox[1]+bbox[3])/2)
-            self.vehicle_history[vid].append({'frame': frame_idx, 'center': center, 'class': det['class']})
+        Move the stream clock to `frame_idx`, emitting every window that ends
+        at or before it and evicting what no future window needs.
+        """
+        self._frame = max(self._frame, frame_idx)
+        if self.window_frames is None:
+            return []
+        if self._next_end is None:
+            self._next_end = (frame_idx // self.slide_frames + 1) * self.slide_frames
+            return []
+
+        closed = []
+        while frame_idx >= self._next_end:
+            closed.append(self._emit(self._next_end - self.window_frames, self._next_end))
+            self._next_end += self.slide_frames
+        if closed:
+            self._evict(frame_idx)
+        return closed
+
+    def flush(self) -> Optional[dict]:
+        """Emit the current, partially filled window (e.g. when the stream ends)."""
+        if self.window_frames is None or self._next_end is None:
+            return None
+        return self._emit(self._next_end - self.window_frames, self._frame + 1)
+
+    def _emit(self, start, end) -> dict:
+        """Aggregate the history points with start <= frame < end."""
+        size = self.history.size
+        rows = np.flatnonzero((self.history.frame[:size] >= start) & (self.history.frame[:size] < end))
+        tracks = self.history.track[rows]
+        order = np.argsort(tracks, kind="stable")  # history is appended in frame order
+        tracks = tracks[order]
+        frames = self.history.frame[rows][order]
+        centers = self.history.center[rows][order].astype(np.float64)
+
+        speeds = np.zeros(0)
+        counts = {}
+        if len(rows):
+            same_track = tracks[1:] == tracks[:-1]
+            steps = np.diff(centers, axis=0) * self._scale
+            step_len = np.hypot(steps[:, 0], steps[:, 1]) * same_track
+            group = np.cumsum(np.r_[True, ~same_track]) - 1
+            starts = np.flatnonzero(np.r_[True, ~same_track])
+            ends = np.r_[starts[1:], len(rows)] - 1
+
+            distance = np.bincount(group[1:], weights=step_len, minlength=len(starts))
+            duration = (frames[ends] - frames[starts]) / self.frame_rate
+            with np.errstate(divide="ignore", invalid="ignore"):
+                speeds = np.round(np.where(duration > 0, distance / duration, 0.0) * 3.6, 2)
+
+            per_class = np.bincount(self._track_class[tracks[starts]], minlength=len(self._labels))
+            counts = {label: int(n) for label, n in zip(self._labels, per_class.tolist()) if n}
+
+        avg_speed = round(float(speeds.mean()), 2) if len(speeds) else 0.0
+        window = {
+            "start_frame": int(max(start, 0)),
+            "end_frame": int(end),
+            "start_s": round(max(start, 0) / self.frame_rate, 2),
+            "end_s": round(end / self.frame_rate, 2),
+            "vehicles": len(speeds),
+            "counts": counts,
+            "avg_speed_kmh": avg_speed,
+            "congestion_level": self._congestion_from(len(speeds), avg_speed),
+        }
+        self.last_window = window
+        return window
+
+    def _evict(self, frame_idx):
+        """Drop history no future window covers and tracks that are expired and fully evicted."""
+        horizon = self._next_end - self.window_frames
+        n = len(self._track_ids)
+        last = self._last_frame[:n]
+        keep_track = (last >= frame_idx - self.track_ttl) | (last >= horizon)
+        keep_rows = self.history.frame[:self.history.size] >= horizon
+        if keep_rows.all() and keep_track.all():
+            return
+
+        remap = np.cumsum(keep_track) - 1
+        self.history.compact(keep_rows, remap)
+        if self._retired is not None and not keep_track.all():
+            for key, values in self._table(np.flatnonzero(~keep_track)).items():
+                self._retired[key].extend(values)
+        if not keep_track.all():
+            kept = int(keep_track.sum())
+            for array in (self._track_class, self._distance, self._first_frame,
+                          self._last_frame, self._first_center, self._last_center):
+                array[:kept] = array[:n][keep_track]
+            self._track_ids = [vid for vid, keep in zip(self._track_ids, keep_track.tolist()) if keep]
+            self._track_index = {vid: i for i, vid in enumerate(self._track_ids)}
+
+    def _live(self):
+        """Dense indices of the tracks queries cover: all of them, or the unexpired ones when windowed."""
+        n = len(self._track_ids)
+        if self.window_frames is None:
+            return slice(0, n)
+        return np.flatnonzero(self._last_frame[:n] >= self._frame - self.track_ttl)
+
+    def _speeds_kmh(self, idx) -> np.ndarray:
+        """Average speed (km/h) of the given dense track indices, from the accumulators."""
+        total_time = (self._last_frame[idx] - self._first_frame[idx]) / self.frame_rate
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speed_m_s = np.where(total_time > 0, self._distance[idx] / total_time, 0.0)
+        return np.round(speed_m_s * 3.6, 2)
 
     def compute_speed(self, vid):
         """
         Compute average speed (km/h) of a vehicle based on tracked positions.
         """
-        positions = self.vehicle_history[vid]
-        if len(positions) < 2:
-            return 0.0
-        total_dist = 0.0
-        for i in range(1, len(positions)):
-            x0, y0 = positions[i-1]['center']
-            x1, y1 = positions[i]['center']
-            dist_pixels = math.hypot(x1-x0, y1-y0)
-            total_dist += dist_pixels * self.meter_per_pixel
-        total_time = (positions[-1]['frame'] - positions[0]['frame']) / self.frame_rate
-        if total_time <= 0:
+        idx = self._track_index.get(vid)
+        if idx is None:
             return 0.0
-        speed_m_s = total_dist / total_time
-        speed_kmh = speed_m_s * 3.6
-        return round(speed_kmh, 2)
+        return float(self._speeds_kmh(idx))
 
-    def compute_density(self):
+    def compute_speeds(self):
         """
-        Compute vehicle density per type.
+        Average speed (km/h) of every tracked vehicle, as {vehicle ID: speed}.
         """
-        density = defaultdict(int)
-        for vid, history in self.vehicle_history.items():
-            if history:
-                v_type = history[-1]['class']
-                density[v_type] += 1
-        return dict(density)
+        live = self._live()
+        ids = np.asarray(self._track_ids, dtype=object)[live].tolist()
+        return dict(zip(ids, self._speeds_kmh(live).tolist()))
 
-    def compute_congestion_level(self):
+    def recompute(self, meter_per_pixel=None, frame_rate=None):
         """
-        Estimate congestion level (light, moderate, heavy)
-        based on total vehicle count and speed trends.
+        Rebuild the per-track accumulators from the stored history in one
+        vectorized pass, e.g. after a calibration change.
         """
-        total_vehicles = len(self.vehicle_history)
-        if total_vehicles == 0:
-            return "No traffic"
+        if meter_per_pixel is not None:
+            self.meter_per_pixel = meter_per_pixel
+        if frame_rate is not None:
+            self.frame_rate = frame_rate
+
+        n = len(self._track_ids)
+        size = self.history.size
+        if n == 0 or size == 0:
+            return
+        tracks = self.history.track[:size]
+        order = np.argsort(tracks, kind="stable")
+        tracks = tracks[order]
+        frames = self.history.frame[:size][order]
+        centers = self.history.center[:size][order]
+
+        steps = np.diff(centers.astype(np.float64), axis=0) * self._scale
+        same_track = tracks[1:] == tracks[:-1]
+        step_len = np.hypot(steps[:, 0], steps[:, 1]) * same_track
+        self._distance[:n] = np.bincount(tracks[1:], weights=step_len, minlength=n)[:n]
+
+        starts = np.flatnonzero(np.r_[True, ~same_track])
+        ends = np.r_[starts[1:], size] - 1
+        self._first_frame[tracks[starts]] = frames[starts]
+        self._first_center[tracks[starts]] = centers[starts]
+        self._last_frame[tracks[ends]] = frames[ends]
+        self._last_center[tracks[ends]] = centers[ends]
 
-        avg_speed = sum(self.compute_speed(vid) for vid in self.vehicle_history) / total_vehicles
+    def _table(self, idx) -> Dict[str, list]:
+        return {
+            "id": np.asarray(self._track_ids, dtype=object)[idx].tolist(),
+            "class": [self._labels[c] for c in self._track_class[idx].tolist()],
+            "distance": self._distance[idx].tolist(),
+            "first_frame": self._first_frame[idx].tolist(),
+            "last_frame": self._last_frame[idx].tolist(),
+            "first_center": self._first_center[idx].tolist(),
+            "last_center": self._last_center[idx].tolist(),
+        }
 
+    def track_table(self) -> Dict[str, list]:
+        """Per-track accumulators as plain lists (JSON-friendly), e.g. to merge video segments."""
+        return self._table(np.arange(len(self._track_ids)))
+
+    def session_table(self) -> Dict[str, list]:
+        """
+        `track_table()` of the whole session: with `keep_session`, expired
+        tracks are included (a vehicle that expired and came back is one row).
+        """
+        table = self.track_table()
+        if not self._retired or not self._retired["id"]:
+            return table
+        rows: Dict = {}
+        for row in zip(*(self._retired[key] + table[key] for key in TRACK_COLUMNS)):
+            row = dict(zip(TRACK_COLUMNS, row))
+            seen = rows.get(row["id"])
+            if seen is None:
+                rows[row["id"]] = row
+            else:  # rows come in time order: extend the earlier one
+                seen.update(distance=seen["distance"] + row["distance"], last_frame=row["last_frame"],
+                            last_center=row["last_center"])
+        return {key: [row[key] for row in rows.values()] for key in TRACK_COLUMNS}
+
+    def session_insights(self) -> "TrafficInsights":
+        """
+        Insights over every vehicle of the session, for final summaries; in
+        windowed mode the queries on `self` only cover unexpired tracks.
+        """
+        if self.window_frames is None:
+            return self
+        return TrafficInsights.from_tracks(self.session_table(), frame_rate=self.frame_rate,
+                                           meter_per_pixel=self.meter_per_pixel)
+
+    @classmethod
+    def from_tracks(cls, table: Dict[str, list], frame_rate=30, meter_per_pixel=0.05) -> "TrafficInsights":
+        """Insights over a `track_table()` (positions history is not restored)."""
+        insights = cls(frame_rate=frame_rate, meter_per_pixel=meter_per_pixel)
+        n = len(table["id"])
+        if n == 0:
+            return insights
+        idx = insights._track_indices(table["id"])
+        insights._track_class[idx] = insights._class_codes(table["class"])
+        insights._distance[idx] = table["distance"]
+        insights._first_frame[idx] = table["first_frame"]
+        insights._last_frame[idx] = table["last_frame"]
+        insights._first_center[idx] = np.asarray(table["first_center"], dtype=np.float32).reshape(n, 2)
+        insights._last_center[idx] = np.asarray(table["last_center"], dtype=np.float32).reshape(n, 2)
+        insights._frame = int(max(table["last_frame"]))
+        return insights
+
+    def compute_density(self):
+        """
+        Compute vehicle density per type.
+        """
+        counts = np.bincount(self._track_class[self._live()], minlength=len(self._labels))
+        return {label: int(n) for label, n in zip(self._labels, counts.tolist()) if n}
+
+    def _congestion_from(self, total_vehicles, avg_speed):
+        if total_vehicles == 0:
+            return "No traffic"
         if avg_speed > 40 and total_vehicles < 10:
             return "Light"
         elif avg_speed > 20:
@@ -81,13 +456,42 @@ class TrafficInsights:
         else:
             return "Heavy"
 
+    def compute_congestion_level(self):
+        """
+        Estimate congestion level (light, moderate, heavy)
+        based on total vehicle count and speed trends.
+        """
+        speeds = self._speeds_kmh(self._live())
+        if len(speeds) == 0:
+            return "No traffic"
+        return self._congestion_from(len(speeds), float(speeds.mean()))
+
+    def summary(self):
+        """
+        Cheap snapshot for live reporting: vehicle count, mean speed,
+        congestion level and density, without rescanning the history
+        (plus the last emitted window in windowed mode).
+        """
+        speeds = self._speeds_kmh(self._live())
+        total_vehicles = len(speeds)
+        avg_speed = round(float(speeds.mean()), 2) if total_vehicles else 0.0
+        summary = {
+            "vehicles": total_vehicles,
+            "avg_speed_kmh": avg_speed,
+            "congestion_level": self._congestion_from(total_vehicles, avg_speed),
+            "density": self.compute_density(),
+        }
+        if self.window_frames is not None:
+            summary["window"] = self.last_window
+        return summary
+
     def generate_scene_description(self):
         """
         Generate a textual summary of the current traffic scene.
         """
         density = self.compute_density()
         congestion = self.compute_congestion_level()
-        speeds = {vid: self.compute_speed(vid) for vid in self.vehicle_history}
+        speeds = self.compute_speeds()
 
         description = f"Traffic Scene Summary:\n"
         description += f"Congestion Level: {congestion}\n"
@@ -1 +1,149 @@
-# Placeholder
+# src/data_loader.py
+"""
+Frame sources for live feeds.
+
+`StreamSource` decodes an RTSP/HTTP stream, a camera index or a video file
+on a background thread and keeps only the newest frame. A consumer that
+falls behind therefore skips stale frames instead of queueing them, so its
+latency stays bounded by one inference. Lost connections are reopened with
+exponential backoff; files can be looped to stand in for a camera.
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+DEFAULT_STREAM_FPS = 25.0  # used when the source does not report a frame rate
+
+
+def is_file_source(source: Union[str, int]) -> bool:
+    return isinstance(source, str) and os.path.isfile(source)
+
+
+class StreamSource(threading.Thread):
+    """Latest-frame reader over a `cv2.VideoCapture` with automatic reconnects."""
+
+    def __init__(
+        self,
+        source: Union[str, int],
+        loop: bool = False,
+        realtime: Optional[bool] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+        open_fn: Callable[[Union[str, int]], cv2.VideoCapture] = cv2.VideoCapture,
+    ):
+        """
+        :param source: RTSP/HTTP URL, camera index (int or digit string) or file path
+        :param loop: restart files from the beginning at EOF
+        :param realtime: pace decoding at the source frame rate (default: only for files)
+        :param reconnect_delay: first wait before reopening a failed source, doubled up to `max_reconnect_delay`
+        """
+        super().__init__(name="stream-source", daemon=True)
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        self.source = source
+        self.is_file = is_file_source(source)
+        self.loop = loop
+        self.realtime = self.is_file if realtime is None else realtime
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._open_fn = open_fn
+
+        self.fps = DEFAULT_STREAM_FPS
+        self.frames_read = 0  # decoded frames, also the index of the next frame
+        self.dropped = 0  # frames replaced before anyone read them
+        self.reconnects = 0
+
+        self._cond = threading.Condition()
+        self._frame: Optional[np.ndarray] = None
+        self._seq = -1
+        self._consumed = -1
+        self._stopped = threading.Event()
+        self.closed = False
+
+    def _open(self) -> Optional[cv2.VideoCapture]:
+        cap = self._open_fn(self.source)
+        if cap is None or not cap.isOpened():
+            if cap is not None:
+                cap.release()
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps and 0 < fps < 1000:  # some streams report 0 or 90000
+            self.fps = fps
+        return cap
+
+    def _backoff(self, delay: float) -> float:
+        """Sleep before a reconnect attempt; returns the next delay."""
+        self._stopped.wait(delay)
+        return min(delay * 2, self.max_reconnect_delay)
+
+    def _publish(self, frame: np.ndarray):
+        with self._cond:
+            if self._seq > self._consumed:
+                self.dropped += 1
+            self._frame = frame
+            self._seq = self.frames_read
+            self.frames_read += 1
+            self._cond.notify_all()
+
+    def run(self):
+        delay = self.reconnect_delay
+        try:
+            while not self._stopped.is_set():
+                cap = self._open()
+                if cap is None:
+                    print(f"[WARNING] Cannot open stream {self.source}; retrying in {delay:.1f}s")
+                    delay = self._backoff(delay)
+                    self.reconnects += 1
+                    continue
+
+                delay = self.reconnect_delay
+                frame_time = 1.0 / self.fps
+                next_due = time.monotonic()
+                try:
+                    while not self._stopped.is_set():
+                        ret, frame = cap.read()
+                        if not ret:
+                            break
+                        if self.realtime:
+                            next_due += frame_time
+                            self._stopped.wait(max(0.0, next_due - time.monotonic()))
+                        self._publish(frame)
+                finally:
+                    cap.release()
+
+                if self._stopped.is_set():
+                    break
+                if self.is_file and not self.loop:
+                    break
+                if self.is_file:
+                    continue  # loop the file without counting it as a reconnect
+                print(f"[WARNING] Lost stream {self.source}; reconnecting in {delay:.1f}s")
+                delay = self._backoff(delay)
+                self.reconnects += 1
+        finally:
+            with self._cond:
+                self.closed = True
+                self._cond.notify_all()
+
+    def read(self, timeout: Optional[float] = None) -> Optional[Tuple[int, np.ndarray]]:
+        """
+        Wait for a frame newer than the last one returned and give back
+        (frame index, frame). Returns None on timeout or once the source is
+        closed and drained.
+        """
+        with self._cond:
+            ready = self._cond.wait_for(lambda: self._seq > self._consumed or self.closed, timeout)
+            if not ready or self._seq <= self._consumed:
+                return None
+            self._consumed = self._seq
+            return self._seq, self._frame
+
+    def stop(self):
+        """Stop decoding and wait for the reader thread to exit."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,208 @@
+# src/model/backends.py
+"""
+Inference backends that can stand in for the ultralytics/torch model.
+
+`OnnxModel` runs an exported YOLOv8 graph (fp32 or INT8) with ONNX Runtime
+and returns results shaped like ultralytics' (`result.boxes` with `cls`,
+`conf` and `xyxy`), so `detect_objects_yolo` works unchanged on top of it.
+OpenVINO is used through ONNX Runtime's execution provider when installed
+(onnxruntime-openvino); ONNX_PROVIDERS overrides the provider order.
+"""
+import ast
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+DEFAULT_IOU = 0.7  # same NMS threshold ultralytics uses by default
+LETTERBOX_COLOR = (114, 114, 114)
+
+# In order of preference; the ones the installed onnxruntime lacks are skipped
+ONNX_PROVIDERS = [p for p in os.getenv("ONNX_PROVIDERS", "OpenVINOExecutionProvider,CPUExecutionProvider").split(",")
+                  if p]
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+
+
+def to_numpy(values) -> np.ndarray:
+    """Convert torch tensors (any device) or array-likes to a NumPy array."""
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+class Boxes:
+    """NumPy twin of `ultralytics.engine.results.Boxes` for the fields we use."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self) -> int:
+        return len(self.cls)
+
+    @property
+    def data(self) -> np.ndarray:
+        """(N, 6) array of x1, y1, x2, y2, conf, cls, as in ultralytics."""
+        return np.concatenate([self.xyxy, self.conf[:, None], self.cls[:, None]], axis=1)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Boxes(self.xyxy[i:i + 1], self.conf[i:i + 1], self.cls[i:i + 1])
+
+
+class Result:
+    def __init__(self, boxes: Boxes, speed: Optional[Dict[str, float]] = None):
+        self.boxes = boxes
+        self.speed = speed or {}  # per-image ms by stage, as in ultralytics
+
+
+def letterbox(frame: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """Resize keeping aspect ratio and pad to a `size` x `size` square."""
+    h, w = frame.shape[:2]
+    gain = min(size / h, size / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return frame, gain, (left, top)
+
+
+def preprocess(frames: Sequence[np.ndarray], size: int) -> Tuple[np.ndarray, List[tuple]]:
+    """BGR frames -> normalised NCHW float32 blob plus per-frame (gain, pad)."""
+    blob = np.empty((len(frames), 3, size, size), dtype=np.float32)
+    meta = []
+    for i, frame in enumerate(frames):
+        boxed, gain, pad = letterbox(frame, size)
+        # BGR -> RGB, HWC -> CHW, [0, 255] -> [0, 1]
+        np.multiply(boxed[:, :, ::-1].transpose(2, 0, 1), 1 / 255.0, out=blob[i], casting="unsafe")
+        meta.append((gain, pad, frame.shape[:2]))
+    return blob, meta
+
+
+def postprocess(
+    output: np.ndarray,
+    meta: tuple,
+    conf_threshold: float,
+    iou_threshold: float = DEFAULT_IOU,
+) -> Boxes:
+    """
+    Decode one image of YOLOv8 output, shape (4 + num_classes, anchors),
+    into boxes in original frame coordinates after class-aware NMS.
+    """
+    gain, (pad_x, pad_y), (h, w) = meta
+    preds = output.T
+    scores = preds[:, 4:]
+    cls = scores.argmax(axis=1)
+    conf = scores[np.arange(len(cls)), cls]
+    keep = conf > conf_threshold
+    if not keep.any():
+        return Boxes(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32))
+
+    xywh, conf, cls = preds[keep, :4], conf[keep], cls[keep]
+    tl = xywh[:, :2] - xywh[:, 2:] / 2
+    idx = cv2.dnn.NMSBoxesBatched(
+        np.concatenate([tl, xywh[:, 2:]], axis=1).tolist(), conf.tolist(), cls.tolist(),
+        conf_threshold, iou_threshold,
+    )
+    idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+
+    xyxy = np.concatenate([tl[idx], tl[idx] + xywh[idx, 2:]], axis=1)
+    xyxy -= (pad_x, pad_y, pad_x, pad_y)
+    xyxy /= gain
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, w)
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, h)
+    return Boxes(xyxy.astype(np.float32), conf[idx].astype(np.float32), cls[idx].astype(np.float32))
+
+
+def _read_metadata(session) -> Tuple[Dict[int, str], int]:
+    """Class names and input size from the metadata ultralytics writes on export."""
+    meta = session.get_modelmeta().custom_metadata_map
+    names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+    imgsz = ast.literal_eval(meta["imgsz"])[0] if "imgsz" in meta else None
+    if imgsz is None:
+        dim = session.get_inputs()[0].shape[-1]
+        imgsz = dim if isinstance(dim, int) else 640
+    return names, int(imgsz)
+
+
+def onnx_providers(device: Optional[str], available: Sequence[str],
+                   configured: Optional[Sequence[str]] = None) -> list:
+    """
+    ONNX Runtime execution providers for a torch-style `device`. None keeps
+    the configured providers, "cpu" drops CUDA from them, and "cuda",
+    "cuda:N" or "N" put CUDA (on GPU N) first. A device ONNX Runtime cannot
+    serve falls back to the other providers with a warning.
+    """
+    cuda = "CUDAExecutionProvider"
+    base = [p for p in (configured or ONNX_PROVIDERS) if p in available] or ["CPUExecutionProvider"]
+    if device is None:
+        return base
+    others = [p for p in base if p != cuda] or ["CPUExecutionProvider"]
+    name = str(device).lower().split(",")[0]
+    if name == "cpu":
+        return others
+    if name == "cuda" or name.startswith("cuda:") or name.isdigit():
+        if cuda in available:
+            return [(cuda, {"device_id": int(name.split(":")[-1]) if name != "cuda" else 0})] + others
+        print(f"[WARNING] device={device} needs onnxruntime's {cuda}, which is not available; "
+              f"running on {', '.join(others)}")
+        return others
+    print(f"[WARNING] device={device} is not supported by the onnx backend; running on {', '.join(base)}")
+    return base
+
+
+class OnnxModel:
+    """YOLOv8 detector exported to ONNX, run with ONNX Runtime."""
+
+    def __init__(self, path: str, providers: Optional[List[str]] = None, threads: int = ONNX_THREADS,
+                 device: Optional[str] = None):
+        # Optional dependency, imported only when an ONNX model is loaded so the
+        # API and the helpers above (used on every request path) stay light
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("onnxruntime is not installed; install it to use the onnx backend")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        providers = onnx_providers(device, ort.get_available_providers(), providers)
+
+        self.path = path
+        self.session = ort.InferenceSession(path, sess_options=options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.max_batch = None if not isinstance(batch_dim, int) else batch_dim
+        self.names, self.imgsz = _read_metadata(self.session)
+
+    def __call__(self, source, conf: float = 0.25, iou: float = DEFAULT_IOU, **kwargs) -> List[Result]:
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        step = self.max_batch or len(frames)
+        results = []
+        for start in range(0, len(frames), step):
+            t0 = time.perf_counter()
+            blob, meta = preprocess(frames[start:start + step], self.imgsz)
+            t1 = time.perf_counter()
+            output = self.session.run(None, {self.input_name: blob})[0]
+            t2 = time.perf_counter()
+            boxes = [postprocess(out, m, conf, iou) for out, m in zip(output, meta)]
+            n = len(boxes)
+            speed = {"preprocess": 1000 * (t1 - t0) / n, "inference": 1000 * (t2 - t1) / n,
+                     "postprocess": 1000 * (time.perf_counter() - t2) / n}
+            results.extend(Result(b, speed) for b in boxes)
+        return results
+
+
+def onnx_path_for(weights: str, precision: str) -> str:
+    """Where the exported graph for a `.pt` weights file lives."""
+    base = os.path.splitext(weights)[0]
+    return f"{base}_int8.onnx" if precision == "int8" else f"{base}.onnx"
@@ -0,0 +1,230 @@
+# src/model/detections.py
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# One row per detected box in a single frame: model class id, confidence, box corners
+BOX_DTYPE = np.dtype([
+    ("cls", "<u2"),
+    ("conf", "<f4"),
+    ("x1", "<i4"),
+    ("y1", "<i4"),
+    ("x2", "<i4"),
+    ("y2", "<i4"),
+])
+
+# Same as BOX_DTYPE with the frame index in front, for whole-video logs
+DETECTION_DTYPE = np.dtype([("frame", "<i4")] + BOX_DTYPE.descr)
+
+
+def empty_boxes() -> np.ndarray:
+    return np.empty(0, dtype=BOX_DTYPE)
+
+
+def boxes_xyxy(records: np.ndarray) -> np.ndarray:
+    """(N, 4) int32 corner array from a BOX_DTYPE / DETECTION_DTYPE record."""
+    return np.stack([records["x1"], records["y1"], records["x2"], records["y2"]], axis=1)
+
+
+DETECTION_CACHE_VERSION = 1
+DETECTION_CACHE_DIR = os.path.join("SmarTSignalAI", "data", "cache", "detections")
+DETECTION_CACHE_CONFIDENCE = 0.1  # inference threshold for cached detections (tracker's low threshold)
+DETECTION_CACHE_MAX_BYTES = int(os.getenv("DETECTION_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))  # 5 GiB
+DETECTION_CACHE_MAX_AGE = float(os.getenv("DETECTION_CACHE_MAX_AGE_DAYS", "30")) * 86400
+
+
+def detection_cache_path(video_sha256: str, model_signature: str, cache_dir: str = DETECTION_CACHE_DIR) -> str:
+    """Directory holding the cached detections of one video for one model."""
+    model_key = hashlib.sha256(model_signature.encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{video_sha256[:32]}-{model_key}")
+
+
+class DetectionLog:
+    """
+    Collects per-frame detections of one video and saves them as a
+    memory-mappable directory:
+
+    - `detections.npy`: DETECTION_DTYPE records of every inferred frame, in frame order
+    - `frames.npy` / `offsets.npy`: inferred frame indices and where each
+      frame's records start, so one frame is a slice without scanning
+    - `meta.json`: labels indexed by model class id plus video / model info
+    """
+
+    def __init__(self, names: Optional[Dict[int, str]] = None, **meta):
+        self.names = names or {}
+        self.meta = meta
+        self._chunks: List[np.ndarray] = []
+        self._frames: List[int] = []
+        self._counts: List[int] = []
+
+    def add(self, frame_idx: int, records: np.ndarray):
+        """Record the BOX_DTYPE detections of one inferred frame (empty frames count too)."""
+        self._frames.append(frame_idx)
+        self._counts.append(len(records))
+        if len(records) == 0:
+            return
+        chunk = np.empty(len(records), dtype=DETECTION_DTYPE)
+        chunk["frame"] = frame_idx
+        for field in BOX_DTYPE.names:
+            chunk[field] = records[field]
+        self._chunks.append(chunk)
+
+    def to_array(self) -> np.ndarray:
+        if not self._chunks:
+            return np.empty(0, dtype=DETECTION_DTYPE)
+        return np.concatenate(self._chunks)
+
+    def save(self, path: str) -> str:
+        """Write the log to the directory `path` (replacing it atomically) and return it."""
+        path = path[:-4] if path.endswith(".npz") else path
+        size = max(self.names, default=-1) + 1
+        meta = dict(self.meta, version=DETECTION_CACHE_VERSION,
+                    labels=[self.names.get(i, str(i)) for i in range(size)])
+
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "detections.npy"), self.to_array())
+        np.save(os.path.join(tmp_path, "frames.npy"), np.asarray(self._frames, dtype=np.int64))
+        np.save(os.path.join(tmp_path, "offsets.npy"), np.concatenate([[0], np.cumsum(self._counts, dtype=np.int64)]))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        return path
+
+
+class DetectionCache:
+    """Read side of a saved DetectionLog; the arrays are memory-mapped, not loaded."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.labels: List[str] = self.meta["labels"]
+        self.names = dict(enumerate(self.labels))
+        self.detections = np.load(os.path.join(path, "detections.npy"), mmap_mode="r")
+        self.frames = np.load(os.path.join(path, "frames.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def frame(self, frame_idx: int) -> Optional[np.ndarray]:
+        """Records of one frame, or None if that frame was not inferred."""
+        pos = int(np.searchsorted(self.frames, frame_idx))
+        if pos == len(self.frames) or self.frames[pos] != frame_idx:
+            return None
+        return self.detections[self.offsets[pos]:self.offsets[pos + 1]]
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """(frame index, records) for every inferred frame, in order."""
+        for pos, frame_idx in enumerate(self.frames.tolist()):
+            yield frame_idx, self.detections[self.offsets[pos]:self.offsets[pos + 1]]
+
+
+def load_detections(path: str):
+    """Return (detections structured array, list of labels) from a saved log."""
+    if path.endswith(".npz"):  # logs written before the memory-mapped layout
+        with np.load(path) as data:
+            return data["detections"], data["labels"].tolist()
+    cache = DetectionCache(path)
+    return cache.detections, cache.labels
+
+
+def copy_detections(path: str, dest: str) -> str:
+    """Copy the saved log at `path` to the directory `dest` (replacing it atomically) and return it."""
+    tmp_path = f"{dest}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    shutil.copytree(path, tmp_path)
+    shutil.rmtree(dest, ignore_errors=True)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def merge_detections(paths: List[str], dest: str) -> str:
+    """
+    Join the logs saved by the segments of one video (in frame order) into
+    the directory `dest`, removing the parts; returns `dest`.
+    """
+    parts = [DetectionCache(path) for path in paths]
+    counts = [np.diff(part.offsets) for part in parts]
+    meta = dict(parts[0].meta, total_frames=max(part.meta.get("total_frames", 0) for part in parts))
+
+    tmp_path = f"{dest}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "detections.npy"), np.concatenate([part.detections for part in parts]))
+    np.save(os.path.join(tmp_path, "frames.npy"),
+            np.concatenate([part.frames for part in parts]).astype(np.int64))
+    np.save(os.path.join(tmp_path, "offsets.npy"),
+            np.concatenate([[0], np.cumsum(np.concatenate(counts), dtype=np.int64)]))
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(dest, ignore_errors=True)
+    os.replace(tmp_path, dest)
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+    return dest
+
+
+def directory_size(path: str) -> int:
+    """Bytes of the regular files under `path`."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:  # removed while we walked
+                pass
+    return total
+
+
+def touch_detection_cache(path: str):
+    """Mark a cached log as used now; its directory mtime is the last-used time."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict_detection_cache(cache_dir: str = DETECTION_CACHE_DIR, max_bytes: int = DETECTION_CACHE_MAX_BYTES,
+                          max_age: float = DETECTION_CACHE_MAX_AGE, keep: Optional[str] = None) -> int:
+    """
+    Drop cached logs unused for `max_age`, then least recently used ones
+    over `max_bytes` (`keep`, typically the log just written, stays).
+    The cache is shared by every result of a video, so it is evicted on
+    its own rather than with the result cache. Returns how many were removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    now = time.time()
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if not entry.is_dir() or ".tmp-" in entry.name:  # partial saves belong to a running job
+            continue
+        try:
+            entries.append((entry.stat().st_mtime, entry.path))
+        except OSError:
+            continue
+
+    removed = 0
+    total = directory_size(keep) if keep else 0
+    for last_used, path in sorted(entries, reverse=True):
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        size = directory_size(path)
+        if now - last_used > max_age or total + size > max_bytes:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        else:
+            total += size
+    if removed:
+        print(f"[INFO] Detection cache evicted {removed} log{'' if removed == 1 else 's'} "
+              f"({total / 1024 ** 2:.1f} MB kept)")
+    return removed
@@ -0,0 +1,129 @@
+# src/model/encoder.py
+import os
+import shutil
+import subprocess
+import uuid
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+class FFmpegPipeWriter:
+    """
+    Streams raw BGR frames into a single ffmpeg H.264 encoder over stdin.
+    Mirrors the parts of the `cv2.VideoWriter` API used by the pipeline.
+    """
+
+    def __init__(self, path: str, fps: float, width: int, height: int, preset: str = "ultrafast"):
+        self.path = path
+        self.frame_shape = (height, width, 3)
+        cmd = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}", "-r", f"{fps}",
+            "-i", "-",
+            "-an",
+            # libx264 with yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            path,
+        ]
+        self.proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def isOpened(self) -> bool:
+        return self.proc.poll() is None
+
+    def write(self, frame: np.ndarray):
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match encoder shape {self.frame_shape}")
+        # Hand the frame buffer to the pipe without an extra copy when possible
+        data = frame.data if frame.flags.c_contiguous else frame.tobytes()
+        self.proc.stdin.write(data)
+
+    def release(self):
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.proc.wait()
+        if returncode != 0:
+            raise IOError(f"ffmpeg exited with code {returncode} while encoding {self.path}")
+
+
+def open_video_writer(output_dir: str, fps: float, width: int, height: int) -> Tuple[object, str, bool]:
+    """
+    Open the writer for processed frames.
+
+    Returns (writer, path, needs_transcode). When ffmpeg is available frames
+    are encoded straight to the final MP4; otherwise an XVID AVI is written
+    and `needs_transcode` tells the caller to run `transcode_to_mp4` after.
+    """
+    name = uuid.uuid4().hex
+
+    if shutil.which("ffmpeg"):
+        final_path = os.path.join(output_dir, f"{name}_processed.mp4")
+        try:
+            writer = FFmpegPipeWriter(final_path, fps, width, height)
+            if writer.isOpened():
+                return writer, final_path, False
+        except OSError as e:
+            print(f"[WARNING] Could not start ffmpeg encoder, falling back to AVI: {e}")
+
+    raw_path = os.path.join(output_dir, f"{name}_raw.avi")
+    writer = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+    return writer, raw_path, True
+
+
+def transcode_to_mp4(raw_path: str) -> str:
+    """Convert an intermediate AVI to MP4, keeping the AVI if ffmpeg fails."""
+    final_path = raw_path.replace("_raw.avi", "_processed.mp4")
+
+    try:
+        print(f"[INFO] Converting video to MP4: {final_path}")
+        subprocess.run(
+            ["ffmpeg", "-y", "-i", raw_path, "-c:v", "libx264", "-preset", "ultrafast", final_path],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        os.remove(raw_path)
+    except Exception as e:
+        print(f"[ERROR] FFmpeg conversion failed, keeping AVI: {e}")
+        final_path = raw_path
+
+    return final_path
+
+
+def concat_videos(paths: List[str], output_path: str) -> str:
+    """
+    Join videos encoded with the same settings (e.g. the segments of one
+    job) with ffmpeg's concat demuxer, copying the streams without
+    re-encoding. The inputs are removed once the output is written.
+    """
+    list_path = f"{output_path}.txt"
+    with open(list_path, "w") as f:
+        for path in paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+             "-c", "copy", "-movflags", "+faststart", output_path],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    except subprocess.CalledProcessError as e:
+        raise IOError(f"[ERROR] Could not concatenate segments into {output_path}: {e.stderr.decode(errors='replace')}")
+    finally:
+        os.remove(list_path)
+    for path in paths:
+        os.remove(path)
+    return output_path
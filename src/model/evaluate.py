@@ -1 +1,115 @@
-# Placeholder
+# src/model/evaluate.py
+import argparse
+import sys
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.model.backends import to_numpy
+from src.model.export import sample_frames
+from src.model.registry import LoadedModel, get_model
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_boxes(
+    ref_xyxy: np.ndarray, ref_cls: np.ndarray,
+    cand_xyxy: np.ndarray, cand_cls: np.ndarray,
+    iou_threshold: float = 0.5,
+) -> List[float]:
+    """Greedy one-to-one matching of same-class boxes; returns the IoU of each match."""
+    if len(ref_xyxy) == 0 or len(cand_xyxy) == 0:
+        return []
+    iou = box_iou(ref_xyxy, cand_xyxy)
+    iou[ref_cls[:, None] != cand_cls[None, :]] = 0.0
+    matches = []
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < iou_threshold:
+            break
+        matches.append(float(iou[i, j]))
+        iou[i, :] = 0.0
+        iou[:, j] = 0.0
+    return matches
+
+
+def compare_backends(
+    reference: LoadedModel,
+    candidate: LoadedModel,
+    frames: Sequence[np.ndarray],
+    confidence: float = 0.25,
+    iou_threshold: float = 0.5,
+    batch_size: int = 8,
+) -> Dict[str, float]:
+    """
+    Accuracy-parity check of `candidate` (e.g. ONNX/INT8) against `reference`
+    (torch) on the same frames. Reference boxes are treated as ground truth.
+    """
+    ref_total = cand_total = 0
+    ious: List[float] = []
+    count_diffs: List[int] = []
+
+    for start in range(0, len(frames), batch_size):
+        batch = list(frames[start:start + batch_size])
+        ref_results = reference(batch, conf=confidence)
+        cand_results = candidate(batch, conf=confidence)
+        for ref, cand in zip(ref_results, cand_results):
+            ref_xyxy, ref_cls = to_numpy(ref.boxes.xyxy).reshape(-1, 4), to_numpy(ref.boxes.cls)
+            cand_xyxy, cand_cls = to_numpy(cand.boxes.xyxy).reshape(-1, 4), to_numpy(cand.boxes.cls)
+            ious.extend(match_boxes(ref_xyxy, ref_cls, cand_xyxy, cand_cls, iou_threshold))
+            ref_total += len(ref_cls)
+            cand_total += len(cand_cls)
+            count_diffs.append(abs(len(ref_cls) - len(cand_cls)))
+
+    matched = len(ious)
+    return {
+        "frames": len(frames),
+        "reference_boxes": ref_total,
+        "candidate_boxes": cand_total,
+        "recall": round(matched / ref_total, 4) if ref_total else 1.0,
+        "precision": round(matched / cand_total, 4) if cand_total else 1.0,
+        "mean_iou": round(float(np.mean(ious)), 4) if ious else 0.0,
+        "mean_count_diff": round(float(np.mean(count_diffs)), 4) if count_diffs else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check an exported backend against the torch model.")
+    parser.add_argument("videos", type=str, nargs="+", help="Videos to sample frames from")
+    parser.add_argument("--model_type", type=str, default=None, help="YOLO model type (yolov8n, yolov8s, etc.)")
+    parser.add_argument("--precision", type=str, default="fp32", choices=["fp32", "int8"],
+                        help="Precision of the ONNX model under test")
+    parser.add_argument("--num_frames", type=int, default=100, help="Number of frames to compare")
+    parser.add_argument("--confidence", type=float, default=0.25, help="Detection confidence threshold")
+    parser.add_argument("--min_recall", type=float, default=0.9, help="Fail below this recall")
+    parser.add_argument("--min_precision", type=float, default=0.9, help="Fail below this precision")
+    args = parser.parse_args()
+
+    frames = list(sample_frames(args.videos, args.num_frames))
+    if not frames:
+        print("[ERROR] No frames could be read from the given videos")
+        sys.exit(2)
+
+    reference = get_model(args.model_type, backend="torch")
+    candidate = get_model(args.model_type, backend="onnx", precision=args.precision)
+    report = compare_backends(reference, candidate, frames, confidence=args.confidence)
+
+    print("\n========== BACKEND PARITY ==========")
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    passed = report["recall"] >= args.min_recall and report["precision"] >= args.min_precision
+    print(f"Result: {'PASS' if passed else 'FAIL'}")
+    print("====================================")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
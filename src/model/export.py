@@ -0,0 +1,126 @@
+# src/model/export.py
+import argparse
+import os
+from typing import Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from src.model.backends import onnx_path_for, preprocess
+
+
+def export_onnx(weights: str, imgsz: int = 640) -> str:
+    """Export ultralytics weights to an ONNX graph with a dynamic batch axis."""
+    from ultralytics import YOLO
+
+    print(f"[INFO] Exporting {weights} to ONNX (imgsz={imgsz})")
+    path = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    return str(path)
+
+
+def sample_frames(video_paths: List[str], num_frames: int, every: int = 15) -> Iterator[np.ndarray]:
+    """Yield up to `num_frames` frames, taking every `every`-th frame of each video."""
+    yielded = 0
+    for path in video_paths:
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            print(f"[WARNING] Cannot open calibration video: {path}")
+            continue
+        idx = 0
+        try:
+            while yielded < num_frames:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if idx % every == 0:
+                    yielded += 1
+                    yield frame
+                idx += 1
+        finally:
+            cap.release()
+        if yielded >= num_frames:
+            return
+
+
+def quantize_int8(
+    fp32_path: str,
+    calibration_videos: List[str],
+    output_path: Optional[str] = None,
+    num_frames: int = 200,
+    imgsz: int = 640,
+) -> str:
+    """
+    Statically quantize an ONNX graph to INT8, calibrating activation ranges
+    on frames from our own footage rather than a generic dataset.
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType, quantize_static,
+    )
+
+    output_path = output_path or fp32_path.replace(".onnx", "_int8.onnx")
+    input_name = onnx.load(fp32_path, load_external_data=False).graph.input[0].name
+
+    class VideoCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._frames = sample_frames(calibration_videos, num_frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            if frame is None:
+                return None
+            blob, _ = preprocess([frame], imgsz)
+            return {input_name: blob}
+
+    print(f"[INFO] Calibrating INT8 model on up to {num_frames} frames from {len(calibration_videos)} video(s)")
+    quantize_static(
+        fp32_path,
+        output_path,
+        VideoCalibrationReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+    )
+
+    # Keep the class names / input size ultralytics stored on the fp32 graph
+    src_model = onnx.load(fp32_path, load_external_data=False)
+    int8_model = onnx.load(output_path)
+    existing = {p.key for p in int8_model.metadata_props}
+    for prop in src_model.metadata_props:
+        if prop.key not in existing:
+            int8_model.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(int8_model, output_path)
+
+    print(f"[INFO] INT8 model written to {output_path}")
+    return output_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a YOLO model for the ONNX Runtime backend.")
+    parser.add_argument("weights", type=str, help="Model weights or name (e.g. yolov8s.pt)")
+    parser.add_argument("--imgsz", type=int, default=640, help="Inference image size")
+    parser.add_argument("--int8", action="store_true", help="Also produce an INT8 statically-quantized model")
+    parser.add_argument("--calibration", type=str, nargs="+", default=[],
+                        help="Videos used to calibrate INT8 activation ranges")
+    parser.add_argument("--num_frames", type=int, default=200, help="Number of calibration frames")
+    args = parser.parse_args()
+
+    from src.model.registry import resolve_weights
+
+    weights = resolve_weights(args.weights)
+    fp32_path = onnx_path_for(weights, "fp32")
+    if not os.path.exists(fp32_path):
+        fp32_path = export_onnx(weights, imgsz=args.imgsz)
+    print(f"[INFO] FP32 model: {fp32_path}")
+
+    if args.int8:
+        if not args.calibration:
+            parser.error("--int8 needs at least one --calibration video")
+        quantize_int8(fp32_path, args.calibration, onnx_path_for(weights, "int8"),
+                      num_frames=args.num_frames, imgsz=args.imgsz)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# src/model/metrics.py
+"""
+In-process metrics for the video pipeline.
+
+Hot paths record into fixed-bucket histograms and counters guarded by one
+short lock, so recording costs about a microsecond and reading never
+touches the pipeline. `snapshot()` feeds the JSON status endpoint and
+`prometheus()` renders the Prometheus text format. Metrics are per
+process: each Celery worker keeps its own.
+"""
+import bisect
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+STAGES = ("decode", "preprocess", "infer", "postprocess", "encode")
+# Upper bounds in seconds, from sub-millisecond decode to multi-second CPU inference
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+PREFIX = "smartsignal"
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets (Prometheus semantics)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float, n: int = 1):
+        """Record `n` observations of `seconds` each."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += n
+        self.sum += seconds * n
+        self.count += n
+
+    def quantile(self, q: float) -> float:
+        """Estimate (seconds) by linear interpolation inside the bucket holding rank q."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class RateMeter:
+    """Events per second over the last `window` seconds, counted in one-second slots."""
+
+    def __init__(self, window: int = 10, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self._slots: deque = deque()  # [second, count]
+
+    def add(self, n: int = 1):
+        now = int(self.clock())
+        if self._slots and self._slots[-1][0] == now:
+            self._slots[-1][1] += n
+        else:
+            self._slots.append([now, n])
+        self._trim(now)
+
+    def _trim(self, now: int):
+        while self._slots and self._slots[0][0] <= now - self.window:
+            self._slots.popleft()
+
+    def rate(self) -> float:
+        now = int(self.clock())
+        self._trim(now)
+        return sum(n for _, n in self._slots) / self.window
+
+
+class Metrics:
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+        self.frames_total = 0
+        self.inferred_total = 0
+        self.videos_total = 0
+        self.videos_active = 0
+        self.fps = RateMeter(clock=clock)
+        self.gauges: Dict[str, float] = {}
+        self._queues: Dict[str, List] = {}
+
+    def observe(self, stage: str, seconds: float, n: int = 1):
+        with self._lock:
+            self.stages[stage].observe(seconds, n)
+
+    def observe_model_call(self, results, elapsed: float, n: int, postprocess: float = 0.0):
+        """
+        Split one model call over `n` frames (`elapsed` seconds, plus
+        `postprocess` seconds of our own result handling) into preprocess /
+        infer / postprocess, using the per-image `speed` (ms) results carry
+        when the backend reports it; otherwise the call counts as inference.
+        """
+        speed = (getattr(results[0], "speed", None) if len(results) else None) or {}
+        pre = (speed.get("preprocess") or 0.0) / 1000
+        post = (speed.get("postprocess") or 0.0) / 1000
+        infer = max(elapsed / n - pre - post, 0.0)
+        with self._lock:
+            if pre:
+                self.stages["preprocess"].observe(pre, n)
+            self.stages["infer"].observe(infer, n)
+            self.stages["postprocess"].observe(post + postprocess / n, n)
+            self.inferred_total += n
+
+    def add_frames(self, n: int = 1):
+        with self._lock:
+            self.frames_total += n
+            self.fps.add(n)
+
+    def video_started(self):
+        with self._lock:
+            self.videos_total += 1
+            self.videos_active += 1
+
+    def video_finished(self):
+        with self._lock:
+            self.videos_active -= 1
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def watch_queue(self, name: str, q):
+        """Report `q.qsize()` under `name` (summed over every watched queue) until `unwatch_queue`."""
+        with self._lock:
+            self._queues.setdefault(name, []).append(q)
+
+    def unwatch_queue(self, name: str, q):
+        with self._lock:
+            queues = self._queues.get(name, [])
+            if q in queues:
+                queues.remove(q)
+
+    def queue_depths(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: sum(q.qsize() for q in queues) for name, queues in self._queues.items()}
+
+    def workers(self) -> Dict[str, Optional[float]]:
+        busy, total = self.gauges.get("workers_busy", 0), self.gauges.get("workers_total", 0)
+        return {"busy": busy, "total": total, "utilization": round(busy / total, 3) if total else None}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "mean_ms": round(1000 * h.sum / h.count, 3) if h.count else 0.0,
+                    "p50_ms": round(1000 * h.quantile(0.5), 3),
+                    "p95_ms": round(1000 * h.quantile(0.95), 3),
+                }
+                for stage, h in self.stages.items()
+            }
+            counters = {"frames_total": self.frames_total, "inferred_total": self.inferred_total,
+                        "videos_total": self.videos_total, "videos_active": self.videos_active,
+                        "fps": round(self.fps.rate(), 2)}
+        return {"stages": stages, **counters, "queues": self._all_queue_depths(), "workers": self.workers()}
+
+    def _all_queue_depths(self) -> Dict[str, float]:
+        """Watched queues plus queue depths set as `queue_<name>` gauges."""
+        queues = self.queue_depths()
+        queues.update({name[len("queue_"):]: v for name, v in self.gauges.items() if name.startswith("queue_")})
+        return queues
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        name = f"{PREFIX}_stage_latency_seconds"
+        lines = [f"# HELP {name} Per-frame latency of each pipeline stage.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for stage, h in self.stages.items():
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + [math.inf], h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            counters = {"frames": self.frames_total, "inferred_frames": self.inferred_total,
+                        "videos": self.videos_total}
+            gauges = {"frames_per_second": self.fps.rate(), "videos_active": self.videos_active}
+
+        for metric, value in counters.items():
+            lines += [f"# TYPE {PREFIX}_{metric}_total counter", f"{PREFIX}_{metric}_total {value}"]
+        for metric, value in gauges.items():
+            lines += [f"# TYPE {PREFIX}_{metric} gauge", f"{PREFIX}_{metric} {value}"]
+
+        lines.append(f"# TYPE {PREFIX}_queue_depth gauge")
+        lines += [f'{PREFIX}_queue_depth{{queue="{q}"}} {depth}' for q, depth in self._all_queue_depths().items()]
+        workers = self.workers()
+        lines += [f"# TYPE {PREFIX}_workers_busy gauge", f"{PREFIX}_workers_busy {workers['busy']}",
+                  f"# TYPE {PREFIX}_workers_total gauge", f"{PREFIX}_workers_total {workers['total']}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
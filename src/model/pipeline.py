@@ -0,0 +1,110 @@
+# src/model/pipeline.py
+"""
+Threaded decode / encode stages for the video pipeline.
+
+Decoding and encoding run on their own threads and talk to the inference
+loop through bounded queues, so a slow stage applies backpressure instead
+of buffering the whole video in memory. Each stage is a single FIFO, which
+keeps frames in their original order.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+import cv2
+
+from src.model.metrics import metrics
+
+_EOF = object()
+
+
+class FrameReader(threading.Thread):
+    """Decodes frames from a `cv2.VideoCapture` into a bounded queue (at most `max_frames`)."""
+
+    def __init__(self, cap: cv2.VideoCapture, maxsize: int = 16, max_frames: Optional[int] = None):
+        super().__init__(name="frame-reader", daemon=True)
+        self.cap = cap
+        self.max_frames = max_frames
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+        self.error: Optional[BaseException] = None
+        self._stopped = threading.Event()
+
+    def _put(self, item) -> bool:
+        """Block until there is room in the queue or the reader is stopped."""
+        while not self._stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        try:
+            remaining = self.max_frames
+            while not self._stopped.is_set() and remaining != 0:
+                if remaining is not None:
+                    remaining -= 1
+                start = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                metrics.observe("decode", time.perf_counter() - start)
+                if not self._put(frame):
+                    return
+        except Exception as e:
+            self.error = e
+        self._put(_EOF)
+
+    def __iter__(self) -> Iterator[cv2.Mat]:
+        while True:
+            item = self.queue.get()
+            if item is _EOF:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        """Ask the reader to finish and wait for it to exit."""
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+
+
+class FrameWriter(threading.Thread):
+    """Hands frames to `write_fn` on a background thread, in order."""
+
+    def __init__(self, write_fn: Callable[[cv2.Mat], None], maxsize: int = 16):
+        super().__init__(name="frame-writer", daemon=True)
+        self.write_fn = write_fn
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+        self.error: Optional[BaseException] = None
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is _EOF:
+                return
+            if self.error is not None:
+                continue  # drain so producers never block on a dead writer
+            try:
+                start = time.perf_counter()
+                self.write_fn(item)
+                metrics.observe("encode", time.perf_counter() - start)
+            except Exception as e:
+                self.error = e
+
+    def write(self, frame: cv2.Mat):
+        """Queue a frame for writing. Blocks while the queue is full."""
+        if self.error is not None:
+            raise self.error
+        self.queue.put(frame)
+
+    def close(self):
+        """Flush queued frames and wait for the writer to exit."""
+        if self.is_alive():
+            self.queue.put(_EOF)
+            self.join()
+
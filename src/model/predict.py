@@ -1,109 +1,458 @@
 # src/model/predict.py
 import cv2
-import uuid
+import numpy as np
 import os
-import subprocess
-from typing import Tuple, Optional
-from src.model.yolo_utils import detect_objects_yolo
-from app.database import get_session, VideoTask
-from sqlmodel import select
-
-def update_task_progress(task_id: str, progress: int, status: Optional[str] = None):
-    """Safely update task progress in the database."""
+from itertools import repeat
+from typing import Dict, Tuple, Optional, List
+from src.model.yolo_utils import detect_objects_yolo_batch, draw_detections, DEFAULT_CONFIDENCE, TRACKED_CLASSES
+from src.model.registry import LoadedModel, get_model, model_signature
+from src.model.pipeline import FrameReader, FrameWriter
+from src.model.metrics import metrics
+from src.model.encoder import open_video_writer, transcode_to_mp4
+from src.model.detections import (
+    DETECTION_CACHE_CONFIDENCE, DETECTION_CACHE_VERSION, DetectionCache, DetectionLog,
+    boxes_xyxy, copy_detections, detection_cache_path, empty_boxes, evict_detection_cache,
+    touch_detection_cache,
+)
+from src.preprocessing import FrameSampler
+from src.tracking.tracker import IoUTracker
+from src.analysis.traffic_insights import TrafficInsights
+from app.progress import ProgressReporter
+from app.uploads import file_sha256
+
+IDLE_SPEED_KMH = 5.0  # tracks slower than this count as idle
+
+def detect_batch(
+    frames: List[cv2.Mat],
+    first_idx: int,
+    enhanced: bool,
+    model: LoadedModel,
+    confidence: float,
+) -> List[Tuple[cv2.Mat, dict, np.ndarray]]:
+    """
+    Run YOLO on a batch of frames, falling back to per-frame inference
+    so one bad frame does not drop detections for the whole batch.
+    Returns (frame, stats, detection records) per input frame.
+    """
     try:
-        with get_session() as session:
-            task = session.exec(select(VideoTask).where(VideoTask.id == task_id)).first()
-            if task:
-                task.progress = progress
-                if status:
-                    task.status = status
-                session.add(task)
-                session.commit()
+        return [(f, s, r) for f, r, s in detect_objects_yolo_batch(
+            frames, enhanced=enhanced, model=model, confidence=confidence)]
     except Exception as e:
-        print(f"[WARNING] Could not update progress for {task_id}: {e}")
+        print(f"[WARNING] Batched YOLO failed on frames {first_idx}-{first_idx + len(frames) - 1}: {e}")
+
+    results = []
+    for offset, frame in enumerate(frames):
+        try:
+            detected_frame, records, frame_stats = detect_objects_yolo_batch(
+                [frame], enhanced=enhanced, model=model, confidence=confidence)[0]
+        except Exception as e:
+            print(f"[WARNING] YOLO failed on frame {first_idx + offset}: {e}")
+            detected_frame, records, frame_stats = frame, empty_boxes(), {}
+        results.append((detected_frame, frame_stats, records))
+    return results
+
+def _iter_cached_batches(frames, cache: DetectionCache, batch_size: int, start: int = 0):
+    """
+    Like `_iter_sampled_batches` for a replay: a frame counts as inferred
+    when the cache holds detections for it. `frames` may be placeholders
+    (None) when nothing is rendered.
+    """
+    inferred = set(cache.frames.tolist())
+    pending = []
+    for idx, frame in enumerate(frames, start):
+        pending.append((frame, idx in inferred))
+        if len(pending) >= batch_size * 4:
+            yield pending
+            pending = []
+    if pending:
+        yield pending
+
+def _iter_sampled_batches(frames, sampler: FrameSampler, batch_size: int):
+    """
+    Group frames into lists of (frame, infer) pairs holding at most
+    `batch_size` frames to infer. Skipped frames stay in decode order
+    between them; the pending list is capped so long static stretches
+    do not pile up in memory.
+    """
+    pending, n_infer = [], 0
+    max_pending = batch_size * 4
+    for frame in frames:
+        infer = sampler.should_infer(frame)
+        pending.append((frame, infer))
+        n_infer += infer
+        if n_infer >= batch_size or len(pending) >= max_pending:
+            yield pending
+            pending, n_infer = [], 0
+    if pending:
+        yield pending
+
+def feed_insights(insights: TrafficInsights, records: np.ndarray, track_ids: np.ndarray,
+                   confirmed: np.ndarray, labels: np.ndarray, frame_idx: int) -> List[dict]:
+    """
+    Pass the confirmed tracks of one inferred frame to TrafficInsights as
+    arrays; returns the aggregates of any windows this frame closed.
+    """
+    if not confirmed.any():
+        return insights.advance(frame_idx)
+    records = records[confirmed]
+    return insights.update({
+        "id": track_ids[confirmed],
+        "bbox": boxes_xyxy(records),
+        "class": labels[records["cls"]],
+    }, frame_idx)
+
+def _summarize(tracker: IoUTracker, insights: TrafficInsights, names: dict,
+               total_frames: int, inferred_frames: int, vehicle_frames: int, track_details: bool = True) -> dict:
+    """Build the stats dict from unique tracks and per-track speeds."""
+    counts = {label: 0 for label in TRACKED_CLASSES}
+    for cls_id, n in tracker.class_counts.items():
+        label = names[cls_id].lower()
+        if label in counts:
+            counts[label] += n
+    return summarize_insights(insights, counts, tracker.unique_count,
+                              total_frames, inferred_frames, vehicle_frames, track_details)
+
+def summarize_insights(insights: TrafficInsights, counts: dict, unique_vehicles: int,
+                       total_frames: int, inferred_frames: int, vehicle_frames: int,
+                       track_details: bool = True) -> dict:
+    """
+    Stats dict from per-class unique counts and the per-track insights, all
+    over the whole video (windowed insights are summarised by session).
+    `track_details` adds the per-vehicle "tracks" rows, a detail list that
+    `app.schemas.split_stats` keeps out of the published summary.
+    """
+    insights = insights.session_insights()
+    track_speeds = insights.compute_speeds()
+    speeds = np.fromiter(track_speeds.values(), dtype=np.float64)
+    congestion = insights.compute_congestion_level()
+    idle = int((speeds < IDLE_SPEED_KMH).sum())
+
+    stats = {
+        **counts,
+        "avgSpeed": round(float(speeds.mean()), 1) if len(speeds) else 0.0,
+        "unique_vehicles": unique_vehicles,
+        "moving_vehicles": len(speeds) - idle,
+        "idle_vehicles": idle,
+        "total_frames": total_frames,
+        "inferred_frames": inferred_frames,
+        "avg_density": round(vehicle_frames / total_frames, 2) if total_frames else 0.0,
+        "congestion_level": congestion,
+        # Bounded figures only: per-vehicle speeds travel in the paged "tracks" details
+        "traffic_insights": {
+            "density": insights.compute_density(),
+            "congestion_level": congestion,
+        },
+    }
+    if track_details:
+        stats["tracks"] = _track_details(insights, track_speeds)
+    return stats
+
+def _track_details(insights: TrafficInsights, speeds: Dict[int, float]) -> List[dict]:
+    """One row per tracked vehicle: class, frame span, entry/exit position, distance and average speed."""
+    table = insights.track_table()
+    return [
+        {"id": vid, "class": cls, "first_frame": first, "last_frame": last,
+         "first_center": [round(v, 1) for v in first_center], "last_center": [round(v, 1) for v in last_center],
+         "distance_m": round(distance, 2), "speed_kmh": speeds.get(vid, 0.0)}
+        for vid, cls, first, last, first_center, last_center, distance in zip(
+            table["id"], table["class"], table["first_frame"], table["last_frame"],
+            table["first_center"], table["last_center"], table["distance"])
+    ]
+
+def _remove_partial_output(path: Optional[str]):
+    try:
+        if path and os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"[WARNING] Could not remove partial output {path}: {e}")
+
+def _open_detection_cache(path: str, confidence: float, sample_mode: str, stride: int,
+                          motion_threshold: float) -> Optional[DetectionCache]:
+    """The cached detections at `path` if they can stand in for inference with these settings."""
+    if not os.path.isdir(path):
+        return None
+    try:
+        cache = DetectionCache(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[WARNING] Ignoring unreadable detection cache {path}: {e}")
+        return None
+    meta = cache.meta
+    if meta.get("version") != DETECTION_CACHE_VERSION or meta.get("confidence", 1.0) > confidence:
+        return None
+    sampling = (sample_mode, stride, motion_threshold)
+    if meta.get("sample_mode") != "all" and (meta.get("sample_mode"), meta.get("stride"), meta.get("motion_threshold")) != sampling:
+        return None
+    return cache
 
 def process_video_with_model(
     input_path: str,
     output_dir: str = "SmarTSignalAI/data/processed",
     task_id: str = "",
     enhanced: bool = False,
-) -> Tuple[str, dict]:
+    batch_size: int = 8,
+    queue_size: int = 16,
+    sample_mode: str = "all",
+    stride: int = 1,
+    motion_threshold: float = 2.0,
+    analytics_only: bool = False,
+    save_detections: bool = False,
+    model_type: Optional[str] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+    device: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None,
+    meter_per_pixel: float = 0.05,
+    window_seconds: Optional[float] = None,
+    window_slide: Optional[float] = None,
+    use_detection_cache: bool = False,
+    video_sha256: Optional[str] = None,
+    detections_path: Optional[str] = None,
+    segment: Optional[Tuple[int, int]] = None,
+) -> Tuple[Optional[str], dict]:
     """
     Processes a video using YOLOv8 detection and saves annotated output.
-    Updates task progress live in the database (used with Celery workers).
+    Updates task progress live through a throttled `ProgressReporter`
+    (used with Celery workers and the in-process API path); marking the task
+    completed is left to the caller, once the result is stored.
+    Frames are sent to the model `batch_size` at a time; decoding and
+    encoding run on their own threads behind queues of `queue_size` frames.
+
+    `sample_mode` selects which frames are inferred ("all", "stride" or
+    "motion", see `FrameSampler`). Skipped frames reuse the detections of
+    the last inferred frame for annotation and stats.
+
+    With `analytics_only` no video is drawn or encoded and the returned path
+    is None. `save_detections` writes the records of every inferred frame to a
+    memory-mappable directory next to the output (see `DetectionLog`); its
+    path is returned in `stats["detections_path"]`.
+
+    With `use_detection_cache` the raw detections are kept in a cache keyed
+    by the video's SHA-256 (`video_sha256`, computed when not given) and the
+    model, evicted least recently used first past DETECTION_CACHE_MAX_BYTES.
+    A later run of the same video and model replays them instead of running
+    inference, so re-rendering, a higher `confidence` or another calibration
+    take seconds; analytics-only replays do not even decode the video.
+    `detections_path` replays a specific saved log the same way.
+
+    `model_type`, `device`, `precision` and `backend` ("torch" or "onnx")
+    pick the shared model from the registry (defaults come from YOLO_MODEL,
+    YOLO_DEVICE, YOLO_PRECISION and YOLO_BACKEND).
+
+    Detections are associated across frames by `IoUTracker`, so class counts
+    are unique vehicles rather than per-frame sums, and confirmed tracks feed
+    `TrafficInsights` (scaled by `meter_per_pixel`) for speeds and congestion.
+    With `window_seconds` the insights are windowed (sliding every
+    `window_slide` seconds, tumbling by default) and the per-window
+    aggregates are returned in `stats["windows"]`.
+
+    `segment=(start_frame, end_frame)` processes only that part of the video
+    (frame indices stay global) and adds what `merge_segment_stats` needs to
+    combine segments into `stats["segment"]`.
     """
 
+    batch_size = max(1, int(batch_size))
+
+    cache, cache_dir = None, None
+    if detections_path:
+        cache = DetectionCache(detections_path)
+        if cache.meta.get("confidence", 0.0) > confidence:
+            print(f"[WARNING] {detections_path} was inferred at confidence {cache.meta['confidence']}, "
+                  f"detections below it are missing")
+    elif use_detection_cache and segment is None:  # the cache always covers whole videos
+        video_sha256 = video_sha256 or file_sha256(input_path)
+        signature = model_signature(model_type, precision=precision, backend=backend)
+        cache_dir = detection_cache_path(video_sha256, signature)
+        cache = _open_detection_cache(cache_dir, confidence, sample_mode, stride, motion_threshold)
+        if cache is not None:
+            touch_detection_cache(cache_dir)
+
+    if cache is not None:
+        model = None
+        names = cache.names
+        print(f"[INFO] Replaying cached detections from {cache.path} (no inference)")
+    else:
+        model = get_model(model_type, device=device, precision=precision, backend=backend)
+        names = model.names
+
     os.makedirs(output_dir, exist_ok=True)
 
     print(f"[INFO] Starting video processing: {input_path}")
 
-    cap = cv2.VideoCapture(input_path)
-    if not cap.isOpened():
-        raise IOError(f"[ERROR] Cannot open video file: {input_path}")
+    # A replay that renders nothing needs no frames at all
+    if cache is not None and analytics_only:
+        cap = None
+        fps = cache.meta.get("fps") or 30
+        width, height = cache.meta.get("width"), cache.meta.get("height")
+        total_frames = cache.meta.get("total_frames", 0)
+    else:
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            raise IOError(f"[ERROR] Cannot open video file: {input_path}")
 
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
 
-    if width == 0 or height == 0:
-        cap.release()
-        raise ValueError(f"[ERROR] Invalid video dimensions (width={width}, height={height})")
+        if width == 0 or height == 0:
+            cap.release()
+            raise ValueError(f"[ERROR] Invalid video dimensions (width={width}, height={height})")
 
-    raw_filename = f"{uuid.uuid4().hex}_raw.avi"
-    raw_path = os.path.join(output_dir, raw_filename)
-    out = cv2.VideoWriter(raw_path, cv2.VideoWriter_fourcc(*'XVID'), fps, (width, height))
+    start_frame = 0
+    if segment is not None:
+        start_frame, end_frame = segment
+        total_frames = end_frame - start_frame
+        if cap is not None and start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    sampler = FrameSampler(mode=sample_mode, stride=stride, motion_threshold=motion_threshold,
+                           first_frame=start_frame)
 
-    frame_idx = 0
-    stats = {"car": 0, "bus": 0, "truck": 0, "motorbike": 0, "bicycle": 0, "avgSpeed": 0}
+    # Nothing is rendered in analytics-only mode, so skip the drawing too
+    draw = enhanced and not analytics_only
+    if analytics_only:
+        out, out_path, needs_transcode = None, None, False
+    else:
+        # Encode straight to MP4 through ffmpeg when possible, AVI + transcode otherwise
+        out, out_path, needs_transcode = open_video_writer(output_dir, fps, width, height)
 
-    update_task_progress(task_id, 0, "processing")
+    # Detections written to the cache are inferred at a low threshold so
+    # later runs can raise `confidence` without inferring again
+    infer_conf = min(confidence, DETECTION_CACHE_CONFIDENCE) if cache_dir else confidence
+    detection_log = None
+    if cache is None and (save_detections or cache_dir):
+        detection_log = DetectionLog(
+            names, fps=fps, width=width, height=height, confidence=infer_conf,
+            sample_mode=sample_mode, stride=stride, motion_threshold=motion_threshold,
+            video_sha256=video_sha256, model=model.weights,
+        )
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    frame_idx = start_frame
+    vehicle_frames = 0  # sum of per-frame vehicle counts, for average density
+    tracker = IoUTracker(max_age=max(int(fps), 1))
+    insights = TrafficInsights(frame_rate=fps, meter_per_pixel=meter_per_pixel,
+                               window_seconds=window_seconds, slide_seconds=window_slide, keep_session=True)
+    windows = []
+    labels = np.array([names.get(i, "").lower() for i in range(max(names, default=-1) + 1)])
 
-        try:
-            detected_frame, _, frame_stats = detect_objects_yolo(frame, enhanced=enhanced)
-        except Exception as e:
-            print(f"[WARNING] YOLO failed on frame {frame_idx}: {e}")
-            detected_frame = frame
-            frame_stats = {}
+    reporter = ProgressReporter(task_id)
+    reporter.update(0, "processing")
 
-        out.write(detected_frame)
+    # Decode and encode on their own threads, inference stays on this one
+    reader = FrameReader(cap, maxsize=queue_size, max_frames=total_frames if segment else None) if cap is not None else None
+    writer = FrameWriter(out.write, maxsize=queue_size) if out is not None else None
+    if reader:
+        reader.start()
+        metrics.watch_queue("decode", reader.queue)
+    if writer:
+        writer.start()
+        metrics.watch_queue("encode", writer.queue)
+    metrics.video_started()
 
-        # Update stats safely
-        for key in stats:
-            stats[key] += frame_stats.get(key, 0)
+    if cache is not None:
+        frames = reader if reader else repeat(None, total_frames)
+        batches = _iter_cached_batches(frames, cache, batch_size, start_frame)
+    else:
+        batches = _iter_sampled_batches(reader, sampler, batch_size)
 
-        frame_idx += 1
-        if total_frames and frame_idx % 5 == 0:
-            progress = min(int((frame_idx / total_frames) * 100), 99)
-            update_task_progress(task_id, progress)
+    inferred_frames = 0
+    reporter_percent = 0
+    last_records = empty_boxes()
+    failed, write_error = False, None
 
-    cap.release()
-    out.release()
+    try:
+        for pending in batches:
+            if cache is None:
+                to_infer = [frame for frame, infer in pending if infer]
+                results = iter([r for _, _, r in detect_batch(to_infer, frame_idx, False, model, infer_conf)])
 
-    # Convert to MP4
-    final_filename = raw_filename.replace("_raw.avi", "_processed.mp4")
-    final_path = os.path.join(output_dir, final_filename)
+            metrics.add_frames(len(pending))
+            for frame, infer in pending:
+                if infer:
+                    records = next(results) if cache is None else cache.frame(frame_idx)
+                    inferred_frames += 1
+                    if detection_log:
+                        detection_log.add(frame_idx, records)
+                    last_records = records[records["conf"] >= confidence] if infer_conf < confidence or cache is not None else records
+                    track_ids, confirmed = tracker.update(last_records, frame_idx)
+                    windows += feed_insights(insights, last_records, track_ids, confirmed, labels, frame_idx)
+                if writer:
+                    writer.write(draw_detections(frame, last_records, names) if draw else frame)
 
-    try:
-        print(f"[INFO] Converting video to MP4: {final_path}")
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", raw_path, "-c:v", "libx264", "-preset", "ultrafast", final_path],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-        os.remove(raw_path)
-    except Exception as e:
-        print(f"[ERROR] FFmpeg conversion failed, keeping AVI: {e}")
-        final_path = raw_path
+                vehicle_frames += len(last_records)
+
+                frame_idx += 1
+                if total_frames:
+                    percent = min(int(((frame_idx - start_frame) / total_frames) * 100), 99)
+                    if percent != reporter_percent:
+                        # Running accumulators make the live snapshot cheap enough per percent
+                        reporter.update(percent, insights=insights.summary())
+                        reporter_percent = percent
+    except BaseException:
+        reporter.close(status="failed")
+        failed = True
+        raise
+    finally:
+        metrics.video_finished()
+        if reader:
+            reader.stop()
+            metrics.unwatch_queue("decode", reader.queue)
+        if cap is not None:
+            cap.release()
+        if writer:
+            writer.close()
+            metrics.unwatch_queue("encode", writer.queue)
+            try:
+                out.release()  # the ffmpeg writer raises when the encoder exited non-zero
+            except Exception as e:
+                write_error = write_error or e
+            write_error = write_error or writer.error
+            if failed or write_error is not None:
+                _remove_partial_output(out_path)
+
+    if write_error is not None:
+        reporter.close(status="failed")
+        raise IOError(f"[ERROR] Failed to write processed video: {write_error}")
+
+    final_path = transcode_to_mp4(out_path) if needs_transcode else out_path
+    # A segment's vehicles travel to the merge as the compact session table
+    # below; per-vehicle rows are built once, for the merged video
+    stats = _summarize(tracker, insights, names, frame_idx - start_frame, inferred_frames, vehicle_frames,
+                       track_details=segment is None)
+    if segment is not None:
+        stats["segment"] = {
+            "start_frame": start_frame,
+            "end_frame": frame_idx,
+            "fps": fps,
+            "width": width,
+            "height": height,
+            "vehicle_frames": vehicle_frames,
+            "tracks": insights.session_table(),
+        }
+    if window_seconds:
+        last = insights.flush()
+        stats["windows"] = windows + ([last] if last and last["end_frame"] > last["start_frame"] else [])
+
+    # Only a log written for this output is reported: the shared cache is
+    # evicted on its own and must not be deleted along with one result
+    saved_path = None
+    if save_detections:
+        name = os.path.splitext(os.path.basename(final_path or input_path))[0]
+        # Segments of one video each write a part, joined by `merge_detections`
+        suffix = f"_{start_frame}-{frame_idx}" if segment is not None else ""
+        saved_path = os.path.join(output_dir, f"{name}_detections{suffix}")
+    if detection_log:
+        detection_log.meta["total_frames"] = frame_idx
+        if cache_dir:
+            detection_log.save(cache_dir)
+            evict_detection_cache(keep=cache_dir)
+        if saved_path:
+            stats["detections_path"] = detection_log.save(saved_path)
+    elif cache is not None and saved_path:
+        stats["detections_path"] = copy_detections(cache.path, saved_path)
 
-    stats["avgSpeed"] = round(20 + (5 if enhanced else 0), 1)
-    update_task_progress(task_id, 100, "completed")
+    # The caller stores the result and then reports the task completed (see
+    # app.jobs.complete_task); until then /status keeps showing progress
+    reporter.close()
 
     print(f"[INFO] Video processing completed for {task_id}")
     return final_path, stats
@@ -1 +1,141 @@
-# Placeholder
+# src/model/registry.py
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+# Defaults can be overridden per deployment (API container, Celery workers)
+DEFAULT_MODEL = os.getenv("YOLO_MODEL", "yolov8x")
+DEFAULT_DEVICE = os.getenv("YOLO_DEVICE") or None  # None lets ultralytics pick
+DEFAULT_PRECISION = os.getenv("YOLO_PRECISION", "fp32")
+DEFAULT_BACKEND = os.getenv("YOLO_BACKEND", "torch")
+# fp16 only applies to the torch backend, int8 only to the onnx backend
+PRECISIONS = {"torch": ("fp32", "fp16"), "onnx": ("fp32", "int8")}
+
+_MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoadedModel:
+    """A loaded detector plus the device/precision it should run with."""
+
+    def __init__(self, model, weights: str, device: Optional[str], precision: str, backend: str = "torch"):
+        self.model = model
+        self.weights = weights
+        self.device = device
+        self.precision = precision
+        self.backend = backend
+
+    @property
+    def names(self) -> Dict[int, str]:
+        return self.model.names
+
+    def __call__(self, source, **kwargs):
+        kwargs.setdefault("verbose", False)
+        if self.device:
+            kwargs.setdefault("device", self.device)
+        if self.precision == "fp16":
+            kwargs.setdefault("half", True)
+        return self.model(source, **kwargs)
+
+
+_models: Dict[Tuple[str, Optional[str], str, str], LoadedModel] = {}
+_lock = threading.Lock()
+
+
+def resolve_weights(model_type: Optional[str] = None) -> str:
+    """
+    Map a model name ("yolov8s", "yolov8x.pt", or a path) to a weights file.
+    Weights shipped next to this module are preferred over a download.
+    """
+    name = model_type or DEFAULT_MODEL
+    if not name.endswith((".pt", ".onnx", ".engine")):
+        name = f"{name}.pt"
+    local = os.path.join(_MODEL_DIR, name)
+    return local if os.path.exists(local) else name
+
+
+def model_signature(
+    model_type: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> str:
+    """
+    Identify the model `get_model` would use, without loading it, for keying
+    cached results. Local weights include their size and mtime, so replacing
+    the file invalidates the results produced with the old one.
+    """
+    weights = resolve_weights(model_type)
+    signature = f"{os.path.basename(weights)}:{backend or DEFAULT_BACKEND}:{precision or DEFAULT_PRECISION}"
+    if os.path.exists(weights):
+        stat = os.stat(weights)
+        signature += f":{stat.st_size}:{int(stat.st_mtime)}"
+    return signature
+
+
+def _load(weights: str, device: Optional[str], precision: str, backend: str) -> LoadedModel:
+    if backend == "onnx":
+        from src.model.backends import OnnxModel, onnx_path_for
+        from src.model.export import export_onnx
+
+        path = weights if weights.endswith(".onnx") else onnx_path_for(weights, precision)
+        if not os.path.exists(path):
+            if precision == "int8":
+                raise RuntimeError(
+                    f"INT8 model '{path}' not found; create it with "
+                    f"`python -m src.model.export {weights} --int8 --calibration <videos>`"
+                )
+            path = export_onnx(weights)
+        return LoadedModel(OnnxModel(path, device=device), path, device, precision, backend)
+
+    from ultralytics import YOLO  # heavy import, only paid when a model is needed
+
+    return LoadedModel(YOLO(weights), weights, device, precision, backend)
+
+
+def get_model(
+    model_type: Optional[str] = None,
+    device: Optional[str] = None,
+    precision: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> LoadedModel:
+    """
+    Return the shared model for (weights, device, precision, backend),
+    loading it on first use. Every process (API, Celery worker, CLI) keeps
+    one cache.
+    """
+    weights = resolve_weights(model_type)
+    device = device or DEFAULT_DEVICE
+    precision = precision or DEFAULT_PRECISION
+    backend = backend or DEFAULT_BACKEND
+    if backend not in PRECISIONS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {tuple(PRECISIONS)}")
+    if precision not in PRECISIONS[backend]:
+        raise ValueError(f"Precision '{precision}' is not supported by the {backend} backend")
+
+    key = (weights, device, precision, backend)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            try:
+                model = _load(weights, device, precision, backend)
+            except Exception as e:
+                raise RuntimeError(f"Failed to load YOLO model '{weights}' ({backend}): {e}")
+            print(f"[INFO] Loaded YOLO model {model.weights} "
+                  f"(backend={backend}, device={device or 'auto'}, precision={precision})")
+            _models[key] = model
+    return model
+
+
+def loaded_models() -> Dict[Tuple[str, Optional[str], str, str], LoadedModel]:
+    """Snapshot of the models loaded in this process."""
+    with _lock:
+        return dict(_models)
+
+
+def clear_models():
+    """Drop every cached model (mainly for tests and reloads)."""
+    with _lock:
+        _models.clear()
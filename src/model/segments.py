@@ -0,0 +1,156 @@
+# src/model/segments.py
+"""
+Splitting one long video into segments that are processed in parallel,
+and merging the segment results back into one set of stats.
+
+Segment boundaries are snapped to keyframes (from ffprobe when available)
+so every worker can seek straight to its start. Each segment tracks
+vehicles on its own; at every boundary the tracks that end just before it
+are stitched to the tracks that start just after it by class and predicted
+position, so a vehicle crossing the boundary is counted once and its speed
+covers both sides.
+"""
+import math
+import shutil
+import subprocess
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.analysis.traffic_insights import TrafficInsights
+from src.model.predict import summarize_insights
+from src.model.yolo_utils import TRACKED_CLASSES
+
+
+def keyframe_indices(path: str, fps: float) -> Optional[np.ndarray]:
+    """Frame indices of the video's keyframes, read from packet flags (no decoding)."""
+    if not shutil.which("ffprobe"):
+        return None
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", path]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True, timeout=600).stdout
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"[WARNING] ffprobe could not list keyframes of {path}: {e}")
+        return None
+    frames = []
+    for line in out.splitlines():
+        pts, _, flags = line.partition(",")
+        if "K" in flags and pts not in ("", "N/A"):
+            frames.append(int(round(float(pts) * fps)))
+    return np.unique(frames) if frames else None
+
+
+def segment_count(total_frames: int, fps: float, segment_seconds: float, max_segments: int) -> int:
+    """How many segments of about `segment_seconds` a video splits into."""
+    if segment_seconds <= 0 or total_frames <= 0:
+        return 1
+    return max(1, min(max_segments, math.ceil(total_frames / (segment_seconds * fps))))
+
+
+def plan_segments(total_frames: int, num_segments: int,
+                  keyframes: Optional[Sequence[int]] = None) -> List[Tuple[int, int]]:
+    """Split [0, total_frames) into about equal (start, end) ranges, cut at the nearest keyframes."""
+    cuts = np.linspace(0, total_frames, num_segments + 1)[1:-1]
+    if keyframes is not None and len(keyframes):
+        keyframes = np.asarray(keyframes)
+        cuts = keyframes[np.abs(keyframes[None, :] - cuts[:, None]).argmin(axis=1)]
+    cuts = sorted({int(c) for c in cuts if 0 < c < total_frames})
+    bounds = [0] + cuts + [total_frames]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _predicted_end(table: Dict[str, list], i: int, frame: int) -> np.ndarray:
+    """Where track `i` would be at `frame`, moving at its average pixel velocity."""
+    first, last = np.asarray(table["first_center"][i]), np.asarray(table["last_center"][i])
+    span = table["last_frame"][i] - table["first_frame"][i]
+    velocity = (last - first) / span if span > 0 else np.zeros(2)
+    return last + velocity * (frame - table["last_frame"][i])
+
+
+def stitch_tracks(
+    tables: List[Dict[str, list]],
+    boundaries: List[int],
+    meter_per_pixel: float = 0.05,
+    max_gap_frames: int = 30,
+    max_distance_px: float = 50.0,
+) -> Tuple[Dict[str, list], int]:
+    """
+    Merge per-segment track tables (see `TrafficInsights.track_table`) into
+    one, joining tracks across each boundary in `boundaries`. Returns the
+    merged table and how many joins were made.
+    """
+    fields = ("id", "class", "distance", "first_frame", "last_frame", "first_center", "last_center")
+    merged = {key: [] for key in fields}
+    scale = np.broadcast_to(np.asarray(meter_per_pixel, dtype=np.float64), (2,))
+    stitched = 0
+
+    for seg, table in enumerate(tables):
+        boundary = boundaries[seg - 1] if seg else None
+        ending = [i for i, last in enumerate(merged["last_frame"])
+                  if boundary is not None and boundary - max_gap_frames <= last < boundary]
+        starting = [j for j, first in enumerate(table["first_frame"])
+                    if boundary is not None and boundary <= first < boundary + max_gap_frames]
+
+        # Greedy one-to-one matching on the distance to the predicted position
+        pairs = []
+        for i in ending:
+            for j in starting:
+                if merged["class"][i] != table["class"][j]:
+                    continue
+                start = np.asarray(table["first_center"][j])
+                dist = float(np.hypot(*(_predicted_end(merged, i, table["first_frame"][j]) - start)))
+                if dist <= max_distance_px:
+                    pairs.append((dist, i, j))
+        joined = {}
+        used = set()
+        for _, i, j in sorted(pairs):
+            if i not in used and j not in joined:
+                used.add(i)
+                joined[j] = i
+
+        for j in range(len(table["id"])):
+            i = joined.get(j)
+            if i is None:
+                merged["id"].append(len(merged["id"]) + 1)
+                for key in fields[1:]:
+                    merged[key].append(table[key][j])
+                continue
+            step = (np.asarray(table["first_center"][j]) - np.asarray(merged["last_center"][i])) * scale
+            merged["distance"][i] += float(np.hypot(*step)) + table["distance"][j]
+            merged["last_frame"][i] = table["last_frame"][j]
+            merged["last_center"][i] = table["last_center"][j]
+            stitched += 1
+    return merged, stitched
+
+
+def merge_segment_stats(segment_stats: List[dict], meter_per_pixel: float = 0.05, **stitch_args) -> dict:
+    """
+    Reduce the stats of consecutive segments (each with the `segment` entry
+    `process_video_with_model(segment=...)` adds) to the stats of the whole video.
+    """
+    segment_stats = sorted(segment_stats, key=lambda s: s["segment"]["start_frame"])
+    info = [s["segment"] for s in segment_stats]
+    fps = info[0]["fps"]
+    stitch_args.setdefault("max_gap_frames", max(int(fps), 1))
+
+    table, stitched = stitch_tracks([i["tracks"] for i in info], [i["start_frame"] for i in info[1:]],
+                                    meter_per_pixel=meter_per_pixel, **stitch_args)
+    insights = TrafficInsights.from_tracks(table, frame_rate=fps, meter_per_pixel=meter_per_pixel)
+
+    counts = {label: sum(s.get(label, 0) for s in segment_stats) for label in TRACKED_CLASSES}
+    # A stitched pair was counted once in each segment
+    for label in TRACKED_CLASSES:
+        joined = sum(1 for i in info for c in i["tracks"]["class"] if c == label) - table["class"].count(label)
+        counts[label] = max(counts[label] - joined, 0)
+    unique_vehicles = max(sum(s.get("unique_vehicles", 0) for s in segment_stats) - stitched, 0)
+
+    stats = summarize_insights(
+        insights, counts, unique_vehicles,
+        total_frames=sum(s["total_frames"] for s in segment_stats),
+        inferred_frames=sum(s["inferred_frames"] for s in segment_stats),
+        vehicle_frames=sum(i["vehicle_frames"] for i in info),
+    )
+    stats["segments"] = len(segment_stats)
+    stats["stitched_tracks"] = stitched
+    return stats
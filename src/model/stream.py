@@ -0,0 +1,137 @@
+# src/model/stream.py
+import time
+from collections import deque
+from typing import Callable, Deque, Optional
+
+import numpy as np
+
+from src.data_loader import StreamSource
+from src.model.yolo_utils import DEFAULT_CONFIDENCE
+from src.model.registry import LoadedModel, get_model
+from src.model.predict import detect_batch, feed_insights
+from src.tracking.tracker import IoUTracker
+from src.analysis.traffic_insights import TrafficInsights
+from app.progress import ProgressChannel, progress_channel
+
+STREAM_STATUS = "streaming"
+
+
+class StreamWorker:
+    """
+    Runs detection, tracking and windowed insights on a live `StreamSource`
+    until stopped, publishing rolling stats under `stream_id` on the
+    progress channel. Run as its own process (`src.run_stream`), the stats
+    reach `/api/video/status/{stream_id}` only when both processes share
+    Redis through PROGRESS_REDIS_URL; the in-memory channel is per process.
+
+    Frames are taken newest-first from the source, so when inference is
+    slower than the feed the skipped frames simply show up as gaps in the
+    frame index; the tracker and speed estimates already account for them.
+    """
+
+    def __init__(
+        self,
+        source: StreamSource,
+        stream_id: str,
+        model: Optional[LoadedModel] = None,
+        confidence: float = DEFAULT_CONFIDENCE,
+        meter_per_pixel: float = 0.05,
+        window_seconds: float = 60.0,
+        slide_seconds: Optional[float] = None,
+        publish_interval: float = 1.0,
+        max_windows: int = 60,
+        channel: ProgressChannel = progress_channel,
+        on_window: Optional[Callable[[dict], None]] = None,
+    ):
+        self.source = source
+        self.stream_id = stream_id
+        self.model = model or get_model()
+        self.confidence = confidence
+        self.meter_per_pixel = meter_per_pixel
+        self.window_seconds = window_seconds
+        self.slide_seconds = slide_seconds
+        self.publish_interval = publish_interval
+        self.channel = channel
+        self.on_window = on_window
+
+        self.windows: Deque[dict] = deque(maxlen=max_windows)  # most recent window aggregates
+        self.processed = 0
+        self.tracker: Optional[IoUTracker] = None
+        self.insights: Optional[TrafficInsights] = None
+        names = self.model.names
+        self._labels = np.array([names.get(i, "").lower() for i in range(max(names, default=-1) + 1)])
+        self._latency = 0.0
+        self._last_publish = 0.0
+        self._stopped = False
+
+    def _reset(self, fps: float):
+        self.tracker = IoUTracker(max_age=max(int(fps), 1))
+        self.insights = TrafficInsights(frame_rate=fps, meter_per_pixel=self.meter_per_pixel,
+                                        window_seconds=self.window_seconds, slide_seconds=self.slide_seconds)
+
+    def step(self, frame_idx: int, frame: np.ndarray):
+        """Detect, track and aggregate one frame."""
+        if self.insights is None:
+            self._reset(self.source.fps)
+
+        start = time.monotonic()
+        _, _, records = detect_batch([frame], frame_idx, False, self.model, self.confidence)[0]
+        track_ids, confirmed = self.tracker.update(records, frame_idx)
+        closed = feed_insights(self.insights, records, track_ids, confirmed, self._labels, frame_idx)
+        self._latency = time.monotonic() - start
+        self.processed += 1
+
+        for window in closed:
+            self.windows.append(window)
+            if self.on_window:
+                self.on_window(window)
+
+    def stats(self) -> dict:
+        """Rolling stats: live insights plus source health."""
+        stats = self.insights.summary() if self.insights is not None else {}
+        stats.update({
+            "frames_read": self.source.frames_read,
+            "frames_processed": self.processed,
+            "frames_dropped": self.source.dropped,
+            "reconnects": self.source.reconnects,
+            "latency_ms": round(self._latency * 1000, 1),
+            "unique_vehicles": self.tracker.unique_count if self.tracker is not None else 0,
+        })
+        return stats
+
+    def publish(self, status: str = STREAM_STATUS, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.publish_interval:
+            return
+        self._last_publish = now
+        self.channel.publish(self.stream_id, 0, status, insights=self.stats())
+
+    def run(self, max_frames: Optional[int] = None):
+        """Process frames until stopped, the source closes or `max_frames` frames are done."""
+        if not self.source.is_alive() and not self.source.closed:
+            self.source.start()
+        print(f"[INFO] Streaming analysis started for {self.stream_id} ({self.source.source})")
+        self.publish(force=True)
+        try:
+            while not self._stopped and (max_frames is None or self.processed < max_frames):
+                item = self.source.read(timeout=self.publish_interval)
+                if item is None:
+                    if self.source.closed:
+                        break
+                    self.publish()  # keep the stats fresh while waiting for a reconnect
+                    continue
+                self.step(*item)
+                self.publish()
+        finally:
+            self.source.stop()
+            if self.insights is not None:
+                last = self.insights.flush()
+                if last:
+                    self.windows.append(last)
+            self.publish(status="stopped", force=True)
+            print(f"[INFO] Streaming analysis stopped for {self.stream_id}: "
+                  f"{self.processed} frames processed, {self.source.dropped} dropped")
+
+    def stop(self):
+        """Ask `run` to return after the current frame."""
+        self._stopped = True
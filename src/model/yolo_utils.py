@@ -1,14 +1,17 @@
 # src/model/yolo_utils.py
 
-from ultralytics import YOLO
+import time
 import cv2
-from typing import Tuple, List, Dict, Optional
+import numpy as np
+from typing import Tuple, List, Dict, Optional, Sequence
+from src.model.registry import LoadedModel, get_model
+from src.model.metrics import metrics
+from src.model.backends import to_numpy
+from src.model.detections import BOX_DTYPE
 
-# Load YOLOv8 model
-try:
-    model = YOLO("yolov8x.pt")  # Swap to yolov8n.pt or yolov8s.pt for speed on CPU
-except Exception as e:
-    raise RuntimeError(f"Failed to load YOLO model: {e}")
+# The model is loaded lazily through the registry on first detection,
+# so importing this module (e.g. from the API) stays cheap.
+DEFAULT_CONFIDENCE = 0.25
 
 # Define target vehicle classes
 TRACKED_CLASSES = {"car", "bus", "truck", "motorbike", "bicycle"}
@@ -23,29 +26,113 @@ def get_color_by_class(label: str) -> Tuple[int, int, int]:
     }
     return color_map.get(label, (255, 255, 255))
 
+def draw_detections(frame: cv2.Mat, records: np.ndarray, names: Dict[int, str]) -> cv2.Mat:
+    """Draw BOX_DTYPE (or DETECTION_DTYPE) detection records onto a frame in place."""
+    for cls_id, conf, x1, y1, x2, y2 in zip(*(records[field].tolist() for field in BOX_DTYPE.names)):
+        label = names[cls_id].lower()
+        cv2.rectangle(frame, (x1, y1), (x2, y2), get_color_by_class(label), 2)
+        cv2.putText(frame, f"{label} {conf:.2f}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, get_color_by_class(label), 1)
+    return frame
+
+_class_index_cache: Dict[tuple, Tuple[np.ndarray, Dict[str, np.ndarray]]] = {}
+
+def _class_index(names: Dict[int, str], allowed_classes: set) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    For a model's class names, return a boolean lookup of allowed class ids
+    and the ids behind each allowed label (cached per class names / class set).
+    Keyed on the names' content: models may build a new dict on every access.
+    """
+    key = (tuple(sorted(names.items())), frozenset(allowed_classes))
+    cached = _class_index_cache.get(key)
+    if cached is None:
+        size = max(names, default=-1) + 1
+        allowed = np.zeros(size, dtype=bool)
+        label_ids = {label: [] for label in allowed_classes}
+        for cls_id, name in names.items():
+            if name.lower() in allowed_classes:
+                allowed[cls_id] = True
+                label_ids[name.lower()].append(cls_id)
+        cached = (allowed, {label: np.array(ids, dtype=np.intp) for label, ids in label_ids.items()})
+        _class_index_cache[key] = cached
+    return cached
+
+def _postprocess_result(
+    result,
+    frame: cv2.Mat,
+    names: Dict[int, str],
+    enhanced: bool,
+    allowed_classes: set,
+) -> Tuple[cv2.Mat, np.ndarray, Dict[str, int]]:
+    """
+    Turn one YOLO result into (annotated frame, BOX_DTYPE records, per-class counts).
+    Box data is pulled off the device once and filtered / counted with array ops.
+    """
+    data = to_numpy(result.boxes.data).reshape(-1, 6)  # x1, y1, x2, y2, conf, cls
+    cls = data[:, 5].astype(np.intp)
+
+    allowed, label_ids = _class_index(names, allowed_classes)
+    keep = allowed[cls] if len(allowed) else np.zeros(len(cls), dtype=bool)
+    data, cls = data[keep], cls[keep]
+
+    records = np.empty(len(data), dtype=BOX_DTYPE)
+    records["cls"] = cls
+    records["conf"] = data[:, 4]
+    for i, field in enumerate(("x1", "y1", "x2", "y2")):
+        records[field] = data[:, i]
+
+    counts = np.bincount(cls, minlength=len(allowed))
+    stats = {label: int(counts[ids].sum()) for label, ids in label_ids.items()}
+
+    if enhanced:
+        draw_detections(frame, records, names)
+
+    return frame, records, stats
+
 def detect_objects_yolo(
     frame: cv2.Mat,
     enhanced: bool = False,
-    allowed_classes: Optional[set] = TRACKED_CLASSES
+    allowed_classes: set = TRACKED_CLASSES,
+    model: Optional[LoadedModel] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
 ) -> Tuple[cv2.Mat, List[str], Dict[str, int]]:
-    results = model(frame, verbose=False)
-    detections = []
-    stats = {cls: 0 for cls in allowed_classes}
-
-    for result in results:
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            label = model.names[cls_id].lower()
-
-            detections.append(label)
-            if label in allowed_classes:
-                stats[label] += 1
-
-            if enhanced:
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                conf = float(box.conf[0])
-                cv2.rectangle(frame, (x1, y1), (x2, y2), get_color_by_class(label), 2)
-                cv2.putText(frame, f"{label} {conf:.2f}", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, get_color_by_class(label), 1)
-
-    return frame, detections, stats
+    """
+    Detect objects in one frame. Returns (frame, labels, per-class counts):
+    the labels are those of the detections in `allowed_classes` only (other
+    classes are dropped), and the frame is annotated in place if `enhanced`.
+    Video processing uses `detect_objects_yolo_batch`, which returns
+    detection records instead of labels.
+    """
+    model = model or get_model()
+    start = time.perf_counter()
+    results = model(frame, conf=confidence)
+    called = time.perf_counter()
+    frame, records, stats = _postprocess_result(results[0], frame, model.names, enhanced, allowed_classes)
+    metrics.observe_model_call(results, called - start, 1, time.perf_counter() - called)
+    return frame, [model.names[c].lower() for c in records["cls"].tolist()], stats
+
+def detect_objects_yolo_batch(
+    frames: Sequence[cv2.Mat],
+    enhanced: bool = False,
+    allowed_classes: set = TRACKED_CLASSES,
+    model: Optional[LoadedModel] = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> List[Tuple[cv2.Mat, np.ndarray, Dict[str, int]]]:
+    """
+    Run a single forward pass over several frames.
+    Results are returned in the same order as `frames` as
+    (frame, BOX_DTYPE detection records, per-class counts); the records let
+    callers redraw or track boxes without per-box Python objects.
+    """
+    if not frames:
+        return []
+    model = model or get_model()
+    start = time.perf_counter()
+    results = model(list(frames), conf=confidence)
+    called = time.perf_counter()
+    detections = [
+        _postprocess_result(result, frame, model.names, enhanced, allowed_classes)
+        for result, frame in zip(results, frames)
+    ]
+    metrics.observe_model_call(results, called - start, len(frames), time.perf_counter() - called)
+    return detections
@@ -1 +1,74 @@
-# Placeholder
+# src/preprocessing.py
+
+import cv2
+import numpy as np
+from typing import Optional
+
+SAMPLE_MODES = ("all", "stride", "motion")
+
+
+def motion_energy(prev: np.ndarray, curr: np.ndarray) -> float:
+    """Mean absolute grey-level difference between two downscaled frames."""
+    return float(cv2.absdiff(prev, curr).mean())
+
+
+class FrameSampler:
+    """
+    Decides which frames go through the detector.
+
+    - "all": every frame is inferred.
+    - "stride": every `stride`-th frame is inferred.
+    - "motion": a frame is inferred when its motion energy against the last
+      inferred frame exceeds `motion_threshold`, or after `max_skip` skipped
+      frames so detections never go stale for too long.
+
+    `first_frame` is the video index of the first frame passed in, so a
+    segment starting mid-video infers the same frames as a whole run.
+    """
+
+    def __init__(
+        self,
+        mode: str = "all",
+        stride: int = 1,
+        motion_threshold: float = 2.0,
+        max_skip: int = 30,
+        thumb_size: tuple = (160, 90),
+        first_frame: int = 0,
+    ):
+        if mode not in SAMPLE_MODES:
+            raise ValueError(f"Unknown sample mode '{mode}', expected one of {SAMPLE_MODES}")
+        self.mode = mode
+        self.stride = max(1, int(stride))
+        self.motion_threshold = motion_threshold
+        self.max_skip = max(1, int(max_skip))
+        self.thumb_size = thumb_size
+        self._frame_idx = int(first_frame)
+        self._since_infer = 0
+        self._reference: Optional[np.ndarray] = None
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_infer(self, frame: np.ndarray) -> bool:
+        idx = self._frame_idx
+        self._frame_idx += 1
+
+        if self.mode == "all":
+            infer = True
+        elif self.mode == "stride":
+            infer = idx % self.stride == 0
+        else:
+            thumb = self._thumbnail(frame)
+            infer = (
+                self._reference is None
+                or self._since_infer >= self.max_skip
+                or motion_energy(self._reference, thumb) > self.motion_threshold
+            )
+            if infer:
+                self._reference = thumb
+
+        self._since_infer = 0 if infer else self._since_infer + 1
+        return infer
@@ -1,19 +1,58 @@
-# app/routes/ml_monitoring.py
+# src/routes/ml_monitoring.py
 
+import asyncio
+from typing import Tuple
 from fastapi import APIRouter
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import psutil
-import time
+
+from src.model.metrics import metrics
+
+try:
+    import pynvml
+except ImportError:  # GPU utilization is reported only when NVML is available
+    pynvml = None
 
 router = APIRouter()
 
+# cpu_percent(interval=None) reports usage since the previous call; prime it
+# so the first request gets a real number without sleeping
+psutil.cpu_percent(interval=None)
+
+
+_gpu_handle = None
+
+
+def _gpu_usage():
+    """Utilization (%) of the first GPU, or None without NVML / a GPU."""
+    global _gpu_handle
+    if pynvml is None:
+        return None
+    try:
+        if _gpu_handle is None:
+            pynvml.nvmlInit()
+            _gpu_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+        return pynvml.nvmlDeviceGetUtilizationRates(_gpu_handle).gpu
+    except pynvml.NVMLError:
+        return None
+
+
+def _system_metrics() -> Tuple[dict, dict]:
+    pipeline = metrics.snapshot()
+    return {
+        "cpu": psutil.cpu_percent(interval=None),
+        "gpu": _gpu_usage(),
+        "memory": psutil.virtual_memory().percent,
+        # ms per inferred frame, as measured in detect_objects_yolo
+        "inference_speed": pipeline["stages"]["infer"]["mean_ms"],
+        "fps": pipeline["fps"],
+    }, pipeline
+
+
 @router.get("/ml/status")
 async def get_ml_status():
-    # ✅ Real-time system metrics
-    cpu_usage = psutil.cpu_percent(interval=0.5)
-    memory = psutil.virtual_memory().percent
-    gpu_usage = 78  # You can mock this or integrate with nvidia-smi later
-    inference_speed = 130  # ms per frame (mocked or pulled from logs)
+    # Nothing here blocks: CPU usage is read since the last call, the rest from in-process counters
+    system, pipeline = await asyncio.to_thread(_system_metrics)
 
     # ✅ Model performance data (mocked for now)
     models = [
@@ -49,10 +88,12 @@ async def get_ml_status():
 
     return JSONResponse({
         "models": models,
-        "system": {
-            "cpu": cpu_usage,
-            "gpu": gpu_usage,
-            "memory": memory,
-            "inference_speed": inference_speed
-        }
+        "system": system,
+        "pipeline": pipeline,
     })
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Pipeline metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,5 @@
 import argparse
 from pathlib import Path
-from src.analysis.traffic_insights import TrafficInsights
 from src.model.predict import process_video_with_model
 
 
@@ -13,8 +12,36 @@ def main() -> None:
                         help="Draw bounding boxes and speeds on output video")
     parser.add_argument("--model_type", type=str, default="yolov8s",
                         help="YOLO model type (yolov8n, yolov8s, etc.)")
+    parser.add_argument("--device", type=str, default=None,
+                        help="Inference device (cpu, cuda:0, ...); auto-selected by default")
+    parser.add_argument("--precision", type=str, default=None, choices=["fp32", "fp16", "int8"],
+                        help="Inference precision (fp16 needs a GPU, int8 needs --backend onnx)")
+    parser.add_argument("--backend", type=str, default=None, choices=["torch", "onnx"],
+                        help="Inference backend; onnx runs an exported graph with ONNX Runtime")
     parser.add_argument("--confidence", type=float, default=0.25,
                         help="Detection confidence threshold")
+    parser.add_argument("--batch_size", type=int, default=8,
+                        help="Number of frames sent to the model per forward pass")
+    parser.add_argument("--sample_mode", type=str, default="all", choices=["all", "stride", "motion"],
+                        help="Which frames to run detection on; skipped frames reuse the last detections")
+    parser.add_argument("--stride", type=int, default=1,
+                        help="Run detection on every k-th frame (with --sample_mode stride)")
+    parser.add_argument("--motion_threshold", type=float, default=2.0,
+                        help="Mean frame-difference energy that triggers detection (with --sample_mode motion)")
+    parser.add_argument("--analytics_only", action="store_true",
+                        help="Only compute stats; skip drawing and encoding the output video")
+    parser.add_argument("--save_detections", action="store_true",
+                        help="Save per-frame detections to a <name>_detections directory next to the output")
+    parser.add_argument("--reuse_detections", action="store_true",
+                        help="Cache raw detections per video and model, and replay them instead of re-running YOLO")
+    parser.add_argument("--detections", type=str, default=None,
+                        help="Replay a saved detections directory (from --save_detections) instead of running YOLO")
+    parser.add_argument("--meter_per_pixel", type=float, default=0.05,
+                        help="Scale used to convert tracked pixel distances to metres")
+    parser.add_argument("--window", type=float, default=None,
+                        help="Aggregate insights over windows of this many seconds")
+    parser.add_argument("--window_slide", type=float, default=None,
+                        help="Seconds between windows (defaults to --window, i.e. tumbling)")
     parser.add_argument("--task_id", type=str, default=None,
                         help="Optional task ID for progress tracking")
     args = parser.parse_args()
@@ -26,54 +53,55 @@ def main() -> None:
 
     print(f"[INFO] Starting analysis for: {video_path}")
 
-    # Process video with YOLO + tracker
+    # Process video with YOLO + tracker (TrafficInsights are fed during processing)
     output_path, stats = process_video_with_model(
         input_path=str(video_path),
         output_dir=args.output_dir,
         enhanced=args.enhanced,
         task_id=args.task_id,
         model_type=args.model_type,
-        confidence=args.confidence
+        confidence=args.confidence,
+        device=args.device,
+        precision=args.precision,
+        backend=args.backend,
+        batch_size=args.batch_size,
+        sample_mode=args.sample_mode,
+        stride=args.stride,
+        motion_threshold=args.motion_threshold,
+        analytics_only=args.analytics_only,
+        save_detections=args.save_detections,
+        meter_per_pixel=args.meter_per_pixel,
+        window_seconds=args.window,
+        window_slide=args.window_slide,
+        use_detection_cache=args.reuse_detections,
+        detections_path=args.detections
     )
-
-    # Initialize TrafficInsights with vehicle history from processed stats
-    traffic_insights = TrafficInsights(frame_rate=30, meter_per_pixel=0.05)
-    if 'track_positions' in stats:
-        for track_id, positions in stats['track_positions'].items():
-            for idx, pos in enumerate(positions):
-                traffic_insights.vehicle_history[track_id].append({
-                    "frame": idx,
-                    "center": pos,
-                    "class": stats['track_labels'].get(track_id, "unknown")
-                })
-
-    # Generate intelligent scene description
-    scene_summary = traffic_insights.generate_scene_description()
-    stats['traffic_insights'] = {
-        "scene_description": scene_summary,
-        "density": traffic_insights.compute_density(),
-        "congestion_level": traffic_insights.compute_congestion_level()
-    }
+    if args.task_id:
+        from app.jobs import complete_task  # stores the result and reports the task completed
+        complete_task(args.task_id, output_path, stats)
 
     # Print full report
     print("\n========== TRAFFIC REPORT ==========")
-    print(f"Processed Video: {output_path}")
+    print(f"Processed Video: {output_path or 'not rendered (analytics only)'}")
+    if stats.get('detections_path'):
+        print(f"Detections File: {stats.get('detections_path')}")
     print(f"Total Frames: {stats.get('total_frames')}")
-    print(f"Vehicle Counts: {stats.get('per_class_counts')}")
-    print(f"Average Speed (km/h): {stats.get('avg_speed_kmph')}")
+    print(f"Vehicle Counts: {({k: stats.get(k) for k in ('car', 'bus', 'truck', 'motorbike', 'bicycle')})}")
+    print(f"Unique Vehicles: {stats.get('unique_vehicles')}")
+    print(f"Average Speed (km/h): {stats.get('avgSpeed')}")
     print(f"Average Density: {stats.get('avg_density')}")
     print(f"Moving Vehicles: {stats.get('moving_vehicles')}")
     print(f"Idle Vehicles: {stats.get('idle_vehicles')}")
     print(f"Congestion Level: {stats.get('congestion_level')}")
-    print(f"Scene Description: {stats.get('scene_description')}")
-    print(f"Accident Risk Level: {stats.get('accident_risk_level')}")
-    if stats.get('alerts'):
-        print(f"Alerts: {stats.get('alerts')}")
     print("\n[TrafficInsights Summary]")
     traffic = stats.get('traffic_insights', {})
-    print(f"Traffic Scene: {traffic.get('scene_description')}")
     print(f"Vehicle Density per Type: {traffic.get('density')}")
     print(f"Congestion Level: {traffic.get('congestion_level')}")
+    if "windows" in stats:
+        print("\n[Windows]")
+        for window in stats["windows"]:
+            print(f"{window['start_s']:>8.1f}s - {window['end_s']:>8.1f}s | vehicles: {window['vehicles']:>3} | "
+                  f"avg speed: {window['avg_speed_kmh']:>6.1f} km/h | {window['congestion_level']}")
     print("===================================")
 
 
@@ -0,0 +1,60 @@
+import argparse
+import signal
+from app.progress import PROGRESS_REDIS_URL
+from src.data_loader import StreamSource
+from src.model.registry import get_model
+from src.model.stream import StreamWorker
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run continuous traffic analysis on a live stream.")
+    parser.add_argument("source", type=str,
+                        help="RTSP/HTTP URL, camera index or video file (use --loop to replay a file as a feed)")
+    parser.add_argument("--stream_id", type=str, default="stream-0",
+                        help="ID the rolling stats are published under (see /api/video/status/{id}, "
+                             "needs PROGRESS_REDIS_URL shared with the API)")
+    parser.add_argument("--loop", action="store_true", help="Restart a file source at EOF")
+    parser.add_argument("--model_type", type=str, default=None,
+                        help="YOLO model variant (defaults to YOLO_MODEL)")
+    parser.add_argument("--device", type=str, default=None, help="Inference device, e.g. cpu or cuda:0")
+    parser.add_argument("--precision", type=str, default=None, choices=["fp32", "fp16", "int8"],
+                        help="Inference precision (int8 needs --backend onnx)")
+    parser.add_argument("--backend", type=str, default=None, choices=["torch", "onnx"],
+                        help="Inference backend (defaults to YOLO_BACKEND)")
+    parser.add_argument("--confidence", type=float, default=0.25, help="Confidence threshold for detections")
+    parser.add_argument("--meter_per_pixel", type=float, default=0.05,
+                        help="Scale used to convert tracked pixel distances to metres")
+    parser.add_argument("--window", type=float, default=60.0, help="Aggregation window in seconds")
+    parser.add_argument("--window_slide", type=float, default=None,
+                        help="Seconds between windows (defaults to --window, i.e. tumbling)")
+    parser.add_argument("--publish_interval", type=float, default=1.0,
+                        help="Seconds between rolling stats updates")
+    parser.add_argument("--max_frames", type=int, default=None, help="Stop after this many processed frames")
+    args = parser.parse_args()
+    if not PROGRESS_REDIS_URL:
+        print("[WARNING] PROGRESS_REDIS_URL is not set: stats stay in this process and "
+              f"/api/video/status/{args.stream_id} will not see them")
+
+    model = get_model(args.model_type, device=args.device, precision=args.precision, backend=args.backend)
+    worker = StreamWorker(
+        StreamSource(args.source, loop=args.loop),
+        stream_id=args.stream_id,
+        model=model,
+        confidence=args.confidence,
+        meter_per_pixel=args.meter_per_pixel,
+        window_seconds=args.window,
+        slide_seconds=args.window_slide,
+        publish_interval=args.publish_interval,
+        on_window=lambda w: print(
+            f"[INFO] {w['start_s']:.0f}-{w['end_s']:.0f}s: {w['vehicles']} vehicles, "
+            f"{w['avg_speed_kmh']:.1f} km/h, {w['congestion_level']}"),
+    )
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    try:
+        worker.run(max_frames=args.max_frames)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
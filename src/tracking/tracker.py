@@ -0,0 +1,150 @@
+# src/tracking/tracker.py
+"""
+Lightweight multi-object tracker for the predict pipeline.
+
+ByteTrack-style association on NumPy arrays: high-confidence detections
+are matched to constant-velocity predictions of the live tracks by IoU,
+leftover tracks then get a second chance against low-confidence
+detections, and unmatched high-confidence detections start new tracks.
+A track only counts as a vehicle once it has been seen `min_hits` times,
+so flickering false positives do not inflate the counts.
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.model.detections import boxes_xyxy
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> np.ndarray:
+    """Greedy one-to-one matching by descending IoU; returns (K, 2) row/col pairs."""
+    rows, cols = np.nonzero(iou >= threshold)
+    if len(rows) == 0:
+        return np.empty((0, 2), dtype=np.intp)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows = np.zeros(iou.shape[0], dtype=bool)
+    used_cols = np.zeros(iou.shape[1], dtype=bool)
+    matches = []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if not used_rows[r] and not used_cols[c]:
+            used_rows[r] = used_cols[c] = True
+            matches.append((r, c))
+    return np.array(matches, dtype=np.intp).reshape(-1, 2)
+
+
+class IoUTracker:
+    """Assigns stable IDs to BOX_DTYPE detection records across frames."""
+
+    def __init__(
+        self,
+        high_thresh: float = 0.5,
+        low_thresh: float = 0.1,
+        match_iou: float = 0.3,
+        low_match_iou: float = 0.5,
+        max_age: int = 30,
+        min_hits: int = 3,
+    ):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_age = max_age
+        self.min_hits = min_hits
+
+        self._boxes = np.empty((0, 4), dtype=np.float32)
+        self._velocity = np.empty((0, 4), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._cls = np.empty(0, dtype=np.int32)
+        self._hits = np.empty(0, dtype=np.int32)
+        self._last_frame = np.empty(0, dtype=np.int64)
+        self._next_id = 1
+
+        self.class_counts: Dict[int, int] = {}  # class id -> confirmed unique tracks
+
+    @property
+    def active_tracks(self) -> int:
+        return len(self._ids)
+
+    @property
+    def unique_count(self) -> int:
+        return sum(self.class_counts.values())
+
+    def update(self, records: np.ndarray, frame_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Associate one frame of detections with the live tracks.
+
+        Returns (track_ids, confirmed) aligned with `records`; untracked
+        (low-confidence, unmatched) detections get id -1.
+        """
+        dets = boxes_xyxy(records).astype(np.float32)
+        conf = records["conf"]
+        track_ids = np.full(len(records), -1, dtype=np.int64)
+        confirmed = np.zeros(len(records), dtype=bool)
+
+        # Constant-velocity prediction, scaled by frames since last seen (handles skipped frames)
+        gap = np.maximum(frame_idx - self._last_frame, 1).astype(np.float32)
+        predicted = self._boxes + self._velocity * gap[:, None]
+
+        high = np.flatnonzero(conf >= self.high_thresh)
+        low = np.flatnonzero((conf < self.high_thresh) & (conf >= self.low_thresh))
+
+        # First pass: high-confidence detections against every track
+        m1 = greedy_match(iou_matrix(predicted, dets[high]), self.match_iou)
+        t_idx, d_idx = m1[:, 0], high[m1[:, 1]]
+
+        # Second pass: remaining tracks against low-confidence detections
+        free_tracks = np.setdiff1d(np.arange(len(self._ids)), t_idx)
+        m2 = greedy_match(iou_matrix(predicted[free_tracks], dets[low]), self.low_match_iou)
+        t_idx = np.concatenate([t_idx, free_tracks[m2[:, 0]]])
+        d_idx = np.concatenate([d_idx, low[m2[:, 1]]])
+
+        if len(t_idx):
+            step = (dets[d_idx] - self._boxes[t_idx]) / gap[t_idx, None]
+            self._velocity[t_idx] = 0.5 * self._velocity[t_idx] + 0.5 * step
+            self._boxes[t_idx] = dets[d_idx]
+            self._last_frame[t_idx] = frame_idx
+            self._hits[t_idx] += 1
+            track_ids[d_idx] = self._ids[t_idx]
+            confirmed[d_idx] = self._hits[t_idx] >= self.min_hits
+
+            newly_confirmed = t_idx[self._hits[t_idx] == self.min_hits]
+            for cls_id in self._cls[newly_confirmed].tolist():
+                self.class_counts[cls_id] = self.class_counts.get(cls_id, 0) + 1
+
+        # Unmatched high-confidence detections start new tentative tracks
+        new = np.setdiff1d(high, d_idx)
+        if len(new):
+            new_ids = np.arange(self._next_id, self._next_id + len(new), dtype=np.int64)
+            self._next_id += len(new)
+            self._boxes = np.concatenate([self._boxes, dets[new]])
+            self._velocity = np.concatenate([self._velocity, np.zeros((len(new), 4), np.float32)])
+            self._ids = np.concatenate([self._ids, new_ids])
+            self._cls = np.concatenate([self._cls, records["cls"][new].astype(np.int32)])
+            self._hits = np.concatenate([self._hits, np.ones(len(new), np.int32)])
+            self._last_frame = np.concatenate([self._last_frame, np.full(len(new), frame_idx, np.int64)])
+            track_ids[new] = new_ids
+            if self.min_hits <= 1:
+                confirmed[new] = True
+                for cls_id in records["cls"][new].tolist():
+                    self.class_counts[cls_id] = self.class_counts.get(cls_id, 0) + 1
+
+        # Drop tracks that have not been seen for too long
+        alive = frame_idx - self._last_frame <= self.max_age
+        if not alive.all():
+            self._boxes, self._velocity = self._boxes[alive], self._velocity[alive]
+            self._ids, self._cls = self._ids[alive], self._cls[alive]
+            self._hits, self._last_frame = self._hits[alive], self._last_frame[alive]
+
+        return track_ids, confirmed
@@ -0,0 +1,46 @@
+# tests/unit/conftest.py
+"""Fixtures shared by the pipeline tests (predict, encoder)."""
+
+import cv2
+import numpy as np
+import pytest
+
+from src.model.backends import Boxes, Result
+
+
+class BlobModel:
+    """A car on the bright blob (0.9) and a low-confidence truck in the corner (0.15)."""
+    names = {2: "car", 7: "truck"}
+
+    def __init__(self):
+        self.frames_seen = 0
+
+    def __call__(self, frames, conf=0.25, **kwargs):
+        self.frames_seen += len(frames)
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame[:, :, 0] > 128)
+            xyxy = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1], [0, 0, 10, 10]], np.float32)
+            scores = np.array([0.9, 0.15], np.float32)
+            keep = scores >= conf
+            results.append(Result(Boxes(xyxy[keep], scores[keep], np.array([2, 7], np.float32)[keep])))
+        return results
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (160, 96))
+    if not out.isOpened():
+        pytest.skip("no MJPG encoder available")
+    for i in range(30):
+        frame = np.zeros((96, 160, 3), dtype=np.uint8)
+        frame[40:60, 10 + 3 * i:30 + 3 * i] = 255
+        out.write(frame)
+    out.release()
+    return path
+
+
+@pytest.fixture
+def blob_model():
+    return BlobModel()
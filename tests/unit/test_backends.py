@@ -0,0 +1,56 @@
+# tests/unit/test_backends.py
+
+import numpy as np
+from src.model.backends import letterbox, onnx_providers, postprocess
+from src.model.evaluate import match_boxes
+
+
+def test_letterbox_pads_to_square():
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    boxed, gain, (pad_x, pad_y) = letterbox(frame, 64)
+    assert boxed.shape == (64, 64, 3)
+    assert gain == 0.32
+    assert pad_x == 0 and pad_y == 16
+
+
+def test_postprocess_rescales_and_suppresses():
+    # two overlapping car boxes and one low-confidence truck, in 64x64 letterbox space
+    output = np.zeros((4 + 3, 3), dtype=np.float32)
+    output[:4, 0] = [32, 32, 16, 16]
+    output[:4, 1] = [33, 32, 16, 16]
+    output[:4, 2] = [10, 40, 8, 8]
+    output[4 + 1, :2] = [0.9, 0.8]
+    output[4 + 2, 2] = 0.1
+    meta = (0.32, (0, 16), (100, 200))
+
+    boxes = postprocess(output, meta, conf_threshold=0.25)
+
+    assert len(boxes) == 1
+    assert boxes.cls.tolist() == [1.0]
+    np.testing.assert_allclose(boxes.xyxy[0], [75, 25, 125, 75], atol=1e-4)
+
+
+def test_match_boxes_requires_same_class():
+    ref = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    cand = np.array([[0, 0, 10, 11], [20, 20, 30, 30]], dtype=np.float32)
+    ious = match_boxes(ref, np.array([0, 1]), cand, np.array([0, 2]))
+    assert len(ious) == 1 and ious[0] > 0.9
+
+
+def test_onnx_providers_follow_the_device(capsys):
+    gpu = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    configured = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    assert onnx_providers(None, gpu, configured) == configured
+    assert onnx_providers("cpu", gpu, configured) == ["CPUExecutionProvider"]
+    assert onnx_providers("cuda:1", gpu, ["CPUExecutionProvider"]) == [
+        ("CUDAExecutionProvider", {"device_id": 1}), "CPUExecutionProvider"]
+    assert onnx_providers("0", gpu) == [("CUDAExecutionProvider", {"device_id": 0}), "CPUExecutionProvider"]
+
+    # OpenVINO is preferred by default, but only when onnxruntime has it
+    openvino = ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+    assert onnx_providers(None, openvino) == openvino
+    assert onnx_providers(None, ["CPUExecutionProvider"]) == ["CPUExecutionProvider"]
+
+    # No CUDA build of onnxruntime: run on the CPU, and say so
+    assert onnx_providers("cuda", ["CPUExecutionProvider"]) == ["CPUExecutionProvider"]
+    assert "[WARNING]" in capsys.readouterr().out
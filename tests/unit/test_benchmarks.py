@@ -0,0 +1,49 @@
+# tests/unit/test_benchmarks.py
+
+import json
+
+import cv2
+import numpy as np
+
+from benchmarks import run
+from benchmarks.synthetic import SyntheticDetector, make_video, render_frames
+
+
+def test_synthetic_detector_finds_rendered_vehicles():
+    frame = next(render_frames(320, 240, frames=1, density=3, seed=1))
+    boxes = SyntheticDetector()(frame)[0].boxes
+    assert 1 <= len(boxes.xyxy) <= 3
+    assert (boxes.cls == 2).all()
+    # Same seed, same scene
+    assert np.array_equal(frame, next(render_frames(320, 240, frames=1, density=3, seed=1)))
+
+
+def test_make_video_is_cached(tmp_path):
+    path = make_video(160, 96, frames=5, density=2, cache_dir=str(tmp_path))
+    cap = cv2.VideoCapture(path)
+    assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 5
+    cap.release()
+    mtime = (tmp_path / path.split("/")[-1]).stat().st_mtime_ns
+    assert make_video(160, 96, frames=5, density=2, cache_dir=str(tmp_path)) == path
+    assert (tmp_path / path.split("/")[-1]).stat().st_mtime_ns == mtime
+
+
+def test_compare_flags_slowdowns_and_memory_growth():
+    baseline = {"pipeline": {"fps": 100.0, "peak_rss_mb": 200.0}, "insights": {"updates_per_s": 1000.0}}
+    assert run.compare({"pipeline": {"fps": 90.0, "peak_rss_mb": 210.0}}, baseline) == []
+    regressions = run.compare({"pipeline": {"fps": 70.0, "peak_rss_mb": 300.0},
+                               "insights": {"updates_per_s": 2000.0}, "detect": {"fps": 1.0}}, baseline)
+    assert regressions == ["pipeline.fps: 100.0 -> 70.0 (-30%)", "pipeline.peak_rss_mb: 200.0 -> 300.0 (+50%)"]
+
+
+def test_main_fails_on_regression(tmp_path):
+    out = tmp_path / "results.json"
+    args = ["--cases", "insights", "--frames", "50", "--density", "5", "--repeat", "1"]
+    assert run.main(args + ["--output", str(out)]) == 0
+    report = json.loads(out.read_text())
+    assert report["results"]["insights"]["updates_per_s"] > 0
+    assert report["results"]["insights"]["peak_rss_mb"] > 0
+
+    report["results"]["insights"]["updates_per_s"] *= 100  # pretend we used to be much faster
+    out.write_text(json.dumps(report))
+    assert run.main(args + ["--baseline", str(out)]) == 1
@@ -0,0 +1,85 @@
+# tests/unit/test_database.py
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import app.database as database
+from app.database import (
+    VideoTask, create_db_and_tables, get_details, get_task_summaries, make_engine, store_details, update_task,
+)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = make_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    create_db_and_tables(engine)
+    with database.get_session() as session:
+        session.add_all([VideoTask(id=f"t{i}", filename=f"{i}.mp4") for i in range(3)])
+        session.commit()
+    return engine
+
+
+def test_sqlite_engine_uses_wal_and_busy_timeout(db):
+    with db.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_PRAGMAS["busy_timeout"]
+        indexes = conn.execute(text("PRAGMA index_list('videotask')")).fetchall()
+    assert any("status" in row[1] for row in indexes)
+
+
+def test_update_task_and_bulk_summaries(db):
+    assert update_task("t1", status="completed", progress=100, stats={"car": 2}, vehicles=2, avg_speed=31.5)
+    assert not update_task("nope", status="failed")
+
+    summaries = get_task_summaries(["t1", "t2", "nope"])
+    assert set(summaries) == {"t1", "t2"}
+    assert summaries["t1"] == {"status": "completed", "progress": 100, "processed_path": None,
+                               "vehicles": 2, "avg_speed": 31.5, "congestion_level": None}
+    assert get_task_summaries([]) == {}
+    with database.get_session() as session:
+        assert session.get(VideoTask, "t1").stats == {"car": 2}
+
+
+def test_details_are_paged(db):
+    store_details("t1", {"windows": [{"start_frame": i} for i in range(250)], "tracks": []})
+    items, total = get_details("t1", "windows", offset=240, limit=100)
+    assert total == 250
+    assert [w["start_frame"] for w in items] == list(range(240, 250))
+    assert get_details("t1", "tracks") == ([], 0)
+
+    store_details("t1", {"windows": [{"start_frame": 0}]})  # a rerun replaces the old rows
+    assert get_details("t1", "windows")[1] == 1
+
+
+def test_startup_adds_missing_columns(tmp_path):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    with create_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE videotask (id VARCHAR PRIMARY KEY, filename VARCHAR, status VARCHAR, "
+                          "progress INTEGER, processed_path VARCHAR, stats_json VARCHAR)"))
+    engine = make_engine(url)
+    create_db_and_tables(engine)
+    with engine.connect() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info('videotask')"))}
+    assert {"vehicles", "avg_speed", "congestion_level"} <= columns
+
+
+def test_concurrent_writers_do_not_lock(db):
+    errors = []
+
+    def write(task_id):
+        try:
+            for progress in range(50):
+                update_task(task_id, progress=progress, status="processing")
+        except Exception as e:  # "database is locked" would surface here
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(f"t{i}",)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert {task["progress"] for task in get_task_summaries(["t0", "t1", "t2"]).values()} == {49}
@@ -0,0 +1,60 @@
+# tests/unit/test_detections.py
+
+import numpy as np
+import pytest
+from src.model.detections import BOX_DTYPE, DetectionCache, DetectionLog, boxes_xyxy, load_detections
+
+
+def _records(rows):
+    return np.array(rows, dtype=BOX_DTYPE)
+
+
+def test_detection_log_roundtrip(tmp_path):
+    log = DetectionLog({0: "person", 2: "car", 7: "truck"})
+    log.add(0, _records([(2, 0.9, 1, 2, 3, 4), (7, 0.5, 5, 6, 7, 8)]))
+    log.add(1, _records([]))
+    log.add(3, _records([(2, 0.8, 2, 3, 4, 5)]))
+
+    path = log.save(str(tmp_path / "dets"))
+    detections, labels = load_detections(path)
+
+    assert detections["frame"].tolist() == [0, 0, 3]
+    assert [labels[c] for c in detections["cls"]] == ["car", "truck", "car"]
+    assert boxes_xyxy(detections)[2].tolist() == [2, 3, 4, 5]
+
+
+def test_detection_cache_is_memory_mapped_per_frame(tmp_path):
+    log = DetectionLog({2: "car"}, fps=25, confidence=0.1)
+    log.add(0, _records([(2, 0.9, 1, 2, 3, 4)]))
+    log.add(2, _records([]))  # inferred, nothing found
+    log.add(4, _records([(2, 0.3, 5, 6, 7, 8), (2, 0.2, 1, 1, 2, 2)]))
+
+    cache = DetectionCache(log.save(str(tmp_path / "video-model")))
+    assert isinstance(cache.detections, np.memmap)
+    assert cache.meta["fps"] == 25 and cache.names == {0: "0", 1: "1", 2: "car"}
+    assert cache.frame(4)["conf"].tolist() == pytest.approx([0.3, 0.2])
+    assert len(cache.frame(2)) == 0
+    assert cache.frame(3) is None  # not inferred
+    assert [frame for frame, _ in cache] == [0, 2, 4]
+
+
+def test_detection_cache_evicts_least_recently_used(tmp_path):
+    import os
+    import time
+    from src.model.detections import directory_size, evict_detection_cache, touch_detection_cache
+
+    paths = {}
+    for i, name in enumerate(("old", "mid", "new")):
+        log = DetectionLog({2: "car"})
+        log.add(0, _records([(2, 0.9, 1, 2, 3, 4)] * 100))
+        paths[name] = log.save(str(tmp_path / name))
+        os.utime(paths[name], (time.time() - 100 + i, time.time() - 100 + i))
+    size = directory_size(paths["new"])
+    touch_detection_cache(paths["old"])  # used again, now the most recent
+
+    assert evict_detection_cache(str(tmp_path), max_bytes=2 * size, keep=paths["new"]) == 1
+    assert sorted(os.listdir(tmp_path)) == ["new", "old"]
+
+    os.utime(paths["old"], (time.time() - 1000, time.time() - 1000))
+    assert evict_detection_cache(str(tmp_path), max_age=10, keep=paths["new"]) == 1
+    assert os.listdir(tmp_path) == ["new"]
@@ -0,0 +1,50 @@
+# tests/unit/test_encoder.py
+
+import os
+import stat
+
+import numpy as np
+import pytest
+
+import src.model.predict as predict
+from src.model.encoder import FFmpegPipeWriter
+from src.model.metrics import metrics
+from src.model.registry import LoadedModel
+
+
+def _fake_ffmpeg(tmp_path, monkeypatch, body):
+    """Put an `ffmpeg` shell script first on PATH; the output path is its last argument."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffmpeg"
+    script.write_text("#!/bin/sh\nfor last in \"$@\"; do :; done\n" + body)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_pipe_writer_streams_raw_frames(tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch, 'cat > "$last"\n')
+    out = tmp_path / "out.mp4"
+    writer = FFmpegPipeWriter(str(out), 10, 4, 2)
+    assert writer.isOpened()
+    writer.write(np.full((2, 4, 3), 7, np.uint8))
+    writer.write(np.zeros((4, 2, 3), np.uint8)[:2, :, :].repeat(2, axis=1))  # non-contiguous is copied
+    with pytest.raises(ValueError):
+        writer.write(np.zeros((3, 4, 3), np.uint8))
+    writer.release()
+    assert out.read_bytes() == bytes([7] * 24) + bytes(24)
+
+
+def test_failing_encoder_fails_the_job_and_removes_partial_output(video, blob_model, tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch, 'cat > "$last"\nexit 1\n')
+    monkeypatch.setattr(predict, "get_model", lambda *a, **k: LoadedModel(blob_model, "blob.pt", None, "fp32"))
+    out_dir = tmp_path / "out"
+    closed = []
+    monkeypatch.setattr(predict.ProgressReporter, "close",
+                        lambda self, progress=None, status=None, result=None: closed.append(status))
+
+    with pytest.raises(IOError, match="exited with code 1"):
+        predict.process_video_with_model(video, output_dir=str(out_dir))
+    assert closed == ["failed"]
+    assert os.listdir(out_dir) == []
+    assert metrics.queue_depths().get("encode", 0) == 0
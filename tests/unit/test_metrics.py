@@ -0,0 +1,94 @@
+# tests/unit/test_metrics.py
+
+import queue
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.routes.ml_monitoring as ml_monitoring
+from src.model.metrics import Histogram, Metrics, RateMeter
+
+
+class FakeResult:
+    def __init__(self, speed):
+        self.speed = speed
+
+
+def test_histogram_quantiles():
+    h = Histogram(buckets=(0.01, 0.1, 1.0))
+    h.observe(0.005, 50)
+    h.observe(0.05, 50)
+    assert h.count == 100
+    assert h.counts == [50, 50, 0, 0]
+    assert h.quantile(0.5) == pytest.approx(0.01)
+    assert 0.01 < h.quantile(0.95) <= 0.1
+
+
+def test_model_call_is_split_into_stages():
+    m = Metrics()
+    # 4 frames in 0.2 s; the backend reports 5 ms preprocess and 10 ms postprocess per image
+    m.observe_model_call([FakeResult({"preprocess": 5.0, "inference": 30.0, "postprocess": 10.0})] * 4,
+                         0.2, 4, postprocess=0.004)
+    stages = m.snapshot()["stages"]
+    assert stages["preprocess"]["mean_ms"] == pytest.approx(5.0)
+    assert stages["infer"]["mean_ms"] == pytest.approx(35.0)
+    assert stages["postprocess"]["mean_ms"] == pytest.approx(11.0)
+    assert stages["infer"]["count"] == 4
+
+    # Without backend timings the whole call is inference
+    m.observe_model_call([object()], 0.05, 1)
+    assert m.snapshot()["stages"]["infer"]["count"] == 5
+
+
+def test_rate_meter_forgets_old_seconds():
+    clock = {"now": 100.0}
+    rate = RateMeter(window=10, clock=lambda: clock["now"])
+    rate.add(100)
+    clock["now"] = 105.0
+    rate.add(50)
+    assert rate.rate() == 15.0
+    clock["now"] = 116.0
+    assert rate.rate() == 0.0
+
+
+def test_prometheus_export_and_queues():
+    m = Metrics()
+    m.observe("decode", 0.002)
+    m.add_frames(3)
+    q = queue.Queue()
+    q.put(1)
+    m.watch_queue("decode", q)
+    m.set_gauge("workers_busy", 1)
+    m.set_gauge("workers_total", 4)
+
+    text = m.prometheus()
+    assert 'smartsignal_stage_latency_seconds_bucket{stage="decode",le="0.0025"} 1' in text
+    assert 'smartsignal_stage_latency_seconds_bucket{stage="decode",le="+Inf"} 1' in text
+    assert 'smartsignal_stage_latency_seconds_count{stage="encode"} 0' in text
+    assert "smartsignal_frames_total 3" in text
+    assert 'smartsignal_queue_depth{queue="decode"} 1' in text
+    assert m.snapshot()["workers"]["utilization"] == 0.25
+
+    m.unwatch_queue("decode", q)
+    assert m.queue_depths() == {"decode": 0}
+
+
+def test_ml_status_is_live_and_non_blocking(monkeypatch):
+    m = Metrics()
+    m.observe_model_call([object()], 0.12, 1)
+    monkeypatch.setattr(ml_monitoring, "metrics", m)
+    app = FastAPI()
+    app.include_router(ml_monitoring.router, prefix="/api")
+    client = TestClient(app)
+
+    start = time.monotonic()
+    body = client.get("/api/ml/status").json()
+    assert time.monotonic() - start < 0.4  # no 500 ms cpu_percent sampling
+    assert body["system"]["inference_speed"] == pytest.approx(120.0)
+    assert body["pipeline"]["stages"]["infer"]["count"] == 1
+
+    res = client.get("/api/metrics")
+    assert res.headers["content-type"].startswith("text/plain")
+    assert "smartsignal_stage_latency_seconds" in res.text
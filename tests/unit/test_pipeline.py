@@ -0,0 +1,37 @@
+# tests/unit/test_pipeline.py
+
+import numpy as np
+from src.model.pipeline import FrameReader, FrameWriter
+
+
+class FakeCapture:
+    def __init__(self, n):
+        self.frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(n)]
+
+    def read(self):
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+
+def test_reader_writer_preserve_order():
+    reader = FrameReader(FakeCapture(25), maxsize=2)
+    written = []
+    writer = FrameWriter(lambda f: written.append(int(f[0, 0, 0])), maxsize=2)
+    reader.start()
+    writer.start()
+
+    for frame in reader:
+        writer.write(frame)
+    writer.close()
+    reader.stop()
+
+    assert written == list(range(25))
+
+
+def test_reader_stop_unblocks_full_queue():
+    reader = FrameReader(FakeCapture(50), maxsize=1)
+    reader.start()
+    next(iter(reader))
+    reader.stop()
+    assert not reader.is_alive()
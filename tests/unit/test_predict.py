@@ -0,0 +1,107 @@
+# tests/unit/test_predict.py
+
+import cv2
+import numpy as np
+import pytest
+
+import src.model.predict as predict
+from src.model.backends import Boxes, Result
+from src.model.registry import LoadedModel
+
+
+def test_detection_cache_replays_without_inference(video, blob_model, tmp_path, monkeypatch):
+    model = blob_model
+    monkeypatch.setattr(predict, "get_model", lambda *a, **k: LoadedModel(model, "blob.pt", None, "fp32"))
+    monkeypatch.setattr(predict, "detection_cache_path", lambda sha, sig: str(tmp_path / f"cache-{sha[:8]}"))
+    run = dict(output_dir=str(tmp_path / "out"), analytics_only=True, use_detection_cache=True)
+
+    _, first = predict.process_video_with_model(video, **run)
+    assert model.frames_seen == 30
+
+    _, replay = predict.process_video_with_model(video, **run)
+    assert model.frames_seen == 30  # served from the cache
+    assert replay == first
+
+    # Other calibration and threshold, still no inference
+    _, recalibrated = predict.process_video_with_model(video, meter_per_pixel=0.1, confidence=0.5, **run)
+    assert model.frames_seen == 30
+    assert recalibrated["avgSpeed"] == pytest.approx(2 * first["avgSpeed"], abs=0.2)
+    assert recalibrated["car"] == first["car"] == 1
+
+    # A lower threshold than the cache was inferred at needs the model again
+    predict.process_video_with_model(video, confidence=0.05, **run)
+    assert model.frames_seen == 60
+
+
+def test_saved_detections_are_owned_by_the_output_not_the_cache(video, blob_model, tmp_path, monkeypatch):
+    model = blob_model
+    cache_dir = tmp_path / "cache-dir"
+    monkeypatch.setattr(predict, "get_model", lambda *a, **k: LoadedModel(model, "blob.pt", None, "fp32"))
+    monkeypatch.setattr(predict, "detection_cache_path", lambda sha, sig: str(cache_dir))
+    out_dir = tmp_path / "out"
+
+    _, stats = predict.process_video_with_model(video, output_dir=str(out_dir), analytics_only=True,
+                                                use_detection_cache=True)
+    assert "detections_path" not in stats  # the shared cache is not this result's file
+    assert cache_dir.is_dir()
+
+    _, replay = predict.process_video_with_model(video, output_dir=str(out_dir), analytics_only=True,
+                                                 use_detection_cache=True, save_detections=True)
+    assert model.frames_seen == 30
+    assert replay["detections_path"] == str(out_dir / "clip_detections")
+    assert len(predict.DetectionCache(replay["detections_path"])) == 30
+
+
+class DotModel:
+    """A car on the bright pixels of a frame, if there are any."""
+    names = {2: "car"}
+
+    def __call__(self, frames, conf=0.25, **kwargs):
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame[:, :, 0] > 128)
+            xyxy = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]] if len(xs) else [], np.float32)
+            results.append(Result(Boxes(xyxy.reshape(-1, 4), np.full(len(xyxy), 0.9, np.float32),
+                                        np.full(len(xyxy), 2, np.float32))))
+        return results
+
+
+def test_windowed_final_stats_cover_the_whole_video(tmp_path, monkeypatch):
+    # 6 s at 10 fps with 1 s windows: one car in the first 1.5 s, another in the last 2.5 s
+    path = str(tmp_path / "two_cars.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (160, 96))
+    if not out.isOpened():
+        pytest.skip("no MJPG encoder available")
+    for i in range(60):
+        frame = np.zeros((96, 160, 3), dtype=np.uint8)
+        if i < 15:
+            frame[10:30, 10 + 4 * i:30 + 4 * i] = 255
+        elif i >= 35:
+            frame[60:80, 130 - 4 * (i - 35):150 - 4 * (i - 35)] = 255
+        out.write(frame)
+    out.release()
+    monkeypatch.setattr(predict, "get_model", lambda *a, **k: LoadedModel(DotModel(), "dot.pt", None, "fp32"))
+
+    _, whole = predict.process_video_with_model(path, output_dir=str(tmp_path / "out"), analytics_only=True)
+    _, windowed = predict.process_video_with_model(path, output_dir=str(tmp_path / "out"), analytics_only=True,
+                                                   window_seconds=1.0)
+    assert len(windowed["windows"]) == 6
+    assert windowed["unique_vehicles"] == windowed["car"] == 2
+    for key in ("avgSpeed", "moving_vehicles", "idle_vehicles", "congestion_level", "traffic_insights", "tracks"):
+        assert windowed[key] == whole[key], key
+    assert len(windowed["tracks"]) == 2
+    # The summary stays bounded: per-vehicle speeds are only in the track rows
+    assert set(whole["traffic_insights"]) == {"density", "congestion_level"}
+
+
+def test_failed_batch_falls_back_to_per_frame_inference(blob_model):
+    frames = [np.zeros((96, 160, 3), dtype=np.uint8) for _ in range(3)]
+    frames[0][40:60, 10:30] = 255
+    frames[2][40:60, 50:70] = 255  # frames[1] is blank: BlobModel raises on it, failing the whole batch
+    model = LoadedModel(blob_model, "blob.pt", None, "fp32")
+
+    results = predict.detect_batch(frames, 100, False, model, confidence=0.5)
+    assert blob_model.frames_seen == 3 + 3  # the batch, then one frame at a time
+    assert [len(records) for _, _, records in results] == [1, 0, 1]
+    assert results[2][2]["x1"].tolist() == [50]
+    assert results[1][1] == {} and results[0][1]["car"] == 1
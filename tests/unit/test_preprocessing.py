@@ -0,0 +1,37 @@
+# tests/unit/test_preprocessing.py
+
+import numpy as np
+import pytest
+from src.preprocessing import FrameSampler
+
+
+def _frame(value):
+    return np.full((90, 160, 3), value, dtype=np.uint8)
+
+
+def test_stride_sampling():
+    sampler = FrameSampler(mode="stride", stride=3)
+    flags = [sampler.should_infer(_frame(0)) for _ in range(7)]
+    assert flags == [True, False, False, True, False, False, True]
+    # A segment starting at frame 5 keeps the whole video's stride
+    sampler = FrameSampler(mode="stride", stride=3, first_frame=5)
+    assert [sampler.should_infer(_frame(0)) for _ in range(4)] == [False, True, False, False]
+
+
+def test_motion_gate_skips_static_frames():
+    sampler = FrameSampler(mode="motion", motion_threshold=5.0, max_skip=100)
+    assert sampler.should_infer(_frame(0))       # first frame always inferred
+    assert not sampler.should_infer(_frame(1))   # below threshold
+    assert not sampler.should_infer(_frame(3))
+    assert sampler.should_infer(_frame(50))      # large change
+
+
+def test_motion_gate_max_skip():
+    sampler = FrameSampler(mode="motion", motion_threshold=5.0, max_skip=2)
+    flags = [sampler.should_infer(_frame(0)) for _ in range(6)]
+    assert flags == [True, False, False, True, False, False]
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        FrameSampler(mode="random")
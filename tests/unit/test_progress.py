@@ -0,0 +1,80 @@
+# tests/unit/test_progress.py
+
+import asyncio
+import threading
+
+import app.progress as progress
+from app.progress import ProgressChannel, ProgressReporter
+
+
+def _reporter(monkeypatch, **kwargs):
+    writes = []
+    clock = {"now": 100.0}
+    monkeypatch.setattr(progress, "write_progress", lambda tid, p, s=None: writes.append((p, s)))
+    monkeypatch.setattr(progress.time, "monotonic", lambda: clock["now"])
+    channel = ProgressChannel()
+    return ProgressReporter("task-1", channel=channel, **kwargs), channel, writes, clock
+
+
+def test_reporter_throttles_and_coalesces(monkeypatch):
+    reporter, channel, writes, clock = _reporter(monkeypatch, min_interval=1.0, min_delta=5)
+
+    reporter.update(0, "processing")
+    for p in range(1, 20):
+        reporter.update(p)
+    # status change is written immediately, everything else is throttled by time
+    assert writes == [(0, "processing")]
+    assert channel.get("task-1")["progress"] == 19
+
+    clock["now"] += 2
+    reporter.update(20)
+    assert writes[-1] == (20, "processing")
+
+    reporter.update(22)  # too soon and too small a change
+    assert len(writes) == 2
+    reporter.close()
+    assert writes[-1] == (22, "processing")
+
+
+def test_reporter_close_drops_live_entry(monkeypatch):
+    reporter, channel, writes, _ = _reporter(monkeypatch)
+    reporter.update(50, "processing")
+    reporter.close(100, "completed")
+    assert writes[-1] == (100, "completed")
+    assert channel.get("task-1") is None
+
+
+def test_reporter_without_task_id_is_noop(monkeypatch):
+    reporter, channel, writes, _ = _reporter(monkeypatch)
+    reporter.task_id = ""
+    reporter.update(10, "processing")
+    reporter.close(100, "completed")
+    assert writes == []
+
+
+def test_reporter_publishes_live_insights(monkeypatch):
+    reporter, channel, writes, _ = _reporter(monkeypatch)
+    reporter.update(10, "processing", insights={"vehicles": 3})
+    reporter.update(11)
+    assert channel.get("task-1")["insights"] == {"vehicles": 3}
+    assert all(len(w) == 2 for w in writes)  # insights are never written to the database
+
+
+def test_subscribers_get_latest_update_from_other_threads():
+    channel = ProgressChannel()
+
+    async def scenario():
+        fast, slow = channel.subscribe("task-1"), channel.subscribe("task-1")
+        worker = threading.Thread(target=lambda: [channel.publish("task-1", p, "processing") for p in range(5)])
+        worker.start()
+        worker.join()
+        assert (await fast.next(timeout=1))["progress"] == 4  # coalesced to the newest
+        channel.publish("task-1", 100, "completed", result={"stats": {"car": 2}})
+        assert (await slow.next(timeout=1))["result"] == {"stats": {"car": 2}}
+        assert await fast.next(timeout=1) is not None
+        assert await fast.next(timeout=0.05) is None
+        fast.close()
+        slow.close()
+
+    asyncio.run(scenario())
+    assert channel._subscribers == {}
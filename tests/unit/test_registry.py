@@ -0,0 +1,39 @@
+# tests/unit/test_registry.py
+
+import sys
+import types
+
+import pytest
+from src.model import registry
+
+
+@pytest.fixture
+def fake_ultralytics(monkeypatch):
+    loads = []
+
+    class YOLO:
+        names = {0: "car"}
+
+        def __init__(self, weights):
+            loads.append(weights)
+
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=YOLO))
+    registry.clear_models()
+    yield loads
+    registry.clear_models()
+
+
+def test_models_are_loaded_once_per_key(fake_ultralytics):
+    a = registry.get_model("yolov8n", device="cpu")
+    b = registry.get_model("yolov8n.pt", device="cpu")
+    c = registry.get_model("yolov8n", device="cpu", precision="fp16")
+
+    assert a is b
+    assert c is not a
+    assert fake_ultralytics == ["yolov8n.pt", "yolov8n.pt"]
+    assert a.names == {0: "car"}
+
+
+def test_unknown_precision(fake_ultralytics):
+    with pytest.raises(ValueError):
+        registry.get_model("yolov8n", precision="int4")
@@ -0,0 +1,84 @@
+# tests/unit/test_result_cache.py
+
+import os
+import time
+
+from app.result_cache import ResultCache, result_key
+
+
+def _output(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_key_depends_on_content_and_options():
+    assert result_key("abc") == result_key("abc")
+    assert result_key("abc") != result_key("abd")
+    assert result_key("abc") != result_key("abc", enhanced=True)
+    assert result_key("abc") != result_key("abc", analytics_only=True)
+    assert result_key("abc") != result_key("abc", save_detections=True)
+
+
+def test_hit_miss_and_missing_output(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    video = _output(tmp_path, "a.mp4", 10)
+    cache.put("k1", video, {"car": 3})
+
+    assert cache.get("k1") == {"processed_path": video, "stats": {"car": 3}}
+    assert cache.get("k2") is None
+
+    os.remove(video)  # output deleted behind the cache's back
+    assert cache.get("k1") is None
+    assert not os.listdir(tmp_path / "cache")
+
+
+def test_evicts_least_recently_used_over_size_limit(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=250)
+    paths = {key: _output(tmp_path, f"{key}.mp4", 100) for key in ("a", "b", "c")}
+    cache.put("a", paths["a"], {})
+    cache.put("b", paths["b"], {})
+    entry_a = tmp_path / "cache" / "a.json"
+    os.utime(entry_a, (time.time() - 60, time.time() - 60))
+    os.utime(tmp_path / "cache" / "b.json", (time.time() - 120, time.time() - 120))
+    cache.get("a")  # touching "a" makes "b" the least recently used
+
+    cache.put("c", paths["c"], {})
+    assert cache.get("b") is None and not os.path.exists(paths["b"])
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_evicts_expired_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_age=0.05)
+    video = _output(tmp_path, "old.mp4", 10)
+    cache.put("old", video, {})
+    time.sleep(0.1)
+    assert cache.evict() == 1
+    assert not os.path.exists(video)
+
+
+def test_detection_directories_are_sized_and_removed(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=150)
+    detections = tmp_path / "a_detections"
+    detections.mkdir()
+    (detections / "detections.npy").write_bytes(b"x" * 100)
+    cache.put("a", None, {"detections_path": str(detections)})
+    assert (tmp_path / "cache" / "a.json").exists()
+
+    cache.put("b", _output(tmp_path, "b.mp4", 100), {})  # 200 bytes in total: "a" goes
+    assert cache.get("a") is None
+    assert not detections.exists()
+
+
+def test_outputs_shared_by_another_entry_are_kept(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=150)
+    shared = tmp_path / "shared_detections"
+    shared.mkdir()
+    (shared / "detections.npy").write_bytes(b"x" * 50)
+    cache.put("old", _output(tmp_path, "old.mp4", 40), {"detections_path": str(shared)})
+    os.utime(tmp_path / "cache" / "old.json", (time.time() - 60, time.time() - 60))
+    cache.put("new", _output(tmp_path, "new.mp4", 40), {"detections_path": str(shared)})
+
+    assert cache.get("old") is None and not os.path.exists(tmp_path / "old.mp4")
+    assert shared.is_dir()  # still owned by "new"
+    assert cache.get("new") is not None
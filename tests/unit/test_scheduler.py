@@ -0,0 +1,132 @@
+# tests/unit/test_scheduler.py
+
+import threading
+
+import pytest
+
+import app.scheduler as scheduler
+from app.scheduler import CeleryScheduler, LocalScheduler, SchedulerFull
+
+
+class BlockingJob:
+    """Records job order; the first job waits until released."""
+
+    def __init__(self):
+        self.order = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, task_id, **kwargs):
+        self.order.append(task_id)
+        self.started.set()
+        self.release.wait(5)
+        return {}
+
+
+def test_local_scheduler_runs_by_priority():
+    job = BlockingJob()
+    local = LocalScheduler(concurrency=1, job=job)
+    local.submit("first", "a.mp4")
+    assert job.started.wait(5)
+    for task_id, priority in (("low", "low"), ("normal", "normal"), ("high", "high"), ("normal-2", "normal")):
+        local.submit(task_id, "a.mp4", priority=priority)
+    assert local.stats()["queued"] == 4
+
+    job.release.set()
+    assert local.join(5)
+    assert job.order == ["first", "high", "normal", "normal-2", "low"]
+    local.shutdown()
+
+
+def test_local_scheduler_rejects_when_queue_is_full():
+    job = BlockingJob()
+    local = LocalScheduler(concurrency=1, max_queued=1, job=job)
+    local.submit("running", "a.mp4")
+    assert job.started.wait(5)
+    local.submit("waiting", "a.mp4")
+    with pytest.raises(SchedulerFull):
+        local.submit("rejected", "a.mp4")
+    with pytest.raises(ValueError):
+        local.submit("bad", "a.mp4", priority="urgent")
+
+    job.release.set()
+    assert local.join(5)
+    assert job.order == ["running", "waiting"]
+    local.shutdown()
+
+
+def test_local_scheduler_marks_failed_jobs(monkeypatch):
+    failed = []
+    monkeypatch.setattr(scheduler, "fail_task", failed.append)
+
+    def broken(task_id, **kwargs):
+        raise RuntimeError("decoder crashed")
+
+    local = LocalScheduler(concurrency=2, job=broken)
+    local.submit("t1", "a.mp4")
+    assert local.join(5)
+    assert failed == ["t1"]
+    assert local.stats()["running"] == 0
+    local.shutdown()
+
+
+def test_node_concurrency_fits_cores_and_memory(monkeypatch):
+    monkeypatch.delenv("WORKER_CONCURRENCY", raising=False)
+    monkeypatch.setattr(scheduler.os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+    monkeypatch.setattr(scheduler, "JOB_CPUS", 2)
+    monkeypatch.setattr(scheduler, "JOB_MEMORY_MB", 1024)
+    monkeypatch.setattr(scheduler, "available_memory", lambda: 64 * 1024 ** 3)
+    assert scheduler.node_concurrency() == 8  # core bound
+    monkeypatch.setattr(scheduler, "available_memory", lambda: 3 * 1024 ** 3)
+    assert scheduler.node_concurrency() == 3  # memory bound
+    monkeypatch.setattr(scheduler, "available_memory", lambda: 0)
+    assert scheduler.node_concurrency() == 1
+    monkeypatch.setenv("WORKER_CONCURRENCY", "5")
+    assert scheduler.node_concurrency() == 5
+
+
+def test_celery_scheduler_with_in_memory_broker(monkeypatch):
+    from celery.contrib.testing.worker import start_worker
+
+    import app.tasks.video_tasks as video_tasks
+    from app.celery_app import celery
+
+    ran = []
+    monkeypatch.setattr(video_tasks, "serve_cached", lambda task_id, key: None)
+    monkeypatch.setattr(video_tasks, "_plan_video_segments", lambda path, analytics_only: [])
+    monkeypatch.setattr(video_tasks, "run_video_job",
+                        lambda task_id, *args: ran.append((task_id, args)) or {"stats": {}})
+    monkeypatch.setattr(celery.conf, "broker_url", "memory://")
+    monkeypatch.setattr(celery.conf, "result_backend", "cache+memory://")
+
+    queued = {"n": 0}
+    celery_scheduler = CeleryScheduler(max_queued=1, queued_count=lambda: queued["n"])
+    with start_worker(celery, pool="solo", perform_ping_check=False, shutdown_timeout=5):
+        celery_scheduler.submit("t1", "a.mp4", True, False, "ab" * 32, priority="high", save_detections=True)
+        result = celery.AsyncResult("t1").get(timeout=10)
+
+        queued["n"] = 1  # one other task still waiting in the broker
+        with pytest.raises(SchedulerFull):
+            celery_scheduler.submit("t2", "b.mp4")
+
+    assert result == {"stats": {}}
+    assert ran == [("t1", ("a.mp4", True, False, "ab" * 32, True))]
+
+
+def test_celery_admission_counts_waiting_broker_messages(monkeypatch):
+    from app.celery_app import celery
+    from app.scheduler import _count_broker_queue
+
+    monkeypatch.setattr(celery.conf, "broker_url", "memory://")
+    monkeypatch.setattr(celery.conf, "result_backend", "cache+memory://")
+    celery_scheduler = CeleryScheduler(max_queued=2)
+    try:
+        celery_scheduler.submit("t1", "a.mp4")
+        celery_scheduler.submit("t2", "b.mp4", priority="low")
+        assert _count_broker_queue() == 2
+        with pytest.raises(SchedulerFull):
+            celery_scheduler.submit("t3", "c.mp4")
+    finally:
+        with celery.connection_for_write() as conn:
+            conn.default_channel.queue_purge(celery.conf.task_default_queue)
+    assert celery_scheduler.stats()["queued"] == 0
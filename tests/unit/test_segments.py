@@ -0,0 +1,91 @@
+# tests/unit/test_segments.py
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import src.model.predict as predict
+from src.model.backends import Boxes, Result
+from src.model.detections import DetectionCache, merge_detections
+from src.model.registry import LoadedModel
+from src.model.segments import merge_segment_stats, plan_segments, stitch_tracks
+
+
+class BlobModel:
+    """Detects the bright blob as a car."""
+    names = {2: "car"}
+
+    def __call__(self, frames, conf=0.25, **kwargs):
+        results = []
+        for frame in frames:
+            ys, xs = np.nonzero(frame[:, :, 0] > 128)
+            xyxy = np.array([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], np.float32)
+            results.append(Result(Boxes(xyxy, np.array([0.9], np.float32), np.array([2], np.float32))))
+        return results
+
+
+def _table(*tracks):
+    keys = ("id", "class", "distance", "first_frame", "last_frame", "first_center", "last_center")
+    return {key: [t[i] for t in tracks] for i, key in enumerate(keys)}
+
+
+def test_plan_segments_snaps_to_keyframes():
+    assert plan_segments(300, 3) == [(0, 100), (100, 200), (200, 300)]
+    assert plan_segments(300, 3, keyframes=[0, 90, 150, 210, 290]) == [(0, 90), (90, 210), (210, 300)]
+    # Cuts collapsing onto the same keyframe give fewer segments
+    assert plan_segments(300, 3, keyframes=[0, 150]) == [(0, 150), (150, 300)]
+
+
+def test_stitch_tracks_joins_across_boundary():
+    before = _table((1, "car", 4.5, 0, 99, [10, 50], [100, 50]),
+                    (2, "bus", 1.0, 10, 60, [0, 0], [5, 0]))
+    after = _table((1, "truck", 1.0, 100, 150, [102, 50], [150, 50]),  # other class
+                   (2, "car", 4.5, 101, 200, [102, 50], [200, 50]))
+    merged, stitched = stitch_tracks([before, after], [100], meter_per_pixel=0.05)
+
+    assert stitched == 1
+    assert merged["id"] == [1, 2, 3]
+    assert merged["class"] == ["car", "bus", "truck"]
+    car = merged["class"].index("car")
+    assert merged["last_frame"][car] == 200
+    assert merged["distance"][car] == pytest.approx(4.5 + 2 * 0.05 + 4.5)
+
+
+def test_segments_merge_like_a_whole_run(tmp_path, monkeypatch):
+    path = str(tmp_path / "clip.avi")
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (200, 96))
+    if not out.isOpened():
+        pytest.skip("no MJPG encoder available")
+    for i in range(60):
+        frame = np.zeros((96, 200, 3), dtype=np.uint8)
+        frame[40:60, 10 + 2 * i:30 + 2 * i] = 255
+        out.write(frame)
+    out.release()
+    monkeypatch.setattr(predict, "get_model", lambda *a, **k: LoadedModel(BlobModel(), "blob.pt", None, "fp32"))
+    run = dict(output_dir=str(tmp_path), analytics_only=True)
+
+    _, whole = predict.process_video_with_model(path, **run)
+    parts = [predict.process_video_with_model(path, segment=s, **run)[1] for s in plan_segments(60, 2)]
+    assert [p["total_frames"] for p in parts] == [30, 30]
+    assert all(p["unique_vehicles"] == 1 for p in parts)
+    # Segment results carry their vehicles once, as the session table
+    assert all("tracks" not in p and len(p["segment"]["tracks"]["id"]) == 1 for p in parts)
+
+    merged = merge_segment_stats(parts)
+    assert merged["segments"] == 2
+    assert merged["stitched_tracks"] == 1
+    assert merged["unique_vehicles"] == merged["car"] == whole["car"] == 1
+    assert merged["total_frames"] == whole["total_frames"] == 60
+    assert merged["avgSpeed"] == pytest.approx(whole["avgSpeed"], abs=0.5)
+    assert len(merged["tracks"]) == len(whole["tracks"]) == 1
+
+    # Strided segments infer the same frames as the whole run, and their logs join into one
+    run.update(save_detections=True, sample_mode="stride", stride=4)
+    _, whole = predict.process_video_with_model(path, **run)
+    whole_frames = DetectionCache(whole["detections_path"]).frames.tolist()
+    parts = [predict.process_video_with_model(path, segment=s, **run)[1] for s in plan_segments(60, 2)]
+    joined = merge_detections([p["detections_path"] for p in parts], str(tmp_path / "joined"))
+    assert DetectionCache(joined).frames.tolist() == whole_frames == list(range(0, 60, 4))
+    assert not any(os.path.exists(p["detections_path"]) for p in parts)
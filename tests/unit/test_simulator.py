@@ -0,0 +1,98 @@
+# tests/unit/test_simulator.py
+
+import numpy as np
+import pytest
+
+from simulator import tune
+from simulator.intersection import IntersectionSimulator, sweep
+from simulator.replay import approach_arrivals, extend
+from simulator.traffic_controller import TrafficController
+from simulator.traffic_light import TrafficLight
+
+
+def make_controller(**kwargs):
+    lights = [TrafficLight(id="n1", orientation="NS"), TrafficLight(id="e1", orientation="EW")]
+    return TrafficController(lights, **kwargs), lights
+
+
+def test_controller_cycles_through_yellow_and_resumes_after_override():
+    ctrl, (ns, ew) = make_controller(min_green=5.0, max_green=30.0, yellow=2.0, ema_alpha=0.5)
+    busy_ew = {"EAST": {"waiting": 10, "moving": 0}}
+    assert ctrl.step(4.0, busy_ew) == "NS" and ns.state == "green"
+    ctrl.step(1.0, busy_ew)
+    assert ns.state == "yellow" and ew.state == "red"
+    assert ctrl.step(2.0, busy_ew) == "EW"
+    assert ew.state == "green" and ns.state == "red"
+    assert ctrl.green_time == pytest.approx(25.0)  # 5 s + 2 s per queued vehicle
+
+    ctrl.emergency_override("NS", duration=3.0)
+    assert ns.state == "green" and ew.state == "red"
+    ctrl.step(3.0)
+    assert not ctrl.override_active and ctrl.phase == "NS" and ctrl.green_time == 5.0
+
+
+def test_ema_smooths_queue_spikes():
+    ctrl, _ = make_controller(min_green=5.0, max_green=60.0, ema_alpha=0.25)
+    assert ctrl.compute_adaptive_green({"NORTH": {"waiting": 4}}) == pytest.approx(13.0)
+    # A sudden spike moves the average by a quarter of the jump
+    assert ctrl.compute_adaptive_green({"NORTH": {"waiting": 20}}) == pytest.approx(5.0 + 2.0 * 8.0)
+
+
+def test_approach_arrivals_from_track_rows():
+    rows = [
+        {"first_frame": 0, "first_center": [100, 10], "last_center": [105, 200]},     # moving down: from NORTH
+        {"first_frame": 30, "first_center": [100, 200], "last_center": [98, 20]},     # moving up: from SOUTH
+        {"first_frame": 90, "first_center": [300, 100], "last_center": [20, 110]},    # moving left: from EAST
+        {"first_frame": 1900, "first_center": [10, 100], "last_center": [300, 90]},   # moving right: from WEST
+        {"first_frame": 60, "first_center": [50, 50], "last_center": [52, 51]},       # parked: unknown
+    ]
+    arrivals = approach_arrivals(rows, frame_rate=30, bin_seconds=60)
+    assert arrivals.tolist() == [[1, 0], [1, 0], [1, 0], [0, 1]]
+
+
+def test_fixed_timing_matches_uniform_delay_formula():
+    # 0.1 veh/s on NORTH only, fixed 20 s greens, 2 s yellows: cycle 44 s, 20 s effective green
+    cycles = 200
+    arrivals = np.zeros((4, cycles))
+    arrivals[0] = 0.1 * 44
+    sim = IntersectionSimulator(arrivals, bin_seconds=44, saturation_flow=0.5)
+    result = sim.run(20.0, 20.0, 1.0, yellow=2.0)
+    c, g, y = 44.0, 20.0, 0.1 / 0.5
+    webster = c * (1 - g / c) ** 2 / (2 * (1 - y))
+    assert result["avg_delay_s"][0] == pytest.approx(webster, rel=0.01)
+    assert result["cycles"][0] == cycles
+    assert result["served"][0] + result["residual_queue"][0] == pytest.approx(arrivals.sum())
+
+
+def test_vectorized_policies_match_single_runs():
+    arrivals = extend(np.array([[6.0], [4.0], [3.0], [1.0]]), bin_seconds=60, days=0.25, seed=1)
+    sim = IntersectionSimulator(arrivals, bin_seconds=60)
+    min_green, max_green, alpha = np.array([5.0, 10.0, 20.0]), np.array([30.0, 60.0, 25.0]), np.array([0.2, 1.0, 0.5])
+    batch = sim.run(min_green, max_green, alpha)
+    for i in range(3):
+        single = sim.run(min_green[i], max_green[i], alpha[i])
+        for key in batch:
+            assert batch[key][i] == pytest.approx(single[key][0])
+
+
+def test_sweep_skips_invalid_settings_and_sorts_by_delay():
+    sim = IntersectionSimulator(np.full((4, 30), 3.0), bin_seconds=60)
+    results = sweep(sim, [5, 10, 40], [20, 30], [0.3, 1.0])
+    assert len(results["min_green"]) == 8
+    assert (results["min_green"] <= results["max_green"]).all()
+    assert (np.diff(results["avg_delay_s"]) >= 0).all()
+
+
+def test_tune_cli(tmp_path, capsys):
+    out = tmp_path / "sweep.json"
+    assert tune.main(["--demand", "480,360,180,120", "--days", "0.1", "--min_green", "5,10",
+                      "--max_green", "30,60", "--ema_alpha", "0.5,1", "--output", str(out)]) == 0
+    assert "8 settings" in capsys.readouterr().out
+    assert out.exists()
+
+
+def test_moving_share_lengthens_greens():
+    sim = IntersectionSimulator(np.full((4, 60), 6.0), bin_seconds=60)
+    queued_only, with_moving = (sim.run(5.0, 60.0, 1.0, moving_weight=w)["cycles"][0] for w in (0.0, 1.0))
+    # Vehicles still approaching add to the demand, so greens run longer and fewer cycles fit
+    assert with_moving < queued_only
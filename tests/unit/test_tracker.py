@@ -0,0 +1,54 @@
+# tests/unit/test_tracker.py
+
+import numpy as np
+from src.model.detections import BOX_DTYPE
+from src.tracking.tracker import IoUTracker, greedy_match
+
+
+def _records(rows):
+    return np.array(rows, dtype=BOX_DTYPE)
+
+
+def test_moving_vehicle_keeps_one_id():
+    tracker = IoUTracker(min_hits=3)
+    ids = []
+    for frame in range(10):
+        x = 10 + 5 * frame
+        track_ids, confirmed = tracker.update(_records([(2, 0.9, x, 50, x + 40, 80)]), frame)
+        ids.append(int(track_ids[0]))
+    assert len(set(ids)) == 1
+    assert confirmed[0]
+    assert tracker.class_counts == {2: 1}
+
+
+def test_flicker_is_not_counted():
+    tracker = IoUTracker(min_hits=3, max_age=2)
+    tracker.update(_records([(2, 0.9, 0, 0, 10, 10)]), 0)
+    for frame in range(1, 6):
+        tracker.update(_records([]), frame)
+    assert tracker.unique_count == 0
+    assert tracker.active_tracks == 0
+
+
+def test_low_confidence_detection_extends_track():
+    tracker = IoUTracker(min_hits=1)
+    first, _ = tracker.update(_records([(7, 0.9, 0, 0, 50, 50)]), 0)
+    second, _ = tracker.update(_records([(7, 0.2, 1, 0, 51, 50)]), 1)
+    assert second[0] == first[0]
+
+    # low-confidence detections never start tracks on their own
+    ids, _ = tracker.update(_records([(7, 0.2, 300, 300, 350, 350)]), 2)
+    assert ids[0] == -1
+
+
+def test_track_survives_skipped_frames():
+    tracker = IoUTracker(min_hits=1, max_age=30)
+    a, _ = tracker.update(_records([(2, 0.9, 0, 0, 40, 40)]), 0)
+    b, _ = tracker.update(_records([(2, 0.9, 10, 0, 50, 40)]), 5)
+    c, _ = tracker.update(_records([(2, 0.9, 20, 0, 60, 40)]), 10)
+    assert a[0] == b[0] == c[0]
+
+
+def test_greedy_match_is_one_to_one():
+    iou = np.array([[0.9, 0.8], [0.85, 0.1]])
+    assert greedy_match(iou, 0.3).tolist() == [[0, 0]]
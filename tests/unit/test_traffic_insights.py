@@ -0,0 +1,141 @@
+# tests/unit/test_traffic_insights.py
+
+import numpy as np
+from src.analysis.traffic_insights import TrafficInsights
+
+
+def _frames():
+    return [
+        [{'id': 1, 'bbox': [100, 50, 150, 100], 'class': 'car'},
+         {'id': 2, 'bbox': [200, 80, 260, 140], 'class': 'bus'}],
+        [{'id': 1, 'bbox': [110, 50, 160, 100], 'class': 'car'},
+         {'id': 2, 'bbox': [205, 85, 265, 145], 'class': 'bus'}],
+    ]
+
+
+def test_speed_density_and_congestion():
+    insights = TrafficInsights(frame_rate=30, meter_per_pixel=0.05)
+    for idx, dets in enumerate(_frames()):
+        insights.update(dets, frame_idx=idx)
+
+    assert insights.compute_speed(1) == 54.0
+    assert insights.compute_speed(2) == 38.18
+    assert insights.compute_speed(99) == 0.0
+    assert insights.compute_density() == {'car': 1, 'bus': 1}
+    assert insights.compute_congestion_level() == "Light"
+
+
+def test_columnar_update_matches_list_update():
+    by_list = TrafficInsights()
+    by_array = TrafficInsights()
+    for idx, dets in enumerate(_frames()):
+        by_list.update(dets, frame_idx=idx)
+        by_array.update({
+            'id': np.array([d['id'] for d in dets]),
+            'bbox': np.array([d['bbox'] for d in dets]),
+            'class': np.array([d['class'] for d in dets]),
+        }, frame_idx=idx)
+
+    assert by_array.generate_scene_description() == by_list.generate_scene_description()
+    assert by_array.vehicle_history[1] == [
+        {'frame': 0, 'center': (125.0, 75.0), 'class': 'car'},
+        {'frame': 1, 'center': (135.0, 75.0), 'class': 'car'},
+    ]
+
+
+def test_history_is_compact():
+    insights = TrafficInsights()
+    ids = np.arange(50)
+    boxes = np.zeros((50, 4), dtype=np.float32)
+    classes = np.array(['car'] * 50)
+    for frame in range(1000):
+        insights.update({'id': ids, 'bbox': boxes, 'class': classes}, frame)
+    assert len(insights.history) == 50_000
+    assert insights.history.nbytes < 50_000 * 16 * 2  # at most one doubling of slack
+
+
+def _random_walk(insights, frames=60, vehicles=8, seed=0):
+    rng = np.random.default_rng(seed)
+    pos = rng.uniform(0, 500, size=(vehicles, 2))
+    for frame in range(frames):
+        pos += rng.normal(0, 3, size=pos.shape)
+        visible = rng.random(vehicles) > 0.2  # tracks drop out and come back
+        boxes = np.concatenate([pos - 10, pos + 10], axis=1)[visible]
+        insights.update({
+            'id': np.flatnonzero(visible) + 1,
+            'bbox': boxes,
+            'class': np.array(['car'] * int(visible.sum())),
+        }, frame)
+
+
+def test_running_accumulators_match_history_recompute():
+    live = TrafficInsights(frame_rate=25, meter_per_pixel=0.05)
+    _random_walk(live)
+    speeds = live.compute_speeds()
+
+    live.recompute()
+    assert live.compute_speeds() == speeds
+    assert live.summary()['vehicles'] == 8
+    assert live.summary()['congestion_level'] == live.compute_congestion_level()
+
+
+def test_recompute_after_calibration_change():
+    insights = TrafficInsights(frame_rate=25, meter_per_pixel=0.05)
+    _random_walk(insights)
+    recalibrated = TrafficInsights(frame_rate=25, meter_per_pixel=(0.1, 0.02))
+    _random_walk(recalibrated)
+
+    insights.recompute(meter_per_pixel=(0.1, 0.02))
+    for vid, speed in recalibrated.compute_speeds().items():
+        assert abs(insights.compute_speed(vid) - speed) < 0.011
+
+
+def _convoy(insights, frames, vehicles=20, lifetime=30):
+    """Groups of `vehicles` cars crossing at 5 px/frame, replaced every `lifetime` frames."""
+    windows = []
+    for frame in range(frames):
+        ids = np.arange(vehicles) + (frame // lifetime) * vehicles
+        x = (frame % lifetime) * 5.0
+        y = np.arange(vehicles) * 30.0
+        boxes = np.stack([np.full(vehicles, x), y, np.full(vehicles, x + 20), y + 20], axis=1)
+        windows += insights.update({'id': ids, 'bbox': boxes, 'class': np.array(['car'] * vehicles)}, frame)
+    return windows
+
+
+def test_tumbling_windows_aggregate_each_window():
+    insights = TrafficInsights(frame_rate=10, meter_per_pixel=0.05, window_seconds=2)
+    windows = _convoy(insights, 61)
+    assert [(w['start_frame'], w['end_frame']) for w in windows] == [(0, 20), (20, 40), (40, 60)]
+    assert windows[0]['vehicles'] == 20
+    assert windows[1]['vehicles'] == 40  # two groups overlap the window
+    assert windows[0]['avg_speed_kmh'] == 9.0  # 5 px/frame * 0.05 m * 10 fps = 2.5 m/s
+    assert windows[0]['counts'] == {'car': 20}
+
+
+def test_sliding_window_memory_stays_bounded():
+    insights = TrafficInsights(frame_rate=10, window_seconds=2, slide_seconds=1, track_ttl=5)
+    windows = _convoy(insights, 3000)
+    assert len(windows) == 299
+    assert all(w['end_frame'] - w['start_frame'] == 20 for w in windows[1:])
+    # only the last window's points and tracks are kept, however long the stream
+    assert insights.history.size <= 30 * 20
+    assert len(insights._track_ids) <= 40
+    assert insights.summary()['vehicles'] == 20
+    assert insights.summary()['avg_speed_kmh'] == 9.0
+    assert insights.flush()['end_frame'] == 3000
+
+
+def test_session_table_keeps_expired_tracks():
+    insights = TrafficInsights(frame_rate=10, window_seconds=1, keep_session=True)
+    for frame in range(5):
+        insights.update([{'id': 1, 'bbox': [10 * frame, 0, 10 * frame + 10, 10], 'class': 'car'}], frame)
+    for frame in range(30, 35):  # car 1 expired meanwhile; it comes back, with a bus
+        insights.update([{'id': 1, 'bbox': [10 * frame, 0, 10 * frame + 10, 10], 'class': 'car'},
+                         {'id': 2, 'bbox': [0, 50, 10, 60 + frame], 'class': 'bus'}], frame)
+    assert insights.compute_density() == {'car': 1, 'bus': 1}
+
+    table = insights.session_table()
+    assert table['id'] == [1, 2]
+    assert (table['first_frame'], table['last_frame']) == ([0, 30], [34, 34])
+    assert abs(table['distance'][0] - 8 * 10 * 0.05) < 1e-6  # the gap while expired is not travel
+    assert TrafficInsights(frame_rate=10, window_seconds=1)._retired is None  # opt-in
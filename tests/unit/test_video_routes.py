@@ -0,0 +1,242 @@
+# tests/unit/test_video_routes.py
+
+import asyncio
+import hashlib
+import json
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import app.database as database
+import app.jobs as jobs
+import app.routes.video as video
+from app.database import VideoTask
+from app.progress import ProgressChannel
+from app.result_cache import ResultCache
+from app.uploads import ResumableUpload, expire_uploads
+
+
+def test_events_stream_pushes_updates_until_final(monkeypatch):
+    channel = ProgressChannel()
+    monkeypatch.setattr(video, "progress_channel", channel)
+    channel.publish("task-1", 10, "processing", insights={"vehicles": 3})
+
+    async def scenario():
+        response = await video.task_events("task-1")
+        body = response.body_iterator
+        first = await body.__anext__()
+        channel.publish("task-1", 100, "completed",
+                        result={"processed_path": "SmarTSignalAI/data/processed/out.mp4", "stats": {"car": 1}})
+        rest = [chunk async for chunk in body]
+        return [first] + rest
+
+    events = [json.loads(chunk.split("data: ", 1)[1]) for chunk in asyncio.run(scenario())]
+    assert events[0] == {"status": "processing", "progress": 10, "processed_path": None, "stats": {"vehicles": 3}}
+    assert events[-1]["status"] == "completed"
+    assert events[-1]["processed_path"] == "processed/out.mp4"
+    assert events[-1]["stats"]["car"] == 1
+    assert channel._subscribers == {}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(video, "RAW_DIR", str(tmp_path))
+    monkeypatch.setattr(video, "_start_processing", lambda path, name, *flags: started.append(path) or "task-1")
+    app = FastAPI()
+    app.include_router(video.router, prefix="/api/video")
+    test_client = TestClient(app)
+    test_client.started = started
+    return test_client
+
+
+def test_process_video_streams_upload_to_disk(client):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    res = client.post("/api/video/process_video/", files={"file": ("clip.MP4", data, "video/mp4")})
+    assert res.status_code == 200
+    assert res.json()["sha256"] == hashlib.sha256(data).hexdigest()
+    path = client.started[0]
+    assert path.endswith(".mp4")
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_process_video_reads_form_fields_and_rejects_missing_file(client, monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(video, "_start_processing", lambda *args: calls.append(args) or "task-1")
+    res = client.post("/api/video/process_video/", files={"file": ("a.avi", b"abc", "video/x-msvideo")},
+                      data={"analytics_only": "true", "priority": "high", "save_detections": "true"})
+    assert res.status_code == 200
+    _, filename, enhanced, analytics_only, _, priority, save_detections = calls[0]
+    assert (filename, enhanced, analytics_only, priority, save_detections) == ("a.avi", False, True, "high", True)
+
+    res = client.post("/api/video/process_video/", data={"enhanced": "true"}, files={"other": ("x", b"1")})
+    assert res.status_code == 400
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(calls[0][0])]
+
+
+def test_process_video_limit_removes_partial_file(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(video, "MAX_UPLOAD_BYTES", 1000)
+    res = client.post("/api/video/process_video/", files={"file": ("big.mp4", b"x" * 5000, "video/mp4")})
+    assert res.status_code == 413
+    assert os.listdir(tmp_path) == [] and client.started == []
+
+
+def test_resumable_upload(client):
+    data = os.urandom(200_000)
+    digest = hashlib.sha256(data).hexdigest()
+    upload_id = client.post("/api/video/uploads/", data={"filename": "cam.avi", "size": len(data),
+                                                         "sha256": digest}).json()["upload_id"]
+    url = f"/api/video/uploads/{upload_id}"
+
+    res = client.patch(url, content=data[:120_000], headers={"Upload-Offset": "0"})
+    assert res.status_code == 204 and res.headers["Upload-Offset"] == "120000"
+
+    # A retry from a stale offset is rejected with the offset to resume from
+    res = client.patch(url, content=data[:5], headers={"Upload-Offset": "0"})
+    assert res.status_code == 409 and res.headers["Upload-Offset"] == "120000"
+    assert client.head(url).headers["Upload-Offset"] == "120000"
+
+    # Completing early fails, the rest of the body then completes it
+    assert client.post(f"{url}/complete").status_code == 409
+    client.patch(url, content=data[120_000:], headers={"Upload-Offset": "120000"})
+    res = client.post(f"{url}/complete", data={"analytics_only": "true"})
+    assert res.json() == {"task_id": "task-1", "size": len(data), "sha256": digest}
+    with open(client.started[0], "rb") as f:
+        assert f.read() == data
+    assert client.head(url).status_code == 404
+
+
+def test_resumable_upload_enforces_declared_size(client):
+    upload_id = client.post("/api/video/uploads/", data={"filename": "cam.avi", "size": 10}).json()["upload_id"]
+    res = client.patch(f"/api/video/uploads/{upload_id}", content=b"x" * 11, headers={"Upload-Offset": "0"})
+    assert res.status_code == 413
+
+
+def test_abandoned_uploads_expire(tmp_path):
+    stale = ResumableUpload.create(str(tmp_path), "old.mp4")
+    asyncio.run(stale.append(_chunks(b"abc"), 0))
+    fresh = ResumableUpload.create(str(tmp_path), "new.mp4")
+    aborted = ResumableUpload.create(str(tmp_path), "gone.mp4")
+    aborted._lock()
+    aborted.abort()
+    assert aborted.upload_id not in ResumableUpload._locks
+
+    old = os.path.getmtime(stale.part_path) - 7200
+    for path in (stale.part_path, stale.meta_path):
+        os.utime(path, (old, old))
+    assert expire_uploads(str(tmp_path), max_age=3600) == 1
+    assert ResumableUpload.load(str(tmp_path), stale.upload_id) is None
+    assert ResumableUpload.load(str(tmp_path), fresh.upload_id) is not None
+    assert stale.upload_id not in ResumableUpload._locks
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_bulk_status_mixes_live_and_stored(client, monkeypatch):
+    channel = ProgressChannel()
+    monkeypatch.setattr(video, "progress_channel", channel)
+    channel.publish("running", 40, "processing", insights={"vehicles": 3, "avg_speed_kmh": 20.0})
+    requested = []
+
+    def get_task_summaries(task_ids):
+        requested.append(task_ids)
+        return {"done": {"status": "completed", "progress": 100, "processed_path": None,
+                         "vehicles": 1, "avg_speed": 35.0, "congestion_level": "Low"}}
+    monkeypatch.setattr(video, "get_task_summaries", get_task_summaries)
+
+    res = client.get("/api/video/status", params={"ids": "running,done,unknown,done"})
+    assert res.status_code == 200
+    body = res.json()
+    assert requested == [["done", "unknown"]]  # live tasks skip the database
+    assert body["tasks"]["running"]["progress"] == 40
+    assert body["tasks"]["running"]["vehicles"] == 3
+    assert body["tasks"]["done"]["avg_speed"] == 35.0
+    assert body["missing"] == ["unknown"]
+    assert client.get("/api/video/status", params={"ids": ",".join(map(str, range(501)))}).status_code == 400
+
+
+def test_completed_task_keeps_details_out_of_status(client, tmp_path, monkeypatch):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    database.create_db_and_tables(engine)
+    with database.get_session() as session:
+        session.add(VideoTask(id="t1", filename="a.mp4"))
+        session.commit()
+
+    windows = [{"start_frame": 300 * i, "vehicles": i} for i in range(12)]
+    jobs.complete_task("t1", "SmarTSignalAI/data/processed/x.mp4",
+                       {"car": 2, "avgSpeed": 41.0, "unique_vehicles": 2, "congestion_level": "Low",
+                        "detections_path": "/srv/app/SmarTSignalAI/data/processed/x_detections",
+                        "windows": windows, "tracks": [{"id": 1}, {"id": 2}]})
+
+    stats = client.get("/api/video/status/t1").json()["stats"]
+    assert "windows" not in stats and "tracks" not in stats
+    assert stats["details"] == {"windows": 12, "tracks": 2}
+    assert stats["car"] == 2
+    assert stats["detections_path"] == "processed/x_detections"  # served under /data, no server path
+
+    page = client.get("/api/video/tasks/t1/details/windows", params={"offset": 10, "limit": 5}).json()
+    assert page["total"] == 12
+    assert page["items"] == windows[10:]
+    assert client.get("/api/video/tasks/t1/details/frames").status_code == 404
+    assert client.get("/api/video/tasks/nope/details/tracks").status_code == 404
+
+
+def test_task_is_reported_completed_only_once_stored(tmp_path, monkeypatch):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    database.create_db_and_tables(engine)
+    with database.get_session() as session:
+        session.add(VideoTask(id="t1", filename="a.mp4"))
+        session.commit()
+
+    published = []
+
+    class RecordingChannel(ProgressChannel):
+        def publish(self, task_id, progress, status=None, insights=None, result=None):
+            with database.get_session() as session:
+                stored = session.get(VideoTask, task_id)
+                published.append((status, stored.status, stored.stats, result))
+            super().publish(task_id, progress, status, insights, result)
+
+    channel = RecordingChannel()
+    monkeypatch.setattr(jobs, "progress_channel", channel)
+    monkeypatch.setattr(jobs, "result_cache", ResultCache(str(tmp_path / "cache")))
+    stats = {"car": 1, "unique_vehicles": 1, "avgSpeed": 30.0, "tracks": [{"id": 1}]}
+    monkeypatch.setattr(jobs, "process_video_with_model", lambda **kwargs: (None, stats))
+
+    jobs.run_video_job("t1", str(tmp_path / "a.mp4"), analytics_only=True, sha256="ab" * 32)
+
+    status, stored_status, stored_stats, result = published[-1]
+    assert status == stored_status == "completed"
+    assert stored_stats["car"] == 1
+    assert "tracks" not in result["stats"] and result["stats"]["details"] == {"tracks": 1}
+    assert channel.get("t1") is None
+
+
+def test_start_processing_rejects_bad_priority_but_not_misconfiguration(tmp_path, monkeypatch):
+    engine = database.make_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    database.create_db_and_tables(engine)
+    monkeypatch.setattr(video, "serve_cached", lambda task_id, key: None)
+    raw = tmp_path / "a.mp4"
+
+    raw.write_bytes(b"x")
+    with pytest.raises(HTTPException) as e:
+        video._start_processing(str(raw), "a.mp4", False, False, "ab" * 32, priority="urgent")
+    assert e.value.status_code == 400 and not raw.exists()
+
+    # A broken SCHEDULER_BACKEND is a server error, not the client's
+    def misconfigured():
+        raise ValueError("Unknown SCHEDULER_BACKEND 'kafka'")
+
+    monkeypatch.setattr(video, "get_scheduler", misconfigured)
+    raw.write_bytes(b"x")
+    with pytest.raises(ValueError):
+        video._start_processing(str(raw), "a.mp4", False, False, "ab" * 32)
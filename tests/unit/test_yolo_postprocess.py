@@ -0,0 +1,41 @@
+# tests/unit/test_yolo_postprocess.py
+
+import numpy as np
+from src.model.backends import Boxes, Result
+from src.model.yolo_utils import _postprocess_result, TRACKED_CLASSES
+
+NAMES = {0: "person", 1: "bicycle", 2: "car", 3: "motorbike", 5: "bus", 7: "truck"}
+
+
+def test_postprocess_filters_and_counts():
+    xyxy = np.array([[0, 0, 10, 10], [5, 5, 20, 20], [1, 1, 2, 2], [3, 3, 9, 9]], dtype=np.float32)
+    conf = np.array([0.9, 0.8, 0.7, 0.6], dtype=np.float32)
+    cls = np.array([2, 2, 0, 7], dtype=np.float32)
+    frame = np.zeros((32, 32, 3), dtype=np.uint8)
+
+    _, records, stats = _postprocess_result(Result(Boxes(xyxy, conf, cls)), frame, NAMES, True, TRACKED_CLASSES)
+
+    assert records["cls"].tolist() == [2, 2, 7]   # person filtered out
+    assert records["x2"].tolist() == [10, 20, 9]
+    assert stats == {"car": 2, "truck": 1, "bus": 0, "motorbike": 0, "bicycle": 0}
+    assert frame.any()  # boxes were drawn
+
+
+def test_postprocess_empty_result():
+    empty = Boxes(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32))
+    _, records, stats = _postprocess_result(Result(empty), np.zeros((8, 8, 3), np.uint8), NAMES, False, TRACKED_CLASSES)
+    assert len(records) == 0
+    assert sum(stats.values()) == 0
+
+
+def test_class_index_is_keyed_on_names_content():
+    from src.model import yolo_utils
+
+    yolo_utils._class_index_cache.clear()
+    for _ in range(3):  # a fresh but equal dict per call, as ultralytics returns
+        allowed, _ = yolo_utils._class_index(dict(NAMES), TRACKED_CLASSES)
+    assert len(yolo_utils._class_index_cache) == 1
+    assert allowed.nonzero()[0].tolist() == [1, 2, 3, 5, 7]
+
+    allowed, label_ids = yolo_utils._class_index({0: "car", 1: "person"}, TRACKED_CLASSES)
+    assert allowed.tolist() == [True, False] and label_ids["car"].tolist() == [0]